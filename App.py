@@ -1,20 +1,20 @@
 # app.py (updated)
 import os
-import tempfile
 import streamlit as st
 from datetime import datetime
 from pptx import Presentation
-from utils import logger, get_env, now_ts, text_client
-from search_utils import semantic_search
+from utils import logger, get_env, now_ts
+from search_utils import hybrid_search, relevant_hits
 from azure_blob_utils import (
     upload_source_ppt_to_blob,
     list_source_ppt_blobs,
     delete_source_ppt_from_blob,
-    download_source_ppt_from_blob,
 )
+from slide_catalog import SlideCatalog
 from ingestion_chroma import process_blob as ingest_process_blob, delete_ppt_from_chroma
 from slide_extractor import download_blob_to_local, extract_slides_info_from_ppt
 from generate_ppt import generate_presentation_from_selected
+from slide_questions import generate_questions_from_slide_text, iter_generated, DEFAULT_TEXT_QUESTIONS
 
 st.set_page_config(page_title="AI PPT Generator", layout="wide", page_icon="📊")
 
@@ -34,6 +34,15 @@ st.title("📊 AI PowerPoint Generator (Select & Clone Mode)")
 
 SIMILARITY_THRESHOLD = float(get_env("SIMILARITY_THRESHOLD", "1.1"))
 
+
+def _extract_slides_info(ppt_name, local_path, slide_indices):
+    slides_info = extract_slides_info_from_ppt(local_path, slide_indices)
+    # attach blob_name for later reference if needed
+    for s in slides_info:
+        s["source_blob"] = ppt_name
+    return slides_info
+
+
 # Sidebar: upload & manage dataset
 with st.sidebar:
     st.subheader("Upload sample PPTs (knowledge base)")
@@ -89,37 +98,56 @@ if locate_btn:
     if not prompt.strip():
         st.error("Please enter prompt")
     else:
-        with st.spinner("Searching and loading slides..."):
-            raw_refs = semantic_search(prompt, top_k=5) or []
-            refs = [r for r in raw_refs if r.get("score") is None or r["score"] <= SIMILARITY_THRESHOLD]
+        with st.spinner("Searching slides..."):
+            raw_refs = hybrid_search(prompt, top_k=5) or []
+            refs = relevant_hits(raw_refs, SIMILARITY_THRESHOLD)
             if not refs:
                 st.warning("No relevant content found. Try different prompt or upload more sample PPTs.")
             else:
-                # For each unique ppt_name found in refs, download and extract all slides
-                # gather unique ppt names
-                ppt_names = sorted({r.get("ppt_name") for r in refs if r.get("ppt_name")})
+                # decks are downloaded concurrently and only the matched slides are extracted;
+                # the selection grid below streams them in (more of a deck can be loaded from it)
+                st.session_state["slide_catalog"] = SlideCatalog(refs, _extract_slides_info)
                 st.session_state["preview_slides"] = []
-                for ppt_name in ppt_names:
-                    try:
-                        tmp_local = os.path.join(tempfile.gettempdir(), ppt_name.replace("/", "_"))
-                        download_source_ppt_from_blob(ppt_name, tmp_local)
-                        slides_info = extract_slides_info_from_ppt(tmp_local)
-                        # attach blob_name for later reference if needed
-                        for s in slides_info:
-                            s["source_blob"] = ppt_name
-                        st.session_state["preview_slides"].extend(slides_info)
-                    except Exception as e:
-                        logger.exception(f"Failed processing {ppt_name}")
-                if st.session_state["preview_slides"]:
-                    st.session_state["mode"] = "select"
-                    st.success(f"Loaded {len(st.session_state['preview_slides'])} slides from {len(ppt_names)} PPT(s).")
+                st.session_state["mode"] = "select"
 
 st.markdown("---")
 
 # Step 2: Selection UI
 if st.session_state["mode"] == "select":
     st.subheader("Select slides to use as design references")
+    catalog = st.session_state.get("slide_catalog")
+    if catalog is not None and not catalog.streamed:
+        # fill the grid as slides become ready, then rerun into the selectable grid
+        status = st.empty()
+        status.info("Loading matched slides...")
+        stream_cols = st.columns(3)
+        for n, s in enumerate(catalog.iter_matched()):
+            with stream_cols[n % 3]:
+                st.image(s["preview_image"], caption=f"{s['slide_id']}", use_column_width=True)
+            status.info(f"Loaded {n + 1} slide(s)...")
+        st.session_state["preview_slides"] = catalog.slides()
+        if not st.session_state["preview_slides"]:
+            st.session_state["mode"] = "search"
+            st.warning("Could not load any of the matched slides.")
+        else:
+            st.experimental_rerun()
     slides = st.session_state["preview_slides"]
+    if catalog is not None and slides:
+        if catalog.late:
+            st.warning(f"{len(catalog.late)} deck(s) were too slow to load; use 'Load more' below to retry.")
+        with st.expander("More slides from the matched decks", expanded=bool(catalog.late)):
+            for ppt_name in catalog.decks():
+                c1, c2, c3 = st.columns([3, 1, 1])
+                remaining = catalog.remaining(ppt_name)
+                c1.write(f"{ppt_name} — " + ("not loaded yet" if remaining is None else f"{remaining} more slide(s)"))
+                if c2.button("Neighbours", key=f"nb_{ppt_name}"):
+                    catalog.expand(ppt_name)
+                    st.session_state["preview_slides"] = catalog.slides()
+                    st.experimental_rerun()
+                if c3.button("Load more", key=f"more_{ppt_name}", disabled=catalog.remaining(ppt_name) == 0):
+                    catalog.load_more(ppt_name)
+                    st.session_state["preview_slides"] = catalog.slides()
+                    st.experimental_rerun()
     # show grid of thumbnails with checkboxes
     cols = st.columns(3)
     for i, s in enumerate(slides):
@@ -145,76 +173,63 @@ if st.session_state["mode"] == "select":
 st.markdown("---")
 
 # Step 3: Q&A flow
-def generate_questions_from_slide_text(original_text, num_q=4):
-    """
-    Ask the LLM to produce a small set of questions to gather new content for this slide.
-    Returns list of question strings.
-    """
-    try:
-        sys_prompt = (
-            "You are a helpful assistant. Given the text of a slide (title and bullets), "
-            "produce 3-5 concise questions that gather the content needed to recreate the slide's text. "
-            "Return the questions as plain text, each on a new line."
-        )
-        user_prompt = f"Slide content:\n{original_text}\n\nGenerate the questions."
-        resp = text_client.chat.completions.create(
-            model=get_env("CHAT_MODEL", required=True),
-            messages=[
-                {"role": "system", "content": sys_prompt},
-                {"role": "user", "content": user_prompt},
-            ],
-            max_completion_tokens=300,
-            temperature=0.0,
-        )
-        raw = resp.choices[0].message.content.strip()
-        questions = [q.strip() for q in raw.splitlines() if q.strip()]
-        return questions[:5]
-    except Exception as e:
-        logger.exception("Question generation failed")
-        # fallback default questions
-        return [
-            "What should be the new slide title?",
-            "List 3–5 bullets for this slide (comma separated).",
-            "Any specific data, metrics or examples to include?",
-        ]
+def _render_slide_qna(s):
+    q_key = f"questions_{s['slide_id']}"
+    answers_key = f"answers_{s['slide_id']}"
+    if answers_key not in st.session_state:
+        st.session_state[answers_key] = {}
+
+    # Show each question with input
+    for qi, q in enumerate(st.session_state[q_key]):
+        ans = st.text_input(q, key=f"{s['slide_id']}_q_{qi}", value=st.session_state[answers_key].get(str(qi), ""))
+        st.session_state[answers_key][str(qi)] = ans
+
+    # Provide a convenience option to keep original slide text
+    keep = st.checkbox("Keep original slide text for this reference", key=f"keep_{s['slide_id']}")
+    st.session_state["answers_by_slide"].setdefault(s['slide_id'], {})
+    if keep:
+        # Mark raw_replacements empty meaning "no change"
+        st.session_state["answers_by_slide"][s['slide_id']]["raw_replacements"] = {}
+    else:
+        # Build raw_replacements map: map original full text snippets -> replacement text
+        # For simplicity, map the whole slide original text -> joined answers
+        joined = "\n".join([v for v in st.session_state[f"answers_{s['slide_id']}"].values() if v])
+        # fallback: if user left answers empty, keep original by setting replacements empty
+        if not joined.strip():
+            st.session_state["answers_by_slide"][s['slide_id']]["raw_replacements"] = {}
+        else:
+            # Map original complete text to new combined text (best-effort)
+            original_text = s.get("text","").strip()
+            st.session_state["answers_by_slide"][s['slide_id']]["raw_replacements"] = { original_text: joined }
+
 
 if st.session_state["mode"] == "qna":
     st.subheader("Content Q&A for each selected slide")
     selected_infos = st.session_state.get("selected_infos", [])
-    # iterate slides and show generated questions + inputs
+    # every slide is shown at once; its questions appear under it as soon as they are ready
+    slots = []
     for s in selected_infos:
         st.markdown(f"### Reference: {s['slide_id']} — {s.get('title','')}")
-        # generate questions once and store in session_state
-        q_key = f"questions_{s['slide_id']}"
-        if q_key not in st.session_state:
-            st.session_state[q_key] = generate_questions_from_slide_text(s.get("text", ""))
-
-        answers_key = f"answers_{s['slide_id']}"
-        if answers_key not in st.session_state:
-            st.session_state[answers_key] = {}
-
-        # Show each question with input
-        for qi, q in enumerate(st.session_state[q_key]):
-            ans = st.text_input(q, key=f"{s['slide_id']}_q_{qi}", value=st.session_state[answers_key].get(str(qi), ""))
-            st.session_state[answers_key][str(qi)] = ans
-
-        # Provide a convenience option to keep original slide text
-        keep = st.checkbox("Keep original slide text for this reference", key=f"keep_{s['slide_id']}")
-        st.session_state["answers_by_slide"].setdefault(s['slide_id'], {})
-        if keep:
-            # Mark raw_replacements empty meaning "no change"
-            st.session_state["answers_by_slide"][s['slide_id']]["raw_replacements"] = {}
+        slots.append(st.container())
+
+    # generate questions once and store in session_state; missing ones are requested concurrently
+    pending, waiting = [], {}
+    for i, s in enumerate(selected_infos):
+        if f"questions_{s['slide_id']}" in st.session_state:
+            with slots[i]:
+                _render_slide_qna(s)
         else:
-            # Build raw_replacements map: map original full text snippets -> replacement text
-            # For simplicity, map the whole slide original text -> joined answers
-            joined = "\n".join([v for v in st.session_state[f"answers_{s['slide_id']}"].values() if v])
-            # fallback: if user left answers empty, keep original by setting replacements empty
-            if not joined.strip():
-                st.session_state["answers_by_slide"][s['slide_id']]["raw_replacements"] = {}
-            else:
-                # Map original complete text to new combined text (best-effort)
-                original_text = s.get("text","").strip()
-                st.session_state["answers_by_slide"][s['slide_id']]["raw_replacements"] = { original_text: joined }
+            waiting[i] = slots[i].empty()
+            waiting[i].caption("Generating questions...")
+            pending.append(i)
+    if pending:
+        texts = [selected_infos[i].get("text", "") for i in pending]
+        for n, questions in iter_generated(texts, generate_questions_from_slide_text, lambda _: list(DEFAULT_TEXT_QUESTIONS)):
+            i = pending[n]
+            st.session_state[f"questions_{selected_infos[i]['slide_id']}"] = questions
+            waiting[i].empty()
+            with slots[i]:
+                _render_slide_qna(selected_infos[i])
 
     if st.button("Generate final PPT from selected slides"):
         # Prepare selected slides list and answers mapping
@@ -1,33 +1,36 @@
 # slide_extractor.py
 import os
+import shutil
 import tempfile
 import uuid
 from copy import deepcopy
 from pptx import Presentation
 from pptx.util import Inches, Pt
 from PIL import Image, ImageDraw, ImageFont
-from utils import get_env, logger
-from azure.storage.blob import BlobServiceClient
+from utils import get_env, logger, get_blob_service_client
+from pptx_fast_text import extract_slide_texts
+from deck_cache import file_sha256
+import thumbnail_cache
+import blob_cache
 
 AZURE_CONN = get_env("AZURE_BLOB_CONN", required=True)
 BLOB_CONTAINER = get_env("AZURE_BLOB_CONTAINER", "ppt-dataset")
 
 def download_blob_to_local(blob_name: str, dest_path: str):
     """
-    Download blob from the source container to a local file path.
+    Download blob from the source container to a local file path (via the blob cache).
     """
     try:
-        blob_service = BlobServiceClient.from_connection_string(AZURE_CONN)
-        container_client = blob_service.get_container_client(BLOB_CONTAINER)
-        with open(dest_path, "wb") as fp:
-            stream = container_client.download_blob(blob_name)
-            stream.readinto(fp)
+        container_client = get_blob_service_client(AZURE_CONN).get_container_client(BLOB_CONTAINER)
+        cached_path = blob_cache.get_local_path(container_client, blob_name, BLOB_CONTAINER)
+        if os.path.abspath(dest_path) != os.path.abspath(cached_path):
+            shutil.copyfile(cached_path, dest_path)
         return dest_path
     except Exception as e:
         logger.exception(f"Failed to download blob {blob_name}: {e}")
         raise
 
-def extract_slides_info_from_ppt(local_ppt_path: str):
+def extract_slides_info_from_ppt(local_ppt_path: str, slide_indices=None):
     """
     Return list of slide metadata dicts:
     {
@@ -38,21 +41,21 @@ def extract_slides_info_from_ppt(local_ppt_path: str):
       "ppt_path": local_ppt_path,
       "slide_id": "<pptbasename>_Slide_XX"
     }
+    slide_indices limits extraction (and preview images) to those slides; default is every slide.
     """
-    prs = Presentation(local_ppt_path)
     slides_info = []
     base = os.path.splitext(os.path.basename(local_ppt_path))[0]
+    deck_sha = file_sha256(local_ppt_path)
 
-    for i, slide in enumerate(prs.slides):
-        texts = []
-        for shape in slide.shapes:
-            if hasattr(shape, "text") and shape.text and shape.text.strip():
-                texts.append(shape.text.strip())
-        title = texts[0] if texts else f"Slide {i+1}"
-        combined_text = "\n".join(texts)
+    # read slide XML straight from the zip; no python-pptx object model needed for text
+    for s in extract_slide_texts(local_ppt_path, with_notes=False, slide_indices=slide_indices):
+        i = s["index"]
+        texts = s["texts"]
+        title = s["title"] or (texts[0] if texts else f"Slide {i+1}")
+        combined_text = s["text"]
         slide_id = f"{base}_Slide_{i:02d}"
 
-        preview_image = _make_text_preview_image(title, combined_text)
+        preview_image = _make_text_preview_image(title, combined_text, deck_sha=deck_sha, slide_index=i)
 
         slides_info.append({
             "slide_index": i,
@@ -65,11 +68,20 @@ def extract_slides_info_from_ppt(local_ppt_path: str):
 
     return slides_info
 
-def _make_text_preview_image(title: str, body_text: str, width=800, height=450):
+TEXT_PREVIEW_VERSION = "text-preview-1"
+
+
+def _make_text_preview_image(title: str, body_text: str, width=800, height=450, deck_sha=None, slide_index=None):
     """
     Create a simple preview PNG showing the title and first few bullet lines.
     This is for UI selection only.
+    With deck_sha/slide_index the image lives in the thumbnail cache and is drawn once per deck version.
     """
+    size = f"{width}x{height}"
+    if deck_sha is not None:
+        cached = thumbnail_cache.get(deck_sha, slide_index, size, TEXT_PREVIEW_VERSION)
+        if cached:
+            return cached
     try:
         img = Image.new("RGB", (width, height), color=(245, 246, 250))
         draw = ImageDraw.Draw(img)
@@ -96,6 +108,9 @@ def _make_text_preview_image(title: str, body_text: str, width=800, height=450):
             draw.text((padding + 10, y), u"\u2022 " + ln[:120], font=font_body, fill=(40, 40, 40))
             y += 22
 
+        if deck_sha is not None:
+            return thumbnail_cache.put(deck_sha, slide_index, size, TEXT_PREVIEW_VERSION, img)
+
         tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".png")
         img.save(tmp.name, format="PNG")
         tmp.close()
@@ -8,6 +8,7 @@ from pptx.util import Inches, Pt
 from pptx.enum.shapes import MSO_SHAPE_TYPE
 from azure_blob_utils import download_blob_to_file as unused_dl  # keep consistent name if present
 from utils import logger
+from deck_cache import get_presentation
 
 def _deepcopy_shape_to_slide(src_shape, dst_slide):
     """
@@ -31,7 +32,7 @@ def clone_slide_to_presentation(src_prs_path: str, src_index: int, dst_prs_obj:
     This performs a deep copy of shape xml to preserve design as much as possible.
     """
     try:
-        src_prs = Presentation(src_prs_path)
+        src_prs = get_presentation(src_prs_path)  # read-only, shared source deck
         src_slide = src_prs.slides[src_index]
 
         # create a blank slide in destination (use layout 6 if available or first layout)
@@ -1,10 +1,8 @@
 # app.py  (Home Page)
 
-import os
-import tempfile
 import streamlit as st
-from search_utils import semantic_search
-from azure_blob_utils import download_source_ppt_from_blob
+from search_utils import hybrid_search
+from azure_blob_utils import get_source_ppt_path
 from slide_renderer import export_slides_to_png
 from utils import logger, get_env
 
@@ -41,7 +39,7 @@ if st.button("🔍 Search Slides"):
         with st.spinner("Searching dataset..."):
 
             # Step 1 — semantic search
-            raw_refs = semantic_search(prompt, top_k=5)
+            raw_refs = hybrid_search(prompt, top_k=5)
             refs = raw_refs or []
 
             if not refs:
@@ -57,12 +55,8 @@ if st.button("🔍 Search Slides"):
             # Step 3 — Download each PPT → Render slides to PNG → Save paths
             for ppt_blob in ppt_names:
                 try:
-                    # Download source ppt to temp file
-                    local_path = os.path.join(
-                        tempfile.gettempdir(),
-                        ppt_blob.replace("/", "_")
-                    )
-                    download_source_ppt_from_blob(ppt_blob, local_path)
+                    # Local copy of the source ppt (blob cache, revalidated by ETag)
+                    local_path = get_source_ppt_path(ppt_blob)
 
                     # Export slides as PNG images using PowerPoint COM
                     png_list = export_slides_to_png(local_path)
@@ -5,6 +5,7 @@ import tempfile
 from copy import deepcopy
 from pptx import Presentation
 from utils import logger
+from deck_cache import get_presentation
 
 def _clone_shape(shape, new_slide):
     """Deep copy PPT XML of shape to new slide."""
@@ -22,7 +23,7 @@ def clone_slide(src_ppt, slide_index, dst_ppt):
     Return cloned slide.
     """
     try:
-        src = Presentation(src_ppt)
+        src = get_presentation(src_ppt)
         src_slide = src.slides[slide_index]
 
         # Blank layout
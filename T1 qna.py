@@ -1,6 +1,6 @@
 # pages/3_❓_QnA.py
 import streamlit as st
-from utils import text_client, get_env
+from utils import get_text_client, get_env
 
 st.title("❓ Slide Q&A")
 
@@ -10,7 +10,7 @@ answers = st.session_state.get("answers", {})
 def create_questions(text):
     sys = "Generate 3–5 questions to recreate this slide content."
     usr = f"Slide content:\n{text}\nGenerate questions only."
-    resp = text_client.chat.completions.create(
+    resp = get_text_client().chat.completions.create(
         model=get_env("CHAT_MODEL"),
         messages=[{"role":"system","content":sys},{"role":"user","content":usr}],
     )
@@ -1,11 +1,8 @@
 # pages/1_Home.py
-import os
-import tempfile
 import streamlit as st
-from pptx import Presentation
-from search_utils import semantic_search
-from azure_blob_utils import download_source_ppt_from_blob
-from slide_renderer import extract_slide_structure
+from search_utils import hybrid_search
+from slide_catalog import SlideCatalog
+from slide_renderer import extract_deck_structures
 from utils import logger, get_env
 
 st.set_page_config(page_title="1 - Home", layout="wide")
@@ -18,6 +15,16 @@ if "selected_slides" not in st.session_state:
 if "preview_loaded" not in st.session_state:
     st.session_state["preview_loaded"] = False
 
+
+def _extract_slide_structs(ppt_blob, local_ppt, slide_indices):
+    slide_structs = extract_deck_structures({local_ppt: slide_indices})[local_ppt]
+    for slide_struct in slide_structs:
+        # attach metadata
+        slide_struct["ppt_blob"] = ppt_blob
+        slide_struct["slide_id"] = f"{ppt_blob}_slide_{slide_struct['slide_index']}"
+    return slide_structs
+
+
 prompt = st.text_area("Enter presentation prompt:", height=140)
 
 col1, col2 = st.columns([3,1])
@@ -26,42 +33,23 @@ with col1:
         if not prompt.strip():
             st.error("Please enter a prompt.")
         else:
-            with st.spinner("Searching and loading slides..."):
-                raw_refs = semantic_search(prompt, top_k=10) or []
+            with st.spinner("Searching slides..."):
+                raw_refs = hybrid_search(prompt, top_k=10) or []
                 if not raw_refs:
                     st.warning("No matches found in dataset.")
                 else:
-                    # Unique ppt names
-                    ppt_names = sorted({r.get("ppt_name") for r in raw_refs if r.get("ppt_name")})
+                    # only the matched slides are extracted (decks downloaded and rendered
+                    # concurrently); the selection page streams them in as they are ready and
+                    # loads neighbours / more slides on demand
+                    st.session_state["slide_catalog"] = SlideCatalog(raw_refs, _extract_slide_structs)
                     st.session_state["slides_catalog"] = []
-                    for ppt_blob in ppt_names:
-                        try:
-                            local_ppt = os.path.join(tempfile.gettempdir(), ppt_blob.replace("/", "_"))
-                            download_source_ppt_from_blob(ppt_blob, local_ppt)
-
-                            # load ppt to know slide count
-                            prs = Presentation(local_ppt)
-                            for idx in range(len(prs.slides)):
-                                try:
-                                    slide_struct = extract_slide_structure(local_ppt, idx)
-                                    # attach metadata
-                                    slide_struct["ppt_blob"] = ppt_blob
-                                    slide_struct["slide_id"] = f"{ppt_blob}_slide_{idx}"
-                                    st.session_state["slides_catalog"].append(slide_struct)
-                                except Exception as e:
-                                    logger.exception(f"Failed extract slide {idx} from {ppt_blob}: {e}")
-                        except Exception as e:
-                            logger.exception(f"Failed to download/process {ppt_blob}: {e}")
-
-                    if st.session_state["slides_catalog"]:
-                        st.session_state["preview_loaded"] = True
-                        st.success(f"Loaded {len(st.session_state['slides_catalog'])} slides from {len(ppt_names)} PPT(s).")
-                        # navigate to selection
-                        st.rerun()
+                    st.session_state["preview_loaded"] = True
+                    # navigate to selection
+                    st.switch_page("pages/2_🖼️_Slide_Selection.py")
 
 with col2:
     st.write("Quick actions")
-    if st.button("Go to Slide Selection") and st.session_state.get("slides_catalog"):
+    if st.button("Go to Slide Selection") and (st.session_state.get("slides_catalog") or st.session_state.get("slide_catalog")):
         st.switch_page("pages/2_🖼️_Slide_Selection.py")
 
 st.markdown("---")
@@ -1,6 +1,9 @@
 import os
-from azure.storage.blob import BlobServiceClient
-from utils import get_env, logger
+import shutil
+import threading
+from azure.core.exceptions import ResourceExistsError
+from utils import get_env, logger, get_blob_service_client
+import blob_cache
 
 BLOB_CONN = get_env("AZURE_BLOB_CONN", required=True)
 
@@ -11,14 +14,29 @@ GENERATED_CONTAINER = get_env("GENERATED_CONTAINER", "generated-presentations")
 SOURCE_CONTAINER = get_env("AZURE_BLOB_CONTAINER", "ppt-dataset")
 
 
-def _get_container_client(container_name: str):
-    blob_service = BlobServiceClient.from_connection_string(BLOB_CONN)
-    container_client = blob_service.get_container_client(container_name)
-    try:
-        container_client.create_container()
-    except Exception:
-        # already exists
-        pass
+# container clients are built once from the shared (pooled) BlobServiceClient;
+# containers we have created or seen exist are not checked again in this process
+_container_clients = {}
+_ensured_containers = set()
+_containers_lock = threading.Lock()
+
+
+def _get_container_client(container_name: str, ensure: bool = True):
+    with _containers_lock:
+        container_client = _container_clients.get(container_name)
+        if container_client is None:
+            container_client = get_blob_service_client(BLOB_CONN).get_container_client(container_name)
+            _container_clients[container_name] = container_client
+        if ensure and container_name not in _ensured_containers:
+            try:
+                container_client.create_container()
+            except ResourceExistsError:
+                # already exists
+                pass
+            except Exception as e:
+                # e.g. credentials without create rights; the container operations themselves will tell
+                logger.warning(f"Could not ensure container {container_name}: {e}")
+            _ensured_containers.add(container_name)
     return container_client
 
 
@@ -94,19 +112,26 @@ def delete_source_ppt_from_blob(blob_name: str):
         logger.exception(f"Failed to delete SOURCE PPT from Azure Blob: {blob_name}")
         raise e
     
-def download_source_ppt_from_blob(blob_name: str, local_path: str):
+def get_source_ppt_path(blob_name: str):
     """
-    Download a source PPT from SOURCE_CONTAINER to local_path.
+    Local path of an up-to-date copy of a source PPT, served from the blob cache
+    (no request while fresh, then a conditional GET). Treat the file as read-only.
     """
     try:
-        blob_service = BlobServiceClient.from_connection_string(get_env("AZURE_BLOB_CONN", required=True))
-        container_client = blob_service.get_container_client(SOURCE_CONTAINER)
-        with open(local_path, "wb") as fp:
-            stream = container_client.download_blob(blob_name)
-            stream.readinto(fp)
-        logger.info(f"Downloaded SOURCE PPT {blob_name} -> {local_path}")
-        return local_path
+        container_client = _get_container_client(SOURCE_CONTAINER, ensure=False)
+        return blob_cache.get_local_path(container_client, blob_name, SOURCE_CONTAINER)
     except Exception as e:
-        logger.exception(f"Failed to download source ppt {blob_name}: {e}")
+        logger.exception(f"Failed to fetch source ppt {blob_name}: {e}")
         raise
 
+
+def download_source_ppt_from_blob(blob_name: str, local_path: str):
+    """
+    Copy a source PPT from SOURCE_CONTAINER to local_path (via the blob cache).
+    Prefer get_source_ppt_path when the caller only needs to read the deck.
+    """
+    cached_path = get_source_ppt_path(blob_name)
+    if os.path.abspath(local_path) != os.path.abspath(cached_path):
+        shutil.copyfile(cached_path, local_path)
+    logger.info(f"Downloaded SOURCE PPT {blob_name} -> {local_path}")
+    return local_path
@@ -5,11 +5,47 @@ from utils import logger
 st.set_page_config(page_title="2 - Slide Selection", layout="wide")
 st.title("2 — Slide Selection (choose reference slides)")
 
+# first visit after a search: the grid fills in as slides become ready, then the page
+# reruns into the normal selectable grid
+catalog = st.session_state.get("slide_catalog")
+if catalog is not None and not catalog.streamed:
+    status = st.empty()
+    status.info("Loading matched slides...")
+    stream_cols = st.columns(3)
+    for n, s in enumerate(catalog.iter_matched()):
+        with stream_cols[n % 3]:
+            st.image(s.get("png_path"), use_container_width=True)
+            st.caption(f"{s.get('ppt_blob')} — slide {s.get('slide_index')}")
+        status.info(f"Loaded {n + 1} slide(s)...")
+    st.session_state["slides_catalog"] = catalog.slides()
+    st.rerun()
+
 slides = st.session_state.get("slides_catalog", [])
 if not slides:
     st.warning("No slides loaded. Go to Home (page 1) and run a search.")
 else:
     st.write("Select slides to use as design references. The number you select = number of generated slides.")
+
+    # only the matched slides are loaded up front; pull in more of a deck on demand
+    if catalog is not None:
+        if catalog.late:
+            st.warning(f"{len(catalog.late)} deck(s) were too slow to load; use 'Load more' below to retry.")
+        with st.expander("More slides from the matched decks", expanded=bool(catalog.late)):
+            for ppt_blob in catalog.decks():
+                c1, c2, c3 = st.columns([3, 1, 1])
+                remaining = catalog.remaining(ppt_blob)
+                c1.write(f"{ppt_blob} — " + ("not loaded yet" if remaining is None else f"{remaining} more slide(s)"))
+                if c2.button("Neighbours", key=f"nb_{ppt_blob}"):
+                    with st.spinner("Loading neighbouring slides..."):
+                        catalog.expand(ppt_blob)
+                    st.session_state["slides_catalog"] = catalog.slides()
+                    st.rerun()
+                if c3.button("Load more", key=f"more_{ppt_blob}", disabled=catalog.remaining(ppt_blob) == 0):
+                    with st.spinner("Loading slides..."):
+                        catalog.load_more(ppt_blob)
+                    st.session_state["slides_catalog"] = catalog.slides()
+                    st.rerun()
+
     cols = st.columns(3)
     for i, s in enumerate(slides):
         col = cols[i % 3]
@@ -0,0 +1,191 @@
+# blob_cache.py
+import os
+import json
+import time
+import uuid
+import hashlib
+import tempfile
+import threading
+from contextlib import contextmanager
+from azure.core import MatchConditions
+from azure.core.exceptions import ResourceNotModifiedError
+from utils import get_env, logger, ensure_dir
+
+# Local copies of source decks, one directory per (container, blob name) holding the file and a
+# meta.json with its ETag. A copy younger than BLOB_CACHE_FRESH_SECONDS is served without any
+# request; an older one is revalidated with a conditional GET (If-None-Match), which costs a 304
+# when the blob is unchanged and re-downloads it when it was overwritten.
+# Size-capped LRU; meta.json's mtime is the recency marker (the deck file's mtime is left alone
+# because deck_cache memoizes hashes on it).
+BLOB_CACHE_DIR = get_env("BLOB_CACHE_DIR", os.path.join(tempfile.gettempdir(), "ppt_blob_cache"))
+BLOB_CACHE_MAX_MB = float(get_env("BLOB_CACHE_MAX_MB", "2048"))
+BLOB_CACHE_FRESH_SECONDS = float(get_env("BLOB_CACHE_FRESH_SECONDS", "60"))
+# entries used within this many seconds are never evicted: the returned path is held in
+# Streamlit session state (ppt_path) and opened again by later pages of the same session
+BLOB_CACHE_MIN_AGE = float(get_env("BLOB_CACHE_MIN_AGE", "21600"))
+# parallel ranged GETs per download; only blobs larger than the client's single-GET size use them
+BLOB_DOWNLOAD_CONCURRENCY = int(get_env("BLOB_DOWNLOAD_CONCURRENCY", "4"))
+
+_lock = threading.Lock()
+_key_locks = {}      # entry dir -> [Lock, callers], so concurrent callers download a blob once
+_stats = {"fresh_hits": 0, "revalidated": 0, "downloads": 0, "evictions": 0}
+
+
+def _entry_dir(container_name, blob_name):
+    key = hashlib.sha256(f"{container_name}|{blob_name}".encode("utf-8")).hexdigest()
+    return os.path.join(BLOB_CACHE_DIR, key[:2], key)
+
+
+def _local_name(blob_name):
+    # keeps the deck's basename (slide ids are derived from it); the entry dir makes it unique
+    return blob_name.replace("/", "_").replace("\\", "_")
+
+
+def _read_meta(entry):
+    try:
+        with open(os.path.join(entry, "meta.json"), "r", encoding="utf-8") as fp:
+            return json.load(fp)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_meta(entry, meta):
+    path = os.path.join(entry, "meta.json")
+    tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp, "w", encoding="utf-8") as fp:
+        json.dump(meta, fp)
+    os.replace(tmp, path)
+
+
+def _download(container_client, blob_name, path, etag=None):
+    """
+    Stream the blob into path (atomically). With etag, the GET is conditional and None is
+    returned if the blob is unchanged; otherwise the new ETag is returned.
+    """
+    kwargs = {"etag": etag, "match_condition": MatchConditions.IfModified} if etag else {}
+    tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        stream = container_client.download_blob(blob_name, max_concurrency=BLOB_DOWNLOAD_CONCURRENCY, **kwargs)
+        with open(tmp, "wb") as fp:
+            stream.readinto(fp)
+        os.replace(tmp, path)
+        return stream.properties.etag
+    except ResourceNotModifiedError:
+        return None
+    finally:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+
+
+@contextmanager
+def _entry_lock(entry):
+    """Per-entry lock, kept only while some caller holds or waits for it."""
+    with _lock:
+        slot = _key_locks.setdefault(entry, [threading.Lock(), 0])
+        slot[1] += 1
+    try:
+        with slot[0]:
+            yield
+    finally:
+        with _lock:
+            slot[1] -= 1
+            if not slot[1]:
+                del _key_locks[entry]
+
+
+def get_local_path(container_client, blob_name, container_name=None):
+    """
+    Return the path of an up-to-date local copy of blob_name. The file is shared by every
+    caller: read it, copy it, but do not modify or delete it.
+    """
+    container_name = container_name or getattr(container_client, "container_name", "")
+    entry = _entry_dir(container_name, blob_name)
+    with _entry_lock(entry):
+        path = os.path.join(entry, _local_name(blob_name))
+        meta = _read_meta(entry)
+        if meta and not os.path.exists(path):
+            meta = None
+        now = time.time()
+
+        if meta and now - meta.get("validated_at", 0) < BLOB_CACHE_FRESH_SECONDS:
+            stat = "fresh_hits"
+        else:
+            ensure_dir(entry)
+            new_etag = _download(container_client, blob_name, path, etag=meta and meta.get("etag"))
+            if new_etag is None:
+                stat = "revalidated"
+            else:
+                stat = "downloads"
+                meta = {"container": container_name, "blob": blob_name, "etag": new_etag,
+                        "size": os.path.getsize(path)}
+                logger.info(f"Blob cache downloaded {container_name}/{blob_name} ({meta['size']} bytes)")
+            meta["validated_at"] = now
+        # rewriting meta.json also refreshes its mtime, the LRU marker
+        _write_meta(entry, meta)
+
+    with _lock:
+        _stats[stat] += 1
+    if stat == "downloads":
+        evict_if_needed(keep=entry)
+    return path
+
+
+def evict_if_needed(keep=None):
+    """
+    Delete least-recently-used entries until the cache is under 90% of its budget, sparing
+    entries used within BLOB_CACHE_MIN_AGE (the budget is exceeded rather than pull a deck
+    from under a live session).
+    """
+    budget = int(BLOB_CACHE_MAX_MB * 1024 * 1024)
+    entries, total = [], 0
+    if not os.path.isdir(BLOB_CACHE_DIR):
+        return 0
+    for prefix in os.listdir(BLOB_CACHE_DIR):
+        prefix_dir = os.path.join(BLOB_CACHE_DIR, prefix)
+        if not os.path.isdir(prefix_dir):
+            continue
+        for name in os.listdir(prefix_dir):
+            entry = os.path.join(prefix_dir, name)
+            try:
+                used = os.stat(os.path.join(entry, "meta.json")).st_mtime
+                size = sum(os.path.getsize(os.path.join(entry, f)) for f in os.listdir(entry))
+            except OSError:
+                continue
+            entries.append((used, size, entry))
+            total += size
+    if total <= budget:
+        return 0
+    entries.sort()
+    target = int(budget * 0.9)
+    protect_after = time.time() - BLOB_CACHE_MIN_AGE
+    removed = 0
+    for used, size, entry in entries:
+        if total <= target or used >= protect_after:
+            break
+        if entry == keep:
+            continue
+        try:
+            # meta.json first: a half-removed entry then reads as a miss
+            os.remove(os.path.join(entry, "meta.json"))
+            for f in os.listdir(entry):
+                os.remove(os.path.join(entry, f))
+            os.rmdir(entry)
+            total -= size
+            removed += 1
+        except OSError:
+            # e.g. the deck is open in PowerPoint on Windows; try again next time
+            pass
+    with _lock:
+        _stats["evictions"] += removed
+    logger.info(f"Blob cache evicted {removed} deck(s)")
+    return removed
+
+
+def blob_cache_stats():
+    with _lock:
+        stats = dict(_stats)
+    lookups = stats["fresh_hits"] + stats["revalidated"] + stats["downloads"]
+    stats["hit_rate"] = (stats["fresh_hits"] + stats["revalidated"]) / lookups if lookups else 0.0
+    return stats
@@ -0,0 +1,99 @@
+# deck_cache.py
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from pptx import Presentation
+from utils import get_env, logger
+
+# Process-wide cache of parsed decks so extraction, preview and generation parse each file once.
+# Entries are keyed by (absolute path, sha256 of contents): an overwritten file is a new entry.
+DECK_CACHE_MAX_DECKS = int(get_env("DECK_CACHE_MAX_DECKS", "16"))
+DECK_CACHE_MAX_MB = float(get_env("DECK_CACHE_MAX_MB", "512"))
+# python-pptx keeps every part in memory plus parsed XML; ~3x the file size is a fair estimate
+_MEMORY_FACTOR = 3
+
+_lock = threading.Lock()
+_decks = OrderedDict()       # (path, sha256) -> (Presentation, approx_bytes)
+_hash_memo = {}              # path -> (mtime_ns, size, sha256)
+_parse_locks = {}            # (path, sha256) -> Lock, so concurrent callers parse once
+_stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+
+def file_sha256(path):
+    """sha256 of a file, memoized on (mtime, size) so repeat lookups cost one stat()."""
+    path = os.path.abspath(path)
+    st = os.stat(path)
+    memo = _hash_memo.get(path)
+    if memo and memo[0] == st.st_mtime_ns and memo[1] == st.st_size:
+        return memo[2]
+    digest = hashlib.sha256()
+    with open(path, "rb") as fp:
+        for chunk in iter(lambda: fp.read(1024 * 1024), b""):
+            digest.update(chunk)
+    sha = digest.hexdigest()
+    _hash_memo[path] = (st.st_mtime_ns, st.st_size, sha)
+    return sha
+
+
+def _evict_locked():
+    budget = int(DECK_CACHE_MAX_MB * 1024 * 1024)
+    total = sum(size for _, size in _decks.values())
+    while _decks and (len(_decks) > DECK_CACHE_MAX_DECKS or total > budget):
+        (path, _), (_, size) = _decks.popitem(last=False)
+        total -= size
+        _stats["evictions"] += 1
+        logger.debug(f"Deck cache evicted {path}")
+
+
+def get_presentation(ppt_path):
+    """
+    Return a parsed Presentation for ppt_path, reusing the cached one when the file is unchanged.
+    The returned object is shared: treat it as read-only (clone slides/shapes before editing).
+    """
+    path = os.path.abspath(ppt_path)
+    key = (path, file_sha256(path))
+    with _lock:
+        if key in _decks:
+            _decks.move_to_end(key)
+            _stats["hits"] += 1
+            return _decks[key][0]
+        parse_lock = _parse_locks.setdefault(key, threading.Lock())
+
+    with parse_lock:
+        with _lock:
+            if key in _decks:
+                _decks.move_to_end(key)
+                _stats["hits"] += 1
+                return _decks[key][0]
+        prs = Presentation(path)
+        with _lock:
+            _stats["misses"] += 1
+            # drop stale versions of the same path
+            for old in [k for k in _decks if k[0] == path]:
+                del _decks[old]
+            _decks[key] = (prs, os.path.getsize(path) * _MEMORY_FACTOR)
+            _parse_locks.pop(key, None)
+            _evict_locked()
+    return prs
+
+
+def slide_count(ppt_path):
+    return len(get_presentation(ppt_path).slides)
+
+
+def evict(ppt_path):
+    """Forget every cached version of ppt_path."""
+    path = os.path.abspath(ppt_path)
+    with _lock:
+        for key in [k for k in _decks if k[0] == path]:
+            del _decks[key]
+        _hash_memo.pop(path, None)
+
+
+def deck_cache_stats():
+    with _lock:
+        stats = dict(_stats)
+        stats["decks"] = len(_decks)
+        stats["approx_bytes"] = sum(size for _, size in _decks.values())
+    return stats
@@ -0,0 +1,45 @@
+# deck_loader.py
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from utils import get_env, logger
+from azure_blob_utils import get_source_ppt_path
+
+# Post-search load stage: every matched deck is fetched (blob cache, ranged parallel GETs for
+# large files) and extracted as soon as it is local, all decks at once, so the stage takes about
+# as long as the slowest single deck instead of the sum. Threads, not processes: the work is
+# network waits plus render-pool round trips, and extraction shares deck_cache with the app.
+DECK_LOAD_WORKERS = int(get_env("DECK_LOAD_WORKERS", "8"))
+
+_executor = ThreadPoolExecutor(max_workers=DECK_LOAD_WORKERS, thread_name_prefix="deck-load")
+
+
+def _load_one(blob_name, extract):
+    local_path = get_source_ppt_path(blob_name)
+    return local_path, (extract(local_path) if extract else None)
+
+
+def submit_deck(blob_name, extract=None):
+    """Queue one deck; the Future resolves to (local_path, extract(local_path) or None)."""
+    return _executor.submit(_load_one, blob_name, extract)
+
+
+def submit_extract(fn, *args):
+    """Queue an extraction step for a deck that is already local (same pool as the downloads)."""
+    return _executor.submit(fn, *args)
+
+
+def load_decks(blob_names, extract=None):
+    """
+    Download blob_names concurrently and call extract(local_path) on each deck once it is local.
+    Returns {blob_name: (local_path, extract result)} in input order; a deck that fails is
+    logged and left out.
+    """
+    blob_names = list(dict.fromkeys(blob_names))
+    futures = {submit_deck(blob_name, extract): blob_name for blob_name in blob_names}
+    loaded = {}
+    for fut in as_completed(futures):
+        blob_name = futures[fut]
+        try:
+            loaded[blob_name] = fut.result()
+        except Exception as e:
+            logger.exception(f"Failed to load deck {blob_name}: {e}")
+    return {b: loaded[b] for b in blob_names if b in loaded}
@@ -0,0 +1,213 @@
+# embedding_batcher.py
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from utils import get_env, logger
+
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("cl100k_base")
+except Exception:  # tiktoken is optional; fall back to a chars/4 estimate
+    _ENCODING = None
+
+# Per-request limits (Azure OpenAI embeddings: 2048 inputs, 8191 tokens per input).
+EMBED_MAX_BATCH_ITEMS = int(get_env("EMBED_MAX_BATCH_ITEMS", "256"))
+EMBED_MAX_BATCH_TOKENS = int(get_env("EMBED_MAX_BATCH_TOKENS", "60000"))
+EMBED_MAX_INPUT_TOKENS = int(get_env("EMBED_MAX_INPUT_TOKENS", "8191"))
+# Concurrency and deployment quota (0 = unlimited). Both are process-wide: every caller
+# (ingestion embed workers, reembed, search) shares one pool of EMBED_CONCURRENCY requests
+# and one rate window per model, so together they stay within the deployment's quota.
+EMBED_CONCURRENCY = int(get_env("EMBED_CONCURRENCY", "4"))
+EMBED_REQUESTS_PER_MIN = int(get_env("EMBED_REQUESTS_PER_MIN", "0"))
+EMBED_TOKENS_PER_MIN = int(get_env("EMBED_TOKENS_PER_MIN", "0"))
+EMBED_MAX_RETRIES = int(get_env("EMBED_MAX_RETRIES", "6"))
+
+_executor = ThreadPoolExecutor(max_workers=EMBED_CONCURRENCY, thread_name_prefix="embed-batch")
+_limiters = {}      # (model, rpm, tpm) -> _RateLimiter
+_limiters_lock = threading.Lock()
+
+
+def count_tokens(text):
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text, disallowed_special=()))
+    return len(text) // 4 + 1
+
+
+def _truncate(text, max_tokens):
+    if count_tokens(text) <= max_tokens:
+        return text
+    if _ENCODING is not None:
+        return _ENCODING.decode(_ENCODING.encode(text, disallowed_special=())[:max_tokens])
+    return text[:max_tokens * 4]
+
+
+def split_batches(texts, max_items=None, max_tokens=None):
+    """
+    Split texts into batches bounded by item count and token count.
+    Returns [(start_index, [texts...], token_count), ...] preserving order.
+    """
+    max_items = max_items or EMBED_MAX_BATCH_ITEMS
+    max_tokens = max_tokens or EMBED_MAX_BATCH_TOKENS
+    batches, cur, cur_tokens, start = [], [], 0, 0
+    for i, text in enumerate(texts):
+        n = count_tokens(text)
+        if cur and (len(cur) >= max_items or cur_tokens + n > max_tokens):
+            batches.append((start, cur, cur_tokens))
+            cur, cur_tokens, start = [], 0, i
+        cur.append(text)
+        cur_tokens += n
+    if cur:
+        batches.append((start, cur, cur_tokens))
+    return batches
+
+
+class _RateLimiter:
+    """Sliding one-minute window over requests and tokens, shared by all workers."""
+
+    def __init__(self, requests_per_min, tokens_per_min):
+        self.rpm = requests_per_min
+        self.tpm = tokens_per_min
+        self.events = []            # (timestamp, tokens)
+        self.paused_until = 0.0     # set from retry-after on 429
+        self.lock = threading.Lock()
+
+    def pause(self, seconds):
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def acquire(self, tokens):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.events = [(t, n) for t, n in self.events if now - t < 60]
+                wait = self.paused_until - now
+                if wait <= 0:
+                    used_tokens = sum(n for _, n in self.events)
+                    over_rpm = self.rpm and len(self.events) >= self.rpm
+                    # a single batch larger than the whole budget is let through on an empty window
+                    over_tpm = self.tpm and self.events and used_tokens + tokens > self.tpm
+                    if not over_rpm and not over_tpm:
+                        self.events.append((now, tokens))
+                        return
+                    wait = 60 - (now - self.events[0][0])
+            time.sleep(max(wait, 0.05))
+
+
+def _get_limiter(model, requests_per_min, tokens_per_min):
+    """The rate window for one model deployment, shared by every caller in the process."""
+    key = (model, requests_per_min, tokens_per_min)
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limiter = _limiters[key] = _RateLimiter(requests_per_min, tokens_per_min)
+        return limiter
+
+
+def _retry_after_seconds(err):
+    """Read retry-after-ms / retry-after from an OpenAI error response, if present."""
+    headers = getattr(getattr(err, "response", None), "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000.0
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        pass
+    return None
+
+
+def _status_code(err):
+    return getattr(err, "status_code", None) or getattr(getattr(err, "response", None), "status_code", None)
+
+
+def _input_rejected(err):
+    """
+    A 400 caused by the inputs of the batch (an over-long or invalid input, a content filter)
+    rather than by the request itself (deployment, dimensions, api-version): only then can
+    splitting the batch help.
+    """
+    if _status_code(err) != 400:
+        return False
+    body = getattr(err, "body", None)
+    params = [getattr(err, "param", None)]
+    details = [str(err), str(getattr(err, "code", "") or "")]
+    if isinstance(body, dict):
+        params.append(body.get("param"))
+        details += [str(body.get("code") or ""), str(body.get("message") or "")]
+    text = " ".join(details).lower()
+    return ("input" in params
+            or any(s in text for s in ("context_length", "maximum context length", "content_filter",
+                                       "invalid_input", "'input'", "$.input")))
+
+
+def embed_texts(client, model, texts, concurrency=None, requests_per_min=None, tokens_per_min=None,
+                max_retries=None, dimensions=None):
+    """
+    Embed `texts` in token/item-bounded batches sent concurrently (on the shared pool) within
+    the model's process-wide request/token rate. 429s back off using retry-after and pause every
+    caller of that model; only failing batches are retried, and a batch rejected for one of its
+    inputs is split to isolate the bad input. Any other 400 (wrong deployment or dimensions, bad
+    api-version) fails every batch alike, so it is raised at once instead.
+    `dimensions` asks text-embedding-3 models for shortened vectors.
+    Returns a list aligned with `texts`; items that could not be embedded are None.
+    """
+    if not texts:
+        return []
+    concurrency = concurrency or EMBED_CONCURRENCY
+    max_retries = EMBED_MAX_RETRIES if max_retries is None else max_retries
+    limiter = _get_limiter(model,
+                           requests_per_min if requests_per_min is not None else EMBED_REQUESTS_PER_MIN,
+                           tokens_per_min if tokens_per_min is not None else EMBED_TOKENS_PER_MIN)
+    # we own retries here; the SDK's built-in retry would double-count against the quota
+    api = client.with_options(max_retries=0) if hasattr(client, "with_options") else client
+
+    # the API rejects empty strings and over-long inputs
+    inputs = [_truncate(t, EMBED_MAX_INPUT_TOKENS) if t and t.strip() else " " for t in texts]
+    results = [None] * len(texts)
+
+    def run_batch(start, batch, tokens):
+        attempt = 0
+        while True:
+            limiter.acquire(tokens)
+            try:
+                extra = {"dimensions": dimensions} if dimensions else {}
+                resp = api.embeddings.create(model=model, input=batch, **extra)
+                for d in resp.data:
+                    results[start + d.index] = d.embedding
+                return
+            except Exception as e:
+                status = _status_code(e)
+                if status == 400 and not _input_rejected(e):
+                    logger.error(f"Embedding request rejected ({model}): {e}")
+                    raise
+                if status == 400 and len(batch) > 1:
+                    mid = len(batch) // 2
+                    run_batch(start, batch[:mid], count_tokens(" ".join(batch[:mid])))
+                    run_batch(start + mid, batch[mid:], count_tokens(" ".join(batch[mid:])))
+                    return
+                retryable = status in (None, 408, 409, 429) or (status or 0) >= 500
+                if not retryable or attempt >= max_retries:
+                    logger.error(f"Embedding batch [{start}:{start + len(batch)}] failed permanently: {e}")
+                    return
+                delay = _retry_after_seconds(e) or min(60.0, (2 ** attempt) + random.random())
+                if status == 429:
+                    limiter.pause(delay)
+                logger.warning(f"Embedding batch [{start}:{start + len(batch)}] failed ({status}); "
+                               f"retry {attempt + 1}/{max_retries} in {delay:.1f}s")
+                time.sleep(delay)
+                attempt += 1
+
+    # batches go to the shared pool, at most `concurrency` of this call's in flight at a time
+    pending, in_flight = list(reversed(split_batches(inputs))), set()
+    while pending or in_flight:
+        while pending and len(in_flight) < concurrency:
+            in_flight.add(_executor.submit(run_batch, *pending.pop()))
+        done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+        for fut in done:
+            fut.result()
+
+    failed = sum(1 for r in results if r is None)
+    if failed:
+        logger.warning(f"{failed}/{len(texts)} texts could not be embedded")
+    return results
@@ -0,0 +1,196 @@
+# embedding_cache.py
+import os
+import time
+import hashlib
+import sqlite3
+import threading
+import unicodedata
+from array import array
+from utils import get_env, logger, ensure_dir
+
+# On-disk cache shared by ingestion (slide text) and search (user prompts).
+# Key = sha256(model | dim | sha256(normalized text)); value = float32 vector.
+EMBEDDING_CACHE_PATH = get_env("EMBEDDING_CACHE_PATH", "./embedding_cache/embeddings.sqlite3")
+EMBEDDING_CACHE_MAX_MB = float(get_env("EMBEDDING_CACHE_MAX_MB", "512"))
+EMBEDDING_CACHE_ENABLED = get_env("EMBEDDING_CACHE_ENABLED", "true").lower() not in ("0", "false", "no")
+
+_lock = threading.Lock()
+_initialized = False
+_stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+
+
+def _connect():
+    global _initialized
+    if not _initialized:
+        ensure_dir(os.path.dirname(os.path.abspath(EMBEDDING_CACHE_PATH)))
+    conn = sqlite3.connect(EMBEDDING_CACHE_PATH, timeout=30)
+    if not _initialized:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key       TEXT PRIMARY KEY,
+                model     TEXT,
+                dim       INTEGER,
+                vector    BLOB,
+                nbytes    INTEGER,
+                last_used REAL
+            )
+            """
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings(last_used)")
+        # running size of the table, kept in the same transaction as every write, so the budget
+        # check never scans the table (seeded once from caches that predate it)
+        conn.execute("CREATE TABLE IF NOT EXISTS cache_size (id INTEGER PRIMARY KEY CHECK (id = 0), total_bytes INTEGER)")
+        conn.execute("INSERT OR IGNORE INTO cache_size SELECT 0, COALESCE(SUM(nbytes), 0) FROM embeddings")
+        conn.commit()
+        _initialized = True
+    return conn
+
+
+def normalize_text(text):
+    """Normalize text so trivially different copies (whitespace, unicode forms) share a key."""
+    return " ".join(unicodedata.normalize("NFC", text or "").split())
+
+
+def cache_key(text, model, dim):
+    text_hash = hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+    return hashlib.sha256(f"{model}|{dim}|{text_hash}".encode("utf-8")).hexdigest()
+
+
+def _encode(vec):
+    return array("f", vec).tobytes()
+
+
+def _decode(blob):
+    vec = array("f")
+    vec.frombytes(blob)
+    return vec.tolist()
+
+
+def get_many(texts, model, dim):
+    """Return a list aligned with `texts`: cached vector or None for each."""
+    if not EMBEDDING_CACHE_ENABLED or not texts:
+        return [None] * len(texts)
+    keys = [cache_key(t, model, dim) for t in texts]
+    found = {}
+    try:
+        with _connect() as conn:
+            unique = list(set(keys))
+            for i in range(0, len(unique), 500):  # stay under SQLite's bound-parameter limit
+                chunk = unique[i:i + 500]
+                marks = ",".join("?" * len(chunk))
+                for key, blob in conn.execute(f"SELECT key, vector FROM embeddings WHERE key IN ({marks})", chunk):
+                    found[key] = _decode(blob)
+                if found:
+                    conn.execute(
+                        f"UPDATE embeddings SET last_used = ? WHERE key IN ({marks})",
+                        [time.time()] + chunk
+                    )
+    except Exception as e:
+        logger.warning(f"Embedding cache read failed: {e}")
+    out = [found.get(k) for k in keys]
+    hits = sum(1 for v in out if v is not None)
+    with _lock:
+        _stats["hits"] += hits
+        _stats["misses"] += len(out) - hits
+    return out
+
+
+def put_many(texts, embeddings, model, dim):
+    """Store vectors for `texts`, then evict least-recently-used rows if over budget."""
+    if not EMBEDDING_CACHE_ENABLED or not texts:
+        return
+    now = time.time()
+    rows = {}
+    for text, vec in zip(texts, embeddings):
+        if vec is None:
+            continue
+        blob = _encode(vec)
+        key = cache_key(text, model, dim)
+        rows[key] = (key, model, dim, blob, len(blob), now)
+    if not rows:
+        return
+    try:
+        with _connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            replaced = 0
+            keys = list(rows)
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                replaced += conn.execute(
+                    f"SELECT COALESCE(SUM(nbytes), 0) FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})",
+                    chunk
+                ).fetchone()[0]
+            conn.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?, ?, ?)", rows.values())
+            conn.execute("UPDATE cache_size SET total_bytes = total_bytes + ? WHERE id = 0",
+                         (sum(r[4] for r in rows.values()) - replaced,))
+            total = conn.execute("SELECT total_bytes FROM cache_size WHERE id = 0").fetchone()[0]
+        with _lock:
+            _stats["writes"] += len(rows)
+        if total > int(EMBEDDING_CACHE_MAX_MB * 1024 * 1024):
+            _evict_if_needed()
+    except Exception as e:
+        logger.warning(f"Embedding cache write failed: {e}")
+
+
+def _evict_if_needed():
+    budget = int(EMBEDDING_CACHE_MAX_MB * 1024 * 1024)
+    with _connect() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        total = conn.execute("SELECT total_bytes FROM cache_size WHERE id = 0").fetchone()[0]
+        if total <= budget:
+            return
+        # trim to 90% of budget so we don't evict on every subsequent write
+        target = total - int(budget * 0.9)
+        freed, victims = 0, []
+        for key, nbytes in conn.execute("SELECT key, nbytes FROM embeddings ORDER BY last_used ASC"):
+            victims.append((key,))
+            freed += nbytes
+            if freed >= target:
+                break
+        conn.executemany("DELETE FROM embeddings WHERE key = ?", victims)
+        conn.execute("UPDATE cache_size SET total_bytes = total_bytes - ? WHERE id = 0", (freed,))
+    with _lock:
+        _stats["evictions"] += len(victims)
+    logger.info(f"Embedding cache evicted {len(victims)} vectors ({freed / 1e6:.1f} MB)")
+
+
+def cached_embed(texts, model, dim, embed_fn):
+    """
+    Return embeddings for `texts`, calling `embed_fn(list_of_texts)` only for cache misses
+    (each distinct miss is sent once). Failed items come back as None.
+    """
+    out = get_many(texts, model, dim)
+    missing = {}
+    for i, vec in enumerate(out):
+        if vec is None:
+            missing.setdefault(cache_key(texts[i], model, dim), []).append(i)
+    if not missing:
+        return out
+
+    miss_texts = [texts[idxs[0]] for idxs in missing.values()]
+    fresh = embed_fn(miss_texts) or []
+    if len(fresh) != len(miss_texts):
+        logger.error(f"Embedding call returned {len(fresh)} vectors for {len(miss_texts)} texts")
+        return out
+    put_many(miss_texts, fresh, model, dim)
+    for idxs, vec in zip(missing.values(), fresh):
+        for i in idxs:
+            out[i] = vec
+    return out
+
+
+def cache_stats():
+    """Hit/miss counters for this process plus on-disk size."""
+    with _lock:
+        stats = dict(_stats)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+    try:
+        with _connect() as conn:
+            stats["entries"] = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            stats["bytes"] = conn.execute("SELECT total_bytes FROM cache_size WHERE id = 0").fetchone()[0]
+    except Exception:
+        pass
+    return stats
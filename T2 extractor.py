@@ -1,27 +1,27 @@
 # slide_extractor.py
 import os
+import shutil
 import tempfile
 import uuid
 from copy import deepcopy
 from pptx import Presentation
 from pptx.util import Inches, Pt
 from PIL import Image, ImageDraw, ImageFont
-from utils import get_env, logger
-from azure.storage.blob import BlobServiceClient
+from utils import get_env, logger, get_blob_service_client
+import blob_cache
 
 AZURE_CONN = get_env("AZURE_BLOB_CONN", required=True)
 BLOB_CONTAINER = get_env("AZURE_BLOB_CONTAINER", "ppt-dataset")
 
 def download_blob_to_local(blob_name: str, dest_path: str):
     """
-    Download blob from the source container to a local file path.
+    Download blob from the source container to a local file path (via the blob cache).
     """
     try:
-        blob_service = BlobServiceClient.from_connection_string(AZURE_CONN)
-        container_client = blob_service.get_container_client(BLOB_CONTAINER)
-        with open(dest_path, "wb") as fp:
-            stream = container_client.download_blob(blob_name)
-            stream.readinto(fp)
+        container_client = get_blob_service_client(AZURE_CONN).get_container_client(BLOB_CONTAINER)
+        cached_path = blob_cache.get_local_path(container_client, blob_name, BLOB_CONTAINER)
+        if os.path.abspath(dest_path) != os.path.abspath(cached_path):
+            shutil.copyfile(cached_path, dest_path)
         return dest_path
     except Exception as e:
         logger.exception(f"Failed to download blob {blob_name}: {e}")
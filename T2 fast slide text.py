@@ -0,0 +1,261 @@
+# pptx_fast_text.py
+"""
+Fast slide text extraction straight from the .pptx zip.
+
+Reads ppt/presentation.xml for slide order and streams each ppt/slides/slideN.xml with
+iterparse, one top-level shape at a time, instead of building the python-pptx object model.
+Text follows python-pptx's `shape.text` conventions (paragraphs joined with "\\n", line
+breaks as "\\v") so ids/hashes built from it stay comparable.
+
+Benchmark against the python-pptx path:
+    python pptx_fast_text.py deck1.pptx [deck2.pptx ...] [--repeat 5]
+"""
+import sys
+import time
+import zipfile
+import posixpath
+import xml.etree.ElementTree as ET
+from utils import logger
+
+NS = {
+    "p": "http://schemas.openxmlformats.org/presentationml/2006/main",
+    "a": "http://schemas.openxmlformats.org/drawingml/2006/main",
+    "r": "http://schemas.openxmlformats.org/officeDocument/2006/relationships",
+    "rel": "http://schemas.openxmlformats.org/package/2006/relationships",
+    "mc": "http://schemas.openxmlformats.org/markup-compatibility/2006",
+}
+_P = "{%s}" % NS["p"]
+_A = "{%s}" % NS["a"]
+_R = "{%s}" % NS["r"]
+_MC = "{%s}" % NS["mc"]
+
+# Recorded on every indexed slide. Bump it whenever the extracted text changes (new shape kinds,
+# joining rules): content hashes, and with them slide ids, change too, so each deck re-indexed
+# afterwards is re-embedded in full once. "zip-1" added group and table text to python-pptx's.
+TEXT_EXTRACTOR_VERSION = "zip-1"
+
+_TITLE_TYPES = ("title", "ctrTitle")
+_NOTES_REL = "/notesSlide"
+# spTree children sit at depth 4: p:sld > p:cSld > p:spTree > shape
+_SHAPE_DEPTH = 4
+
+
+def _rels(zf, part_name):
+    """Return {rId: (type, absolute_part_name)} for a part."""
+    folder, name = posixpath.split(part_name)
+    rels_name = posixpath.join(folder, "_rels", name + ".rels")
+    try:
+        root = ET.fromstring(zf.read(rels_name))
+    except KeyError:
+        return {}
+    out = {}
+    for rel in root.findall("rel:Relationship", NS):
+        target = rel.get("Target", "")
+        if rel.get("TargetMode") == "External":
+            continue
+        if target.startswith("/"):
+            path = target.lstrip("/")
+        else:
+            path = posixpath.normpath(posixpath.join(folder, target))
+        out[rel.get("Id")] = (rel.get("Type", ""), path)
+    return out
+
+
+def slide_part_names(zf):
+    """Slide part names in presentation order (sldIdLst), not file-name order."""
+    rels = _rels(zf, "ppt/presentation.xml")
+    root = ET.fromstring(zf.read("ppt/presentation.xml"))
+    names = []
+    for sld in root.iterfind("p:sldIdLst/p:sldId", NS):
+        rel = rels.get(sld.get(_R + "id"))
+        if rel:
+            names.append(rel[1])
+    return names
+
+
+def _paragraph_text(p_el):
+    parts = []
+    for child in p_el:
+        if child.tag in (_A + "r", _A + "fld"):
+            t = child.find("a:t", NS)
+            if t is not None and t.text:
+                parts.append(t.text)
+        elif child.tag == _A + "br":
+            parts.append("\v")
+    return "".join(parts)
+
+
+def _txbody_text(tx_body):
+    if tx_body is None:
+        return ""
+    return "\n".join(_paragraph_text(p) for p in tx_body.findall("a:p", NS)).strip()
+
+
+def _sp_text(sp):
+    return _txbody_text(sp.find("p:txBody", NS))
+
+
+def _placeholder_type(sp):
+    ph = sp.find("p:nvSpPr/p:nvPr/p:ph", NS)
+    if ph is None:
+        return None
+    return ph.get("type", "body")
+
+
+def _group_texts(grp):
+    """Text of every text shape inside a group (nested groups included), in order."""
+    out = []
+    for el in grp:
+        if el.tag == _P + "sp":
+            text = _sp_text(el)
+            if text:
+                out.append(text)
+        elif el.tag == _P + "grpSp":
+            out.extend(_group_texts(el))
+        elif el.tag == _P + "graphicFrame":
+            text = _table_text(el)
+            if text:
+                out.append(text)
+    return out
+
+
+def _table_text(frame):
+    rows = []
+    for tr in frame.iterfind(".//a:tbl/a:tr", NS):
+        cells = [_txbody_text(tc.find("a:txBody", NS)) for tc in tr.findall("a:tc", NS)]
+        if any(cells):
+            rows.append(" | ".join(cells))
+    return "\n".join(rows)
+
+
+def _unwrap_alternate_content(el):
+    """mc:AlternateContent -> the first shape in its Choice (or Fallback) branch."""
+    for branch in ("mc:Choice", "mc:Fallback"):
+        for b in el.findall(branch, NS):
+            for child in b:
+                return child
+    return None
+
+
+def _notes_text(zf, notes_part):
+    try:
+        root = ET.fromstring(zf.read(notes_part))
+    except KeyError:
+        return ""
+    texts = []
+    for sp in root.iterfind(".//p:sp", NS):
+        if _placeholder_type(sp) == "body":
+            text = _sp_text(sp)
+            if text:
+                texts.append(text)
+    return "\n".join(texts)
+
+
+def _parse_slide(zf, part_name, index, with_notes=True):
+    slide = {"index": index, "title": "", "body": [], "groups": [], "tables": [], "notes": "", "texts": []}
+    depth = 0
+    with zf.open(part_name) as fp:
+        for event, el in ET.iterparse(fp, events=("start", "end")):
+            if event == "start":
+                depth += 1
+                continue
+            depth -= 1
+            if depth != _SHAPE_DEPTH - 1:
+                continue
+            shape = _unwrap_alternate_content(el) if el.tag == _MC + "AlternateContent" else el
+            if shape is None:
+                pass
+            elif shape.tag == _P + "sp":
+                text = _sp_text(shape)
+                if text:
+                    if not slide["title"] and _placeholder_type(shape) in _TITLE_TYPES:
+                        slide["title"] = text
+                    else:
+                        slide["body"].append(text)
+                    slide["texts"].append(text)
+            elif shape.tag == _P + "grpSp":
+                texts = _group_texts(shape)
+                slide["groups"].extend(texts)
+                slide["texts"].extend(texts)
+            elif shape.tag == _P + "graphicFrame":
+                text = _table_text(shape)
+                if text:
+                    slide["tables"].append(text)
+                    slide["texts"].append(text)
+            el.clear()  # keep memory flat for big slides
+
+    if with_notes:
+        for rel_type, target in _rels(zf, part_name).values():
+            if rel_type.endswith(_NOTES_REL):
+                slide["notes"] = _notes_text(zf, target)
+                break
+    slide["text"] = "\n".join(slide["texts"])
+    return slide
+
+
+def extract_slide_texts(pptx_path, with_notes=True, slide_indices=None):
+    """
+    Return one dict per slide in presentation order:
+    {
+      "index": int, "title": str, "body": [str], "groups": [str], "tables": [str],
+      "notes": str, "texts": [str],   # texts = every text block in document order
+      "text": str                     # "\\n".join(texts)
+    }
+    With slide_indices only those slides are parsed (out-of-range indices are skipped).
+    """
+    with zipfile.ZipFile(pptx_path) as zf:
+        names = slide_part_names(zf)
+        indices = range(len(names)) if slide_indices is None else sorted(set(slide_indices))
+        return [_parse_slide(zf, names[i], i, with_notes) for i in indices if 0 <= i < len(names)]
+
+
+def slide_count(pptx_path):
+    """Number of slides, read from presentation.xml only."""
+    with zipfile.ZipFile(pptx_path) as zf:
+        return len(slide_part_names(zf))
+
+
+# ------------------------------------------------------------
+# BENCHMARK vs python-pptx
+# ------------------------------------------------------------
+def _extract_with_python_pptx(pptx_path):
+    from pptx import Presentation
+    prs = Presentation(pptx_path)
+    out = []
+    for i, slide in enumerate(prs.slides):
+        texts = [shape.text.strip() for shape in slide.shapes
+                 if hasattr(shape, "text") and shape.text and shape.text.strip()]
+        out.append({"index": i, "text": "\n".join(texts)})
+    return out
+
+
+def benchmark(paths, repeat=5):
+    """Time both extractors over `paths`; returns {"python_pptx": s, "fast": s, "speedup": x}."""
+    def best_of(fn):
+        best = float("inf")
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            for p in paths:
+                fn(p)
+            best = min(best, time.perf_counter() - t0)
+        return best
+
+    slow = best_of(_extract_with_python_pptx)
+    fast = best_of(lambda p: extract_slide_texts(p, with_notes=True))
+    result = {"python_pptx": slow, "fast": fast, "speedup": slow / fast if fast else float("inf")}
+    logger.info(f"python-pptx: {slow * 1000:.1f} ms  fast: {fast * 1000:.1f} ms  "
+                f"speedup: {result['speedup']:.1f}x over {len(paths)} deck(s), best of {repeat}")
+    return result
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    repeat = 5
+    if "--repeat" in args:
+        i = args.index("--repeat")
+        repeat = int(args[i + 1])
+        del args[i:i + 2]
+    if not args:
+        print(__doc__)
+        sys.exit(1)
+    benchmark(args, repeat=repeat)
@@ -10,6 +10,7 @@ from pptx.enum.text import MSO_AUTO_SIZE
 from pptx.enum.text import PP_ALIGN
 from pptx.util import Pt
 from utils import logger
+from deck_cache import get_presentation
 
 
 def replace_text_in_shape(shape, new_text):
@@ -81,8 +82,8 @@ def generate_presentation(selected_slides_data, user_answers):
         slide_index = slide_struct["slide_index"]
         editable_shapes = slide_struct["editable_shapes"]
 
-        # Load the original PPT
-        prs = Presentation(ppt_path)
+        # Load the original PPT (cached; only read from, never modified)
+        prs = get_presentation(ppt_path)
         source_slide = prs.slides[slide_index]
 
         # Clone the slide into new deck
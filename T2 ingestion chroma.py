@@ -1,50 +1,71 @@
 import os 
-import uuid
+import time
+import hashlib
+import queue
 import tempfile
-from pptx import Presentation
-from azure.storage.blob import BlobServiceClient
-from openai import AzureOpenAI
-from chromadb import PersistentClient
-from utils import get_env, logger, now_ts, get_embedding_dim
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from vector_store import ActiveCollections
+from utils import (get_env, logger, now_ts, tag_key, tag_metadata, supports_dimensions,
+                   get_text_client, get_blob_service_client, DEFAULT_EMBEDDING_MODEL)
+from pptx_fast_text import extract_slide_texts, TEXT_EXTRACTOR_VERSION
+import lexical_index
+from embedding_cache import cached_embed
+from embedding_batcher import embed_texts
+from ingestion_manifest import (
+    blob_fingerprint,
+    get_entry,
+    load_manifest,
+    is_unchanged,
+    record_indexed,
+    remove_entry,
+    migration_done,
+    record_migration,
+)
 
 # === CONFIG ===
 BLOB_CONN = get_env("AZURE_BLOB_CONN", required=True)
 BLOB_CONTAINER = get_env("AZURE_BLOB_CONTAINER", "ppt-dataset")
-EMBEDDING_MODEL = get_env("EMBEDDING_MODEL", "text-embedding-3-small")
+# only picks the model for a brand-new index; afterwards the active collection decides
+EMBEDDING_MODEL = get_env("EMBEDDING_MODEL", DEFAULT_EMBEDDING_MODEL)
 CHROMA_PERSIST_DIR = get_env("CHROMA_PERSIST_DIR", "./chroma_db")
 
-# === AZURE OPENAI CLIENT ===
-text_client = AzureOpenAI(
-    azure_endpoint=get_env("OPENAI_API_BASE", required=True),
-    api_key=get_env("OPENAI_API_KEY", required=True),
-    api_version=get_env("OPENAI_API_VERSION", "2024-05-01-preview")
-)
+# === BULK INGESTION CONFIG (per-stage concurrency) ===
+INGEST_MODE = get_env("INGEST_MODE", "pipelined")  # pipelined | sequential
+INGEST_DOWNLOAD_WORKERS = int(get_env("INGEST_DOWNLOAD_WORKERS", "8"))
+INGEST_PARSE_WORKERS = int(get_env("INGEST_PARSE_WORKERS", str(os.cpu_count() or 2)))
+INGEST_EMBED_WORKERS = int(get_env("INGEST_EMBED_WORKERS", "2"))
+INGEST_EMBED_BATCH = int(get_env("INGEST_EMBED_BATCH", "64"))    # slides per embedding request
+INGEST_WRITE_BATCH = int(get_env("INGEST_WRITE_BATCH", "256"))   # slides per Chroma write
+INGEST_QUEUE_SIZE = int(get_env("INGEST_QUEUE_SIZE", "32"))      # decks buffered between stages
+# render every slide into the thumbnail cache while the deck is local, so the UI never renders cold
+INGEST_THUMBNAILS = get_env("INGEST_THUMBNAILS", "false").lower() in ("1", "true", "yes")
+# pre-generate Q&A questions per slide (comma list of kinds: text, shapes); empty = off
+INGEST_QUESTIONS = [k.strip() for k in get_env("INGEST_QUESTIONS", "").lower().split(",") if k.strip()]
+# threads for the precompute stage (thumbnails + questions, after parse, off the download path)
+INGEST_PRECOMPUTE_WORKERS = int(get_env("INGEST_PRECOMPUTE_WORKERS", "2"))
+
+# === CLIENTS (shared registry in utils, created on first use) ===
+def _container():
+    return get_blob_service_client(BLOB_CONN).get_container_client(BLOB_CONTAINER)
 
-# === AZURE BLOB CLIENT ===
-blob_client = BlobServiceClient.from_connection_string(BLOB_CONN)
-container_client = blob_client.get_container_client(BLOB_CONTAINER)
 
 # === CHROMA CLIENT (new syntax) ===
-chroma_client = PersistentClient(path=CHROMA_PERSIST_DIR)
-try:
-    collection = chroma_client.get_collection("ppt_slides")
-except Exception:
-    collection = chroma_client.create_collection("ppt_slides")
+# model-versioned collections behind an alias file; Chroma, or NumPy when VECTOR_STORE=numpy.
+# None: the shared client for CHROMA_PERSIST_DIR is opened on first use, not at import
+# (the app imports this module).
+collections = ActiveCollections(None, EMBEDDING_MODEL, write_alias=True)
+
 
-EMBEDDING_DIM = get_embedding_dim(EMBEDDING_MODEL)
+def _collection():
+    """The serving collection (follows re-embed cut-overs)."""
+    return collections.collection()
 
 # === FUNCTIONS ===
 def extract_slides(local_path):
-    """Extract text content from all slides in a PPT."""
-    prs = Presentation(local_path)
-    slides = []
-    for i, slide in enumerate(prs.slides):
-        texts = []
-        for shape in slide.shapes:
-            if hasattr(shape, "text") and shape.text and shape.text.strip():
-                texts.append(shape.text.strip())
-        slides.append({"index": i, "text": "\n".join(texts)})
-    return slides
+    """Extract text content (incl. group and table text) from all slides, straight from the zip."""
+    return [{"index": s["index"], "title": s["title"], "text": s["text"]}
+            for s in extract_slide_texts(local_path, with_notes=False)]
 
 
 def simple_tagger(text):
@@ -64,68 +85,258 @@ def simple_tagger(text):
 
 
 def ppt_already_indexed(ppt_name):
-    """Check if PPT is already embedded in Chroma."""
+    """Check if PPT is already embedded in Chroma (metadata lookup, no vector query)."""
     try:
-        res = collection.query(where={"ppt_name": ppt_name}, n_results=1)
-        ids = res.get("ids", [[]])[0]
-        return len(ids) > 0
+        res = _collection().get(where={"ppt_name": ppt_name}, limit=1, include=[])
+        return len(res.get("ids", [])) > 0
     except Exception:
         return False
 
 
-def azure_embed_func(texts):
-    """Generate embeddings from Azure OpenAI."""
-    try:
-        resp = text_client.embeddings.create(model=EMBEDDING_MODEL, input=texts)
-        return [d.embedding for d in resp.data]
-    except Exception as e:
-        logger.exception(f"Embedding failed: {e}")
-        return []
+def _can_skip_from_listing(blob_name, entry, fingerprint):
+    """
+    Decide from listing metadata alone whether a blob needs (re-)indexing.
+    Decks indexed before the manifest existed are adopted as-is on first sight, with the
+    sha256 of their bytes (one streamed read, nothing written) so a later ETag-only change
+    is still caught by the content-hash check. If hashing fails the row has no sha256 and
+    only the ETag decides.
+    """
+    if is_unchanged(entry, fingerprint):
+        return True
+    if entry is None and ppt_already_indexed(blob_name):
+        try:
+            sha256 = _blob_sha256(blob_name)
+        except Exception as e:
+            logger.warning(f"Could not hash '{blob_name}' while adopting it: {e}")
+            sha256 = None
+        record_indexed(blob_name, fingerprint, sha256)
+        logger.info(f"Adopted '{blob_name}' into ingestion manifest (indexed before manifest existed).")
+        return True
+    return False
 
 
-def process_blob(blob_name):
-    """Download PPT, extract slides, generate embeddings, and insert into Chroma."""
-    logger.info(f"Processing blob: {blob_name}")
-    tmp_path = os.path.join(tempfile.gettempdir(), blob_name.replace("/", "_"))
-    with open(tmp_path, "wb") as fp:
-        stream = container_client.download_blob(blob_name)
-        stream.readinto(fp)
+def _api_embedder(model, dim):
+    # token-budgeted, concurrent, rate-limited batches with 429/retry handling
+    dimensions = dim if supports_dimensions(model) else None
+    return lambda texts: embed_texts(get_text_client(), model, texts, dimensions=dimensions)
 
-    slides = extract_slides(tmp_path)
-    if not slides:
-        logger.warning(f"No slides found in {blob_name}")
+
+def azure_embed_func(texts, spec=None):
+    """
+    Generate embeddings from Azure OpenAI with the model/dim of `spec` (default: the serving
+    collection); cached slide texts never hit the API.
+    Returns a list aligned with `texts`; slides that could not be embedded are None.
+    """
+    spec = spec or collections.active()
+    return cached_embed(texts, spec["model"], spec["dim"], _api_embedder(spec["model"], spec["dim"]))
+
+
+def _write_slides(ids, docs, metadatas, embeddings, stale, spec):
+    """
+    Upsert/delete in the serving collection and, while a re-embed migration runs, in its
+    target too (embedded with the target's model). `embeddings` were made for `spec`.
+    Failures in the migration target are only logged; the re-embed job's catch-up fixes them.
+    """
+    for i, target in enumerate(collections.targets()):
+        try:
+            t_ids, t_docs, t_metas, t_embs = ids, docs, metadatas, embeddings
+            if target["name"] != spec["name"] and docs:
+                t_ids, t_docs, t_metas, t_embs, _ = _drop_unembedded(
+                    ids, docs, metadatas, azure_embed_func(docs, target))
+            coll = collections.collection(target)
+            if t_docs:
+                coll.upsert(documents=t_docs, embeddings=t_embs, metadatas=t_metas, ids=t_ids)
+            if stale:
+                coll.delete(ids=stale)
+        except Exception as e:
+            if i == 0:
+                raise
+            logger.exception(f"Write to migration target {target['name']} failed: {e}")
+    if docs:
+        lexical_index.upsert_slides(ids, docs, metadatas)
+    if stale:
+        lexical_index.delete_ids(stale)
+
+
+def _drop_unembedded(ids, docs, metadatas, embeddings):
+    """Keep only slides that got an embedding; returns the filtered lists and the drop count."""
+    keep = [i for i, e in enumerate(embeddings) if e is not None]
+    dropped = len(embeddings) - len(keep)
+    return ([ids[i] for i in keep], [docs[i] for i in keep],
+            [metadatas[i] for i in keep], [embeddings[i] for i in keep], dropped)
+
+
+def _blob_sha256(blob_name):
+    """sha256 of a blob's bytes, streamed without keeping a copy."""
+    digest = hashlib.sha256()
+    for chunk in _container().download_blob(blob_name).chunks():
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _download_to_temp(blob_name):
+    """
+    Download a blob into its own temp file; returns (local_path, sha256 of the bytes).
+    The file is unique per call ("a/b.pptx" and "a_b.pptx" may download at the same time);
+    the caller removes it.
+    """
+    fd, tmp_path = tempfile.mkstemp(suffix=os.path.splitext(blob_name)[1] or ".pptx", prefix="ingest_")
+    digest = hashlib.sha256()
+    try:
+        with os.fdopen(fd, "wb") as fp:
+            stream = _container().download_blob(blob_name)
+            for chunk in stream.chunks():
+                digest.update(chunk)
+                fp.write(chunk)
+    except BaseException:
+        _remove_quietly(tmp_path)
+        raise
+    return tmp_path, digest.hexdigest()
+
+
+def _prerender_thumbnails(tmp_path):
+    """Fill the thumbnail cache for every slide of a downloaded deck (INGEST_THUMBNAILS)."""
+    if not INGEST_THUMBNAILS:
         return
+    try:
+        import zipfile
+        from pptx_fast_text import slide_part_names
+        from render_pool import get_render_pool
+        with zipfile.ZipFile(tmp_path) as zf:
+            count = len(slide_part_names(zf))
+        paths = get_render_pool().submit_cached(tmp_path, range(count)).result()
+        logger.info(f"Thumbnails ready for {sum(1 for p in paths if p)}/{count} slide(s) of {tmp_path}")
+    except Exception as e:
+        logger.warning(f"Thumbnail prerender failed for {tmp_path}: {e}")
+
 
-    if ppt_already_indexed(blob_name):
-        logger.info(f"Skipping '{blob_name}' — already indexed in Chroma.")
+def _precompute_questions(tmp_path, slides):
+    """Store Q&A questions for every parsed slide of a downloaded deck (INGEST_QUESTIONS)."""
+    if not INGEST_QUESTIONS:
         return
+    try:
+        from slide_questions import precompute_questions
+        done = precompute_questions(tmp_path, slides, INGEST_QUESTIONS)
+        logger.info(f"Questions ready for {len(slides)} slide(s) of {tmp_path}; generated now: {done}")
+    except Exception as e:
+        logger.warning(f"Question precompute failed for {tmp_path}: {e}")
+
+
+def slide_uid(ppt_name, slide_index, content_hash):
+    """Deterministic Chroma id: same deck + position + text always maps to the same id."""
+    return hashlib.sha256(f"{ppt_name}\x1f{slide_index}\x1f{content_hash}".encode("utf-8")).hexdigest()[:32]
 
-    docs, metadatas, ids, texts = [], [], [], []
+
+def _build_slide_records(blob_name, slides):
+    """Build Chroma ids, documents and metadatas for the extracted slides."""
+    docs, metadatas, ids = [], [], []
     for s in slides:
         slide_id = f"{os.path.splitext(os.path.basename(blob_name))[0]}_Slide_{s['index']:02d}"
         text = s.get("text", "") or ""
+        content_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        tags = simple_tagger(text)
         metadata = {
             "ppt_name": blob_name,
             "slide_index": str(s["index"]),
             "slide_id": slide_id,
-            "title": text.split("\n", 1)[0] if text else "",
-            "tags": ", ".join(simple_tagger(text)), # ✅ FIXED: Convert list → string
+            "title": s.get("title") or (text.split("\n", 1)[0] if text else ""),
+            "tags": ", ".join(tags), # ✅ FIXED: Convert list → string
+            "content_hash": content_hash,
+            "text_extractor": TEXT_EXTRACTOR_VERSION,
             "indexed_on": str(now_ts()) # ✅ FIXED: Ensure string
         }
-        ids.append(str(uuid.uuid4()))
+        metadata.update(tag_metadata(tags))   # tag_<name>=True, filterable server-side
+        ids.append(slide_uid(blob_name, s["index"], content_hash))
         docs.append(text)
         metadatas.append(metadata)
-        texts.append(text)
+    return ids, docs, metadatas
+
+
+def _existing_slide_ids(ppt_name):
+    """
+    Ids the index holds for a deck. Errors propagate: planning against an empty set would
+    leave the deck's removed slides behind as orphans, so the deck fails and is retried.
+    """
+    try:
+        return set(_collection().get(where={"ppt_name": ppt_name}, include=[]).get("ids", []))
+    except Exception as e:
+        logger.error(f"Could not list existing slides for {ppt_name}: {e}")
+        raise
+
+
+def _plan_incremental_update(ppt_name, ids, docs, metadatas):
+    """
+    Compare freshly built records with what Chroma already holds for the deck.
+    Returns (ids, docs, metadatas) that need embedding + upsert, and the stale ids to delete.
+    Slides whose (position, text) did not change keep their id and are left untouched.
+    """
+    existing = _existing_slide_ids(ppt_name)
+    if not existing:
+        return ids, docs, metadatas, []
+    keep = [i for i, sid in enumerate(ids) if sid not in existing]
+    stale = sorted(existing - set(ids))
+    return [ids[i] for i in keep], [docs[i] for i in keep], [metadatas[i] for i in keep], stale
+
 
-    embeddings = azure_embed_func(texts)
-    if not embeddings or len(embeddings) != len(docs):
-        logger.error("Embedding count mismatch or failed; aborting indexing for this file.")
+def process_blob(blob_name, props=None):
+    """
+    Download PPT, extract slides, generate embeddings, and insert into Chroma.
+    `props` are the blob's listing properties; without them one HEAD request is made.
+    Unchanged blobs (per the ingestion manifest) are skipped before downloading.
+    """
+    logger.info(f"Processing blob: {blob_name}")
+    if props is None:
+        props = _container().get_blob_client(blob_name).get_blob_properties()
+    fingerprint = blob_fingerprint(props)
+    entry = get_entry(blob_name)
+    if _can_skip_from_listing(blob_name, entry, fingerprint):
+        logger.info(f"Skipping '{blob_name}' — unchanged since last index.")
+        return
+
+    tmp_path, sha256 = _download_to_temp(blob_name)
+    try:
+        _index_downloaded(blob_name, tmp_path, sha256, entry, fingerprint)
+    finally:
+        _remove_quietly(tmp_path)
+
+
+def _index_downloaded(blob_name, tmp_path, sha256, entry, fingerprint):
+    """process_blob() from a downloaded deck on: parse, embed changed slides, write, record."""
+    if entry and entry.get("sha256") == sha256:
+        # metadata changed (e.g. same bytes re-uploaded) but content did not
+        record_indexed(blob_name, fingerprint, sha256, entry.get("slide_count"))
+        logger.info(f"Skipping '{blob_name}' — content hash unchanged.")
         return
 
-    # ✅ Insert into Chroma
+    slides = extract_slides(tmp_path)
+    if slides:
+        _prerender_thumbnails(tmp_path)
+        _precompute_questions(tmp_path, slides)
+    else:
+        # indexed as a deck without slides (old ones removed) and recorded, so it is skipped next time
+        logger.warning(f"No slides found in {blob_name}")
+
+    ids, docs, metadatas = _build_slide_records(blob_name, slides)
+    slide_count = len(ids)
+    # only new/changed slides are embedded; removed slides are deleted in the same pass
+    ids, docs, metadatas, stale = _plan_incremental_update(blob_name, ids, docs, metadatas)
+
+    spec = collections.active()
+    embeddings = azure_embed_func(docs, spec) if docs else []
+    ids, docs, metadatas, embeddings, dropped = _drop_unembedded(ids, docs, metadatas, embeddings)
+    if dropped and not docs:
+        logger.error("Embedding failed for every changed slide; aborting indexing for this file.")
+        return
+    if dropped:
+        logger.warning(f"{dropped} slide(s) of {blob_name} could not be embedded; indexing the rest.")
+
+    # ✅ Upsert into Chroma
     try:
-        collection.add(documents=docs, embeddings=embeddings, metadatas=metadatas, ids=ids)
-        logger.info(f"Indexed {len(docs)} slides from {blob_name} into Chroma.")
+        _write_slides(ids, docs, metadatas, embeddings, stale, spec)
+        # a partial index keeps no fingerprint so the next run retries the deck
+        record_indexed(blob_name, {} if dropped else fingerprint, None if dropped else sha256, slide_count)
+        logger.info(f"Indexed {blob_name}: {len(docs)} slide(s) upserted, "
+                    f"{slide_count - len(docs) - dropped} unchanged, {len(stale)} removed.")
     except Exception as e:
         logger.exception(f"Failed to insert slides from {blob_name} into Chroma: {e}")
 
@@ -141,7 +352,10 @@ def delete_ppt_from_chroma(ppt_name: str) -> None:
 
     try:
         # ✅ DIRECT DELETE — no pre-query (avoids Chroma API bug)
-        collection.delete(where={"ppt_name": ppt_name})
+        for target in collections.targets():
+            collections.collection(target).delete(where={"ppt_name": ppt_name})
+        lexical_index.delete_ppt(ppt_name)
+        remove_entry(ppt_name)
 
         # ✅ IMPORTANT: Persist the deletion to disk
         # chroma_client.persist()
@@ -153,15 +367,417 @@ def delete_ppt_from_chroma(ppt_name: str) -> None:
         raise e
 
 
+# === PIPELINED BULK INGESTION ===
+# download (threads) -> parse (processes) -> embed (batched threads) -> write (single writer)
+#                                         \-> precompute (threads; thumbnails/questions, optional)
+# Stages are connected by bounded queues so a slow stage applies back-pressure upstream.
+_STAGES = ("download", "parse", "precompute", "embed", "write")
+_DONE = object()
+
+
+def _new_stage_stats():
+    return {name: {"decks": 0, "slides": 0, "busy": 0.0, "failed": 0, "skipped": 0} for name in _STAGES}
+
+
+def _record_stage(stats, lock, stage, decks=0, slides=0, busy=0.0, failed=0, skipped=0):
+    with lock:
+        st = stats[stage]
+        st["decks"] += decks
+        st["slides"] += slides
+        st["busy"] += busy
+        st["failed"] += failed
+        st["skipped"] += skipped
+
+
+def _log_stage_report(stats, wall):
+    """Log per-stage throughput for a pipelined run."""
+    logger.info(f"Ingestion finished in {wall:.1f}s")
+    for name in _STAGES:
+        st = stats[name]
+        rate = st["decks"] / wall if wall > 0 else 0.0
+        slide_rate = st["slides"] / wall if wall > 0 else 0.0
+        logger.info(
+            f"  {name:<8} decks={st['decks']:<6} slides={st['slides']:<7} failed={st['failed']:<4} "
+            f"skipped={st['skipped']:<6} "
+            f"busy={st['busy']:.1f}s  {rate:.2f} decks/s  {slide_rate:.1f} slides/s"
+        )
+
+
+def _embed_worker(in_q, out_q, embed_batch, stats, lock):
+    """
+    Accumulate whole decks until at least `embed_batch` slides are pending, then embed them
+    together (the batcher splits/retries as needed). Slides that still fail are dropped and
+    their deck is marked partial so the next run retries it.
+    """
+    pending = []
+
+    def flush():
+        if not pending:
+            return
+        planned = []
+        for deck in pending:
+            try:
+                deck["ids"], deck["docs"], deck["metadatas"], deck["stale"] = _plan_incremental_update(
+                    deck["blob_name"], deck["ids"], deck["docs"], deck["metadatas"])
+                planned.append(deck)
+            except Exception:
+                # not recorded in the manifest, so the next run retries the deck
+                logger.error(f"Skipping {deck['blob_name']} for this run: its indexed slides could not be listed.")
+        plan_failed = len(pending) - len(planned)
+        pending[:] = planned
+        docs = [d for deck in pending for d in deck["docs"]]
+        t0 = time.perf_counter()
+        spec = collections.active()
+        try:
+            embeddings = azure_embed_func(docs, spec) if docs else []
+        except Exception as e:
+            # the embedding request itself was rejected (e.g. deployment misconfigured): no deck
+            # of this batch is recorded, so the next run retries them
+            logger.error(f"Embedding failed for {len(pending)} deck(s); skipping them for this run: {e}")
+            _record_stage(stats, lock, "embed", busy=time.perf_counter() - t0, failed=len(pending) + plan_failed)
+            pending.clear()
+            return
+        busy = time.perf_counter() - t0
+        pos, embedded, failed = 0, 0, 0
+        for deck in pending:
+            n = len(deck["docs"])
+            (deck["ids"], deck["docs"], deck["metadatas"], deck["embeddings"],
+             dropped) = _drop_unembedded(deck["ids"], deck["docs"], deck["metadatas"], embeddings[pos:pos + n])
+            pos += n
+            deck["partial"] = dropped > 0
+            deck["spec"] = spec
+            if dropped and not deck["docs"]:
+                logger.error(f"Embedding failed for every slide of {deck['blob_name']}; skipping for this run.")
+                failed += 1
+                continue
+            if dropped:
+                logger.warning(f"{dropped} slide(s) of {deck['blob_name']} could not be embedded; indexing the rest.")
+            embedded += len(deck["docs"])
+            out_q.put(deck)
+        _record_stage(stats, lock, "embed", decks=len(pending) - failed, slides=embedded, busy=busy,
+                      failed=failed + plan_failed)
+        pending.clear()
+
+    while True:
+        deck = in_q.get()
+        if deck is _DONE:
+            flush()
+            return
+        pending.append(deck)
+        if sum(len(d["docs"]) for d in pending) >= embed_batch:
+            flush()
+
+
+def _write_worker(in_q, write_batch, stats, lock):
+    """Single Chroma writer; groups decks into `write_batch`-sized upsert() calls."""
+    pending = []
+
+    def flush():
+        if not pending:
+            return
+        t0 = time.perf_counter()
+        try:
+            # decks embedded on either side of a cut-over are written per embedding spec
+            groups = {}
+            for deck in pending:
+                groups.setdefault(deck["spec"]["name"], []).append(deck)
+            written = 0
+            for decks in groups.values():
+                ids = [i for deck in decks for i in deck["ids"]]
+                _write_slides(ids,
+                              [d for deck in decks for d in deck["docs"]],
+                              [m for deck in decks for m in deck["metadatas"]],
+                              [e for deck in decks for e in deck["embeddings"]],
+                              [i for deck in decks for i in deck["stale"]],
+                              decks[0]["spec"])
+                written += len(ids)
+            _record_stage(stats, lock, "write", decks=len(pending), slides=written,
+                          busy=time.perf_counter() - t0)
+            for deck in pending:
+                if deck["partial"]:
+                    record_indexed(deck["blob_name"], {}, None, deck["slide_count"])
+                else:
+                    record_indexed(deck["blob_name"], deck["fingerprint"], deck["sha256"], deck["slide_count"])
+                logger.info(f"Indexed {deck['blob_name']}: {len(deck['ids'])} slide(s) upserted, "
+                            f"{len(deck['stale'])} removed.")
+        except Exception as e:
+            logger.exception(f"Chroma write failed for {len(pending)} deck(s): {e}")
+            _record_stage(stats, lock, "write", busy=time.perf_counter() - t0, failed=len(pending))
+        pending.clear()
+
+    while True:
+        deck = in_q.get()
+        if deck is _DONE:
+            flush()
+            return
+        pending.append(deck)
+        if sum(len(d["ids"]) + len(d["stale"]) for d in pending) >= write_batch:
+            flush()
+
+
+def _remove_quietly(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _precompute_stage(tmp_path, slides, stats, lock):
+    """Thumbnails and Q&A questions for a parsed deck, from its parsed slides (INGEST_THUMBNAILS / _QUESTIONS)."""
+    t0 = time.perf_counter()
+    _prerender_thumbnails(tmp_path)
+    _precompute_questions(tmp_path, slides)
+    _record_stage(stats, lock, "precompute", decks=1, slides=len(slides), busy=time.perf_counter() - t0)
+
+
+def _precompute_and_release(tmp_path, slides, in_flight, stats, lock):
+    try:
+        _precompute_stage(tmp_path, slides, stats, lock)
+    except Exception as e:
+        logger.exception(f"Precompute failed for {tmp_path}: {e}")
+        _record_stage(stats, lock, "precompute", failed=1)
+    finally:
+        in_flight.release()
+        _remove_quietly(tmp_path)
+
+
+def _handoff_worker(in_q, out_q, in_flight, stats, lock, precompute_pool=None):
+    """
+    Turn finished parse futures into deck records for the embed queue. The blocking put into
+    a full embed queue happens on this thread, never on the process pool's result thread.
+    With a precompute pool, the deck also goes to the precompute stage, which then owns its
+    temp file and in-flight slot.
+    """
+    while True:
+        item = in_q.get()
+        if item is _DONE:
+            return
+        deck, fut = item
+        blob_name = deck["blob_name"]
+        handed_off = False
+        try:
+            slides, busy = fut.result()
+            _record_stage(stats, lock, "parse", decks=1, slides=len(slides), busy=busy)
+            if not slides:
+                # still embedded/written (nothing to embed, any old slides removed) and recorded
+                # in the manifest, so later runs skip it like any other deck
+                logger.warning(f"No slides found in {blob_name}")
+            deck["ids"], deck["docs"], deck["metadatas"] = _build_slide_records(blob_name, slides)
+            deck["slide_count"] = len(deck["ids"])
+            out_q.put(deck)
+            if precompute_pool is not None and slides:
+                precompute_pool.submit(_precompute_and_release, deck["tmp_path"], slides,
+                                       in_flight, stats, lock)
+                handed_off = True
+        except Exception as e:
+            logger.exception(f"Failed to parse {blob_name}: {e}")
+            _record_stage(stats, lock, "parse", failed=1)
+        finally:
+            if not handed_off:
+                in_flight.release()
+                _remove_quietly(deck["tmp_path"])
+
+
+def _timed_extract(tmp_path):
+    """Process-pool entry point: parse a deck and report how long the parse took."""
+    t0 = time.perf_counter()
+    slides = extract_slides(tmp_path)
+    return slides, time.perf_counter() - t0
+
+
+def _download_stage(blob, manifest, stats, lock):
+    """
+    Skip unchanged blobs using listing metadata, otherwise download.
+    Returns None (skipped) or a partial deck dict for the parse stage.
+    """
+    blob_name = blob if isinstance(blob, str) else blob.name
+    props = _container().get_blob_client(blob_name).get_blob_properties() if isinstance(blob, str) else blob
+    fingerprint = blob_fingerprint(props)
+    entry = manifest.get(blob_name)
+    if _can_skip_from_listing(blob_name, entry, fingerprint):
+        _record_stage(stats, lock, "download", skipped=1)
+        return None
+
+    t0 = time.perf_counter()
+    tmp_path, sha256 = _download_to_temp(blob_name)
+    _record_stage(stats, lock, "download", decks=1, busy=time.perf_counter() - t0)
+    if entry and entry.get("sha256") == sha256:
+        record_indexed(blob_name, fingerprint, sha256, entry.get("slide_count"))
+        _record_stage(stats, lock, "parse", skipped=1)
+        _remove_quietly(tmp_path)
+        return None
+    return {"blob_name": blob_name, "tmp_path": tmp_path, "sha256": sha256,
+            "fingerprint": fingerprint}
+
+
+def run_pipelined_ingestion(blobs,
+                            download_workers=None,
+                            parse_workers=None,
+                            embed_workers=None,
+                            embed_batch=None,
+                            write_batch=None,
+                            queue_size=None):
+    """
+    Ingest many decks concurrently. `blobs` are listing BlobProperties (or plain names, which
+    costs a HEAD each). Unchanged blobs are skipped from listing metadata via the ingestion
+    manifest; downloads run on a thread pool, `extract_slides` on a process pool, and
+    embedding/Chroma writes are batched consumers behind bounded queues. Thumbnail/question
+    precompute, when enabled, runs on its own threads from the parsed slides.
+    Returns the per-stage stats dict (also logged at the end of the run).
+    """
+    download_workers = download_workers or INGEST_DOWNLOAD_WORKERS
+    parse_workers = parse_workers or INGEST_PARSE_WORKERS
+    embed_workers = embed_workers or INGEST_EMBED_WORKERS
+    embed_batch = embed_batch or INGEST_EMBED_BATCH
+    write_batch = write_batch or INGEST_WRITE_BATCH
+    queue_size = queue_size or INGEST_QUEUE_SIZE
+
+    stats, lock = _new_stage_stats(), threading.Lock()
+    manifest = load_manifest()
+    embed_q = queue.Queue(maxsize=queue_size)
+    write_q = queue.Queue(maxsize=queue_size)
+    # parsed decks in completion order; unbounded, since in_flight already bounds the decks in it
+    parsed_q = queue.Queue()
+    # bounds decks whose temp file is still needed: downloaded, parsing, not yet handed to the
+    # embed queue, or in the precompute stage
+    in_flight = threading.BoundedSemaphore(queue_size)
+    precompute_pool = (ThreadPoolExecutor(max_workers=INGEST_PRECOMPUTE_WORKERS, thread_name_prefix="ingest-pre")
+                       if INGEST_THUMBNAILS or INGEST_QUESTIONS else None)
+
+    embedders = [threading.Thread(target=_embed_worker, args=(embed_q, write_q, embed_batch, stats, lock),
+                                  name=f"ingest-embed-{i}", daemon=True)
+                 for i in range(embed_workers)]
+    writer = threading.Thread(target=_write_worker, args=(write_q, write_batch, stats, lock),
+                              name="ingest-write", daemon=True)
+    handoff = threading.Thread(target=_handoff_worker, args=(parsed_q, embed_q, in_flight, stats, lock, precompute_pool),
+                               name="ingest-handoff", daemon=True)
+    for t in embedders:
+        t.start()
+    writer.start()
+    handoff.start()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=download_workers, thread_name_prefix="ingest-dl") as dl_pool, \
+            ProcessPoolExecutor(max_workers=parse_workers) as parse_pool:
+
+        def download_and_parse(blob):
+            """Download-pool task: run the download stage and hand the deck to the parse pool."""
+            blob_name = blob if isinstance(blob, str) else blob.name
+            deck, submitted = None, False
+            try:
+                deck = _download_stage(blob, manifest, stats, lock)
+                if deck is not None:
+                    fut = parse_pool.submit(_timed_extract, deck["tmp_path"])
+                    submitted = True
+                    # done-callbacks run on the process pool's management thread: only a
+                    # non-blocking hand-off here, the handoff thread does the rest
+                    fut.add_done_callback(lambda f, deck=deck: parsed_q.put((deck, f)))
+            except Exception as e:
+                stage = "parse" if deck is not None else "download"
+                logger.exception(f"Failed to {stage} {blob_name}: {e}")
+                _record_stage(stats, lock, stage, failed=1)
+            finally:
+                if not submitted:
+                    # never reached the parse pool (skipped, or failed): the deck is done
+                    if deck is not None:
+                        _remove_quietly(deck["tmp_path"])
+                    in_flight.release()
+
+        for blob in blobs:
+            in_flight.acquire()
+            dl_pool.submit(download_and_parse, blob)
+
+        # wait until every submitted deck has left the download/parse stages
+        for _ in range(queue_size):
+            in_flight.acquire()
+    parsed_q.put(_DONE)
+    handoff.join()
+    if precompute_pool is not None:
+        precompute_pool.shutdown()
+
+    for _ in embedders:
+        embed_q.put(_DONE)
+    for t in embedders:
+        t.join()
+    write_q.put(_DONE)
+    writer.join()
+
+    _log_stage_report(stats, time.perf_counter() - started)
+    return stats
+
+
+def _list_ppt_blobs():
+    """List deck blobs with their properties (etag, last_modified, size come for free)."""
+    return [b for b in _container().list_blobs()
+            if b.name.endswith(".pptx") or b.name.endswith(".ppt")]
+
+
+def backfill_tag_metadata(page_size=1000):
+    """
+    Add the per-tag boolean keys to slides indexed before they existed (derived from the
+    comma-joined "tags" string). Unchanged slides are never re-upserted, so they need this once
+    per collection; a completed pass is recorded in the ingestion manifest and not repeated.
+    Returns the number of slides updated.
+    """
+    migration = f"tag_keys:{collections.active()['name']}"
+    if migration_done(migration):
+        return 0
+    updated, offset = 0, 0
+    while True:
+        try:
+            res = _collection().get(include=["metadatas"], limit=page_size, offset=offset)
+        except Exception as e:
+            logger.exception(f"Tag backfill failed to read slides: {e}")
+            return updated
+        ids = res.get("ids", [])
+        if not ids:
+            record_migration(migration)
+            return updated
+        fix_ids, fix_metas = [], []
+        for sid, meta in zip(ids, res.get("metadatas", [])):
+            meta = meta or {}
+            tags = [t.strip() for t in (meta.get("tags") or "").split(",") if t.strip()]
+            if tags and not all(meta.get(tag_key(t)) is True for t in tags):
+                fix_ids.append(sid)
+                fix_metas.append({**meta, **tag_metadata(tags)})
+        if fix_ids:
+            _collection().update(ids=fix_ids, metadatas=fix_metas)
+            updated += len(fix_ids)
+        offset += len(ids)
+
+
+def _warn_on_extractor_change():
+    """Say up front when the index was built by another text extractor (slide ids will change)."""
+    try:
+        metas = _collection().get(limit=1, include=["metadatas"]).get("metadatas") or []
+    except Exception:
+        return
+    if metas and (metas[0] or {}).get("text_extractor") != TEXT_EXTRACTOR_VERSION:
+        logger.warning(
+            f"The index was built with text extractor '{(metas[0] or {}).get('text_extractor', 'python-pptx')}', "
+            f"now '{TEXT_EXTRACTOR_VERSION}': slide text, content hashes and ids change, so every deck "
+            f"re-indexed from now on is deleted and re-embedded in full once (unchanged decks are still "
+            f"skipped; clear the ingestion manifest to refresh them all)."
+        )
+
+
 def main():
     """Main ingestion process."""
     logger.info("Starting ingestion into Chroma from Azure Blob (ppt-dataset)...")
-    for b in container_client.list_blobs():
-        if b.name.endswith(".pptx") or b.name.endswith(".ppt"):
+    _warn_on_extractor_change()
+    backfilled = backfill_tag_metadata()
+    if backfilled:
+        logger.info(f"Added tag filter keys to {backfilled} previously indexed slide(s).")
+    # first run with the lexical index: load what the collection already holds
+    lexical_index.ensure_loaded(_collection)
+    if INGEST_MODE == "sequential":
+        for b in _list_ppt_blobs():
             try:
-                process_blob(b.name)
+                process_blob(b.name, props=b)
             except Exception as e:
                 logger.exception(f"Failed to process {b.name}: {e}")
+    else:
+        run_pipelined_ingestion(_list_ppt_blobs())
 
     logger.info("Ingestion complete.")
 
@@ -0,0 +1,115 @@
+# ingestion_manifest.py
+import os
+import sqlite3
+import threading
+from utils import get_env, logger, now_ts, ensure_dir
+
+# One row per indexed blob: what we saw in the listing + hash of the bytes we indexed.
+MANIFEST_PATH = get_env(
+    "INGEST_MANIFEST_PATH",
+    os.path.join(get_env("CHROMA_PERSIST_DIR", "./chroma_db"), "ingest_manifest.sqlite3")
+)
+
+_write_lock = threading.Lock()
+_initialized = False
+
+
+def _connect():
+    global _initialized
+    if not _initialized:
+        ensure_dir(os.path.dirname(os.path.abspath(MANIFEST_PATH)))
+    conn = sqlite3.connect(MANIFEST_PATH, timeout=30)
+    if not _initialized:
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS manifest (
+                blob_name     TEXT PRIMARY KEY,
+                etag          TEXT,
+                last_modified TEXT,
+                size          INTEGER,
+                sha256        TEXT,
+                slide_count   INTEGER,
+                indexed_on    TEXT
+            )
+            """
+        )
+        # one-off index migrations that have run (e.g. the tag-key backfill, per collection)
+        conn.execute("CREATE TABLE IF NOT EXISTS migrations (name TEXT PRIMARY KEY, done_on TEXT)")
+        conn.commit()
+        _initialized = True
+    return conn
+
+
+def blob_fingerprint(props):
+    """
+    Normalize listing/HEAD/download properties into {etag, last_modified, size}.
+    Accepts azure BlobProperties (or anything with the same attributes) or a dict.
+    """
+    get = props.get if isinstance(props, dict) else (lambda k: getattr(props, k, None))
+    last_modified = get("last_modified")
+    if hasattr(last_modified, "isoformat"):
+        last_modified = last_modified.isoformat()
+    size = get("size")
+    return {
+        "etag": (get("etag") or "").strip('"') or None,
+        "last_modified": last_modified,
+        "size": int(size) if size is not None else None,
+    }
+
+
+def get_entry(blob_name):
+    """Return the manifest row for blob_name as a dict, or None."""
+    with _connect() as conn:
+        conn.row_factory = sqlite3.Row
+        row = conn.execute("SELECT * FROM manifest WHERE blob_name = ?", (blob_name,)).fetchone()
+    return dict(row) if row else None
+
+
+def load_manifest():
+    """Return {blob_name: row_dict} for every indexed blob (one query for a whole listing)."""
+    with _connect() as conn:
+        conn.row_factory = sqlite3.Row
+        rows = conn.execute("SELECT * FROM manifest").fetchall()
+    return {r["blob_name"]: dict(r) for r in rows}
+
+
+def is_unchanged(entry, fingerprint):
+    """
+    True when the listing metadata matches what was indexed. ETag is authoritative;
+    size + last_modified is only used when the store did not give us an ETag.
+    """
+    if not entry:
+        return False
+    if fingerprint.get("etag") and entry.get("etag"):
+        return fingerprint["etag"] == entry["etag"]
+    return (fingerprint.get("size") == entry.get("size")
+            and fingerprint.get("last_modified") == entry.get("last_modified"))
+
+
+def record_indexed(blob_name, fingerprint, sha256=None, slide_count=None):
+    """Insert/replace the manifest row after a successful (re-)index."""
+    with _write_lock, _connect() as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO manifest "
+            "(blob_name, etag, last_modified, size, sha256, slide_count, indexed_on) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (blob_name, fingerprint.get("etag"), fingerprint.get("last_modified"),
+             fingerprint.get("size"), sha256, slide_count, now_ts())
+        )
+    logger.debug(f"Manifest updated for {blob_name} (etag={fingerprint.get('etag')})")
+
+
+def remove_entry(blob_name):
+    """Forget a blob (e.g. after it was deleted from the KB)."""
+    with _write_lock, _connect() as conn:
+        conn.execute("DELETE FROM manifest WHERE blob_name = ?", (blob_name,))
+
+
+def migration_done(name):
+    with _connect() as conn:
+        return conn.execute("SELECT 1 FROM migrations WHERE name = ?", (name,)).fetchone() is not None
+
+
+def record_migration(name):
+    with _write_lock, _connect() as conn:
+        conn.execute("INSERT OR REPLACE INTO migrations (name, done_on) VALUES (?, ?)", (name, now_ts()))
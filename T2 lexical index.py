@@ -0,0 +1,179 @@
+# lexical_index.py
+import os
+import re
+import sqlite3
+import threading
+from utils import get_env, logger, ensure_dir
+
+# Local BM25 index (SQLite FTS5) over slide titles, text and tags. It is written next to Chroma
+# by ingestion with the same ids/documents/metadatas, so lexical and vector hits join on id.
+LEXICAL_INDEX_PATH = get_env(
+    "LEXICAL_INDEX_PATH",
+    os.path.join(get_env("CHROMA_PERSIST_DIR", "./chroma_db"), "lexical_index.sqlite3")
+)
+# bm25() column weights: title, text, tags
+_BM25_WEIGHTS = (2.0, 1.0, 0.5)
+
+_write_lock = threading.Lock()
+_initialized = False
+_bootstrap = {"started": False}
+_bootstrap_lock = threading.Lock()
+
+
+def _connect():
+    global _initialized
+    if not _initialized:
+        ensure_dir(os.path.dirname(os.path.abspath(LEXICAL_INDEX_PATH)))
+    conn = sqlite3.connect(LEXICAL_INDEX_PATH, timeout=30)
+    if not _initialized:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS slides (
+                rowid     INTEGER PRIMARY KEY,
+                id        TEXT UNIQUE NOT NULL,
+                ppt_name  TEXT,
+                slide_id  TEXT,
+                title     TEXT,
+                text      TEXT,
+                tags      TEXT
+            );
+            CREATE INDEX IF NOT EXISTS slides_ppt ON slides(ppt_name);
+            CREATE VIRTUAL TABLE IF NOT EXISTS slides_fts USING fts5(
+                title, text, tags, content='slides', content_rowid='rowid',
+                tokenize='porter unicode61'
+            );
+            CREATE TRIGGER IF NOT EXISTS slides_ai AFTER INSERT ON slides BEGIN
+                INSERT INTO slides_fts(rowid, title, text, tags) VALUES (new.rowid, new.title, new.text, new.tags);
+            END;
+            CREATE TRIGGER IF NOT EXISTS slides_ad AFTER DELETE ON slides BEGIN
+                INSERT INTO slides_fts(slides_fts, rowid, title, text, tags)
+                VALUES ('delete', old.rowid, old.title, old.text, old.tags);
+            END;
+            """
+        )
+        conn.commit()
+        _initialized = True
+    return conn
+
+
+def upsert_slides(ids, documents, metadatas):
+    """Insert or replace slides; same arguments as collection.upsert (minus embeddings)."""
+    rows = [
+        (sid, (m or {}).get("ppt_name"), (m or {}).get("slide_id"), (m or {}).get("title") or "",
+         doc or "", (m or {}).get("tags") or "")
+        for sid, doc, m in zip(ids, documents, metadatas)
+    ]
+    if not rows:
+        return
+    with _write_lock, _connect() as conn:
+        conn.executemany("DELETE FROM slides WHERE id = ?", [(r[0],) for r in rows])
+        conn.executemany(
+            "INSERT INTO slides (id, ppt_name, slide_id, title, text, tags) VALUES (?, ?, ?, ?, ?, ?)", rows
+        )
+
+
+def delete_ids(ids):
+    if not ids:
+        return
+    with _write_lock, _connect() as conn:
+        conn.executemany("DELETE FROM slides WHERE id = ?", [(sid,) for sid in ids])
+
+
+def delete_ppt(ppt_name):
+    with _write_lock, _connect() as conn:
+        conn.execute("DELETE FROM slides WHERE ppt_name = ?", (ppt_name,))
+
+
+def slide_count():
+    with _connect() as conn:
+        return conn.execute("SELECT COUNT(*) FROM slides").fetchone()[0]
+
+
+def _terms(text):
+    return re.findall(r"\w+", (text or "").lower())
+
+
+def _match_expression(query, tags=None, tag_match="any"):
+    """FTS5 MATCH string: any query term (ranked by BM25), AND-ed with an optional tag filter."""
+    terms = list(dict.fromkeys(_terms(query)))
+    if not terms:
+        return None
+    expr = "(" + " OR ".join(f'"{t}"' for t in terms) + ")"
+    tag_phrases = [" ".join(_terms(t)) for t in (tags or [])]
+    tag_phrases = [f'tags : "{p}"' for p in dict.fromkeys(tag_phrases) if p]
+    if tag_phrases:
+        joiner = " OR " if tag_match == "any" else " AND "
+        expr += " AND (" + joiner.join(tag_phrases) + ")"
+    return expr
+
+
+def search(query, top_k=10, tags=None, tag_match="any"):
+    """
+    BM25 search. Returns hits shaped like search_utils results, best first, with "bm25"
+    (lower is better, as FTS5 reports it) and "score" None since there is no vector distance.
+    """
+    expr = _match_expression(query, tags, tag_match)
+    if expr is None:
+        return []
+    try:
+        with _connect() as conn:
+            rows = conn.execute(
+                f"""
+                SELECT s.id, s.ppt_name, s.slide_id, s.title, s.text, s.tags,
+                       bm25(slides_fts, {", ".join(str(w) for w in _BM25_WEIGHTS)}) AS rank
+                FROM slides_fts JOIN slides s ON s.rowid = slides_fts.rowid
+                WHERE slides_fts MATCH ?
+                ORDER BY rank
+                LIMIT ?
+                """,
+                (expr, top_k)
+            ).fetchall()
+    except sqlite3.Error as e:
+        logger.exception(f"Lexical search failed: {e}")
+        return []
+    return [
+        {"id": r[0], "ppt_name": r[1], "slide_id": r[2], "title": r[3], "text": r[4],
+         "tags": r[5], "score": None, "bm25": r[6]}
+        for r in rows
+    ]
+
+
+def rebuild_from_collection(collection, page_size=1000):
+    """(Re)load the index from a Chroma collection, e.g. for decks indexed before it existed."""
+    offset, total = 0, 0
+    while True:
+        res = collection.get(include=["documents", "metadatas"], limit=page_size, offset=offset)
+        ids = res.get("ids", [])
+        if not ids:
+            break
+        upsert_slides(ids, res.get("documents", []), res.get("metadatas", []))
+        total += len(ids)
+        offset += len(ids)
+    logger.info(f"Lexical index loaded {total} slide(s) from Chroma")
+    return total
+
+
+def ensure_loaded(get_collection, background=False):
+    """
+    Fill an empty index from the vector collection once per process (indexes built before the
+    lexical index existed, or an app started against an index nobody re-ingested since).
+    With background=True the load runs on a daemon thread and searches meanwhile see
+    whatever has been loaded so far.
+    """
+    with _bootstrap_lock:
+        if _bootstrap["started"]:
+            return
+        _bootstrap["started"] = True
+
+    def load():
+        try:
+            if slide_count() == 0:
+                rebuild_from_collection(get_collection())
+        except Exception as e:
+            logger.exception(f"Lexical index bootstrap failed: {e}")
+
+    if background:
+        threading.Thread(target=load, name="lexical-bootstrap", daemon=True).start()
+    else:
+        load()
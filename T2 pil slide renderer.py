@@ -0,0 +1,461 @@
+# pil_slide_renderer.py
+import os
+import io
+import uuid
+import colorsys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from lxml import etree
+from PIL import Image, ImageDraw, ImageFont
+from pptx.enum.shapes import MSO_SHAPE_TYPE, PP_PLACEHOLDER
+from pptx.opc.constants import RELATIONSHIP_TYPE as RT
+from utils import get_env, logger
+from deck_cache import get_presentation
+
+# Headless, pure-Python slide thumbnails: shapes, fills, text runs and pictures drawn with Pillow.
+# Not pixel-exact PowerPoint output -- close enough to pick a design from, and it runs on Linux.
+RENDERER_VERSION = "pil-1"
+RENDER_WIDTH = int(get_env("RENDER_WIDTH", "1280"))
+RENDER_WORKERS = int(get_env("RENDER_WORKERS", str(os.cpu_count() or 2)))
+
+_NS = {
+    "a": "http://schemas.openxmlformats.org/drawingml/2006/main",
+    "p": "http://schemas.openxmlformats.org/presentationml/2006/main",
+}
+_A = "{%s}" % _NS["a"]
+EMU_PER_PT = 12700
+_CLR_MAP_DEFAULT = {"bg1": "lt1", "tx1": "dk1", "bg2": "lt2", "tx2": "dk2"}
+_FONT_FILES = {False: ("DejaVuSans.ttf", "Arial.ttf"), True: ("DejaVuSans-Bold.ttf", "Arial Bold.ttf")}
+_font_cache = {}
+
+
+# ------------------------------------------------------------
+# COLORS
+# ------------------------------------------------------------
+def _theme_colors(slide):
+    """{scheme name -> 'RRGGBB'} from the slide master's theme, with bg1/tx1 aliases."""
+    colors = {}
+    try:
+        master = slide.slide_layout.slide_master
+        theme_part = master.part.part_related_by(RT.THEME)
+        theme = etree.fromstring(theme_part.blob)
+        for el in theme.find(".//a:clrScheme", namespaces=_NS):
+            child = el[0]
+            colors[el.tag.split("}")[1]] = child.get("val") if child.tag == _A + "srgbClr" else child.get("lastClr")
+        clr_map = master._element.find("p:clrMap", namespaces=_NS)
+        mapping = dict(clr_map.attrib) if clr_map is not None else _CLR_MAP_DEFAULT
+        for alias, target in mapping.items():
+            if target in colors:
+                colors[alias] = colors[target]
+    except Exception as e:
+        logger.debug(f"Theme color lookup failed: {e}")
+    return colors
+
+
+def _apply_mods(rgb, clr_el):
+    """Apply lumMod/lumOff/shade/tint children of a color element (approximation)."""
+    r, g, b = [c / 255.0 for c in rgb]
+    h, l, s = colorsys.rgb_to_hls(r, g, b)
+    for mod in clr_el:
+        val = int(mod.get("val", "100000")) / 100000.0
+        tag = mod.tag.split("}")[1]
+        if tag == "lumMod":
+            l *= val
+        elif tag == "lumOff":
+            l += val
+        elif tag == "shade":
+            l *= val
+        elif tag == "tint":
+            l = l + (1 - l) * (1 - val)
+    l = min(max(l, 0.0), 1.0)
+    r, g, b = colorsys.hls_to_rgb(h, l, s)
+    return int(r * 255), int(g * 255), int(b * 255)
+
+
+def _color_from(el, theme):
+    """Resolve the first color child (srgbClr/schemeClr/sysClr/prstClr) of `el` to RGB."""
+    if el is None:
+        return None
+    for clr in el:
+        tag = clr.tag.split("}")[1]
+        hexval = None
+        if tag == "srgbClr":
+            hexval = clr.get("val")
+        elif tag == "schemeClr":
+            hexval = theme.get(clr.get("val"))
+        elif tag == "sysClr":
+            hexval = clr.get("lastClr")
+        elif tag == "prstClr":
+            hexval = {"black": "000000", "white": "FFFFFF", "red": "FF0000",
+                      "green": "00FF00", "blue": "0000FF"}.get(clr.get("val"))
+        if hexval and len(hexval) == 6:
+            rgb = tuple(int(hexval[i:i + 2], 16) for i in (0, 2, 4))
+            return _apply_mods(rgb, clr)
+    return None
+
+
+def _fill_of(sp_pr, style, theme):
+    """Fill color of a shape: explicit spPr fill first, then the style's fillRef."""
+    if sp_pr is not None:
+        if sp_pr.find("a:noFill", _NS) is not None:
+            return None
+        solid = sp_pr.find("a:solidFill", _NS)
+        if solid is not None:
+            return _color_from(solid, theme)
+        grad = sp_pr.find("a:gradFill/a:gsLst/a:gs", _NS)
+        if grad is not None:
+            return _color_from(grad, theme)
+        if sp_pr.find("a:blipFill", _NS) is not None or sp_pr.find("a:pattFill", _NS) is not None:
+            return (200, 200, 200)
+    if style is not None:
+        ref = style.find("a:fillRef", _NS)
+        if ref is not None and ref.get("idx", "0") != "0":
+            return _color_from(ref, theme)
+    return None
+
+
+def _line_of(sp_pr, style, theme):
+    """(color, width_emu) of a shape outline or None."""
+    ln = sp_pr.find("a:ln", _NS) if sp_pr is not None else None
+    if ln is not None:
+        if ln.find("a:noFill", _NS) is not None:
+            return None
+        color = _color_from(ln.find("a:solidFill", _NS), theme)
+        if color:
+            return color, int(ln.get("w", "12700"))
+    if style is not None and ln is None:
+        ref = style.find("a:lnRef", _NS)
+        if ref is not None and ref.get("idx", "0") != "0":
+            color = _color_from(ref, theme)
+            if color:
+                return color, 12700
+    return None
+
+
+def _background(slide, theme):
+    """Solid background of the slide, falling back to layout then master; white otherwise."""
+    for owner in (slide, slide.slide_layout, slide.slide_layout.slide_master):
+        bg = owner._element.find("p:cSld/p:bg", _NS)
+        if bg is None:
+            continue
+        bg_pr = bg.find("p:bgPr", _NS)
+        if bg_pr is not None:
+            color = _fill_of(bg_pr, None, theme)
+            if color:
+                return color
+        bg_ref = bg.find("p:bgRef", _NS)
+        if bg_ref is not None:
+            color = _color_from(bg_ref, theme)
+            if color:
+                return color
+    return (255, 255, 255)
+
+
+# ------------------------------------------------------------
+# TEXT
+# ------------------------------------------------------------
+def _font(bold, size_px):
+    key = (bold, size_px)
+    if key not in _font_cache:
+        font = None
+        for name in _FONT_FILES[bold]:
+            try:
+                font = ImageFont.truetype(name, size_px)
+                break
+            except Exception:
+                continue
+        if font is None:
+            try:
+                font = ImageFont.load_default(size_px)
+            except TypeError:  # Pillow < 10.1
+                font = ImageFont.load_default()
+        _font_cache[key] = font
+    return _font_cache[key]
+
+
+def _default_font_pt(shape):
+    if getattr(shape, "is_placeholder", False):
+        ph_type = shape.placeholder_format.type
+        return 40 if ph_type in (PP_PLACEHOLDER.TITLE, PP_PLACEHOLDER.CENTER_TITLE) else 24
+    return 18
+
+
+def _layout_paragraph(draw, runs, max_width):
+    """Greedy word wrap over styled runs -> list of lines, each a list of (text, font, color)."""
+    lines, line, line_w = [], [], 0
+    for text, font, color in runs:
+        for i, word in enumerate(text.replace("\v", "\n").split(" ")):
+            for j, piece in enumerate(word.split("\n")):
+                if j > 0:
+                    lines.append(line)
+                    line, line_w = [], 0
+                token = (" " if (i > 0 and line) else "") + piece
+                w = draw.textlength(token, font=font)
+                if line and line_w + w > max_width:
+                    lines.append(line)
+                    token = piece
+                    line, line_w = [], 0
+                    w = draw.textlength(token, font=font)
+                if token:
+                    line.append((token, font, color))
+                    line_w += w
+    lines.append(line)
+    return lines
+
+
+def _draw_text_frame(draw, shape, box, scale, theme, default_color):
+    x0, y0, x1, y1 = box
+    tf = shape.text_frame
+    body_pr = tf._txBody.find("a:bodyPr", _NS)
+    font_scale = 1.0
+    autofit = body_pr.find("a:normAutofit", _NS) if body_pr is not None else None
+    if autofit is not None and autofit.get("fontScale"):
+        font_scale = int(autofit.get("fontScale")) / 100000.0
+    inset_l = int(body_pr.get("lIns", 91440)) if body_pr is not None else 91440
+    inset_t = int(body_pr.get("tIns", 45720)) if body_pr is not None else 45720
+    inset_r = int(body_pr.get("rIns", 91440)) if body_pr is not None else 91440
+    inset_b = int(body_pr.get("bIns", 45720)) if body_pr is not None else 45720
+    anchor = body_pr.get("anchor", "t") if body_pr is not None else "t"
+    x0 += inset_l * scale
+    x1 -= inset_r * scale
+    y0 += inset_t * scale
+    y1 -= inset_b * scale
+    max_width = max(x1 - x0, 10)
+    default_pt = _default_font_pt(shape)
+
+    blocks = []  # (lines, align, line_height)
+    for p in tf.paragraphs:
+        p_pr = p._p.find("a:pPr", _NS)
+        def_rpr = p_pr.find("a:defRPr", _NS) if p_pr is not None else None
+        runs = []
+        max_px = 0
+        for r in p.runs:
+            r_pr = r._r.find("a:rPr", _NS)
+            sz = (r_pr.get("sz") if r_pr is not None else None) or (def_rpr.get("sz") if def_rpr is not None else None)
+            pt = int(sz) / 100.0 if sz else default_pt
+            px = max(int(pt * EMU_PER_PT * scale * font_scale), 6)
+            bold = (r_pr is not None and r_pr.get("b") == "1")
+            color = _color_from(r_pr.find("a:solidFill", _NS), theme) if r_pr is not None else None
+            runs.append((r.text, _font(bold, px), color or default_color))
+            max_px = max(max_px, px)
+        if not runs:
+            px = max(int(default_pt * EMU_PER_PT * scale * font_scale), 6)
+            blocks.append(([[]], "l", int(px * 1.2)))
+            continue
+        if p.level:
+            max_w = max_width - p.level * 20 * scale * EMU_PER_PT
+        else:
+            max_w = max_width
+        align = p_pr.get("algn", "l") if p_pr is not None else "l"
+        blocks.append((_layout_paragraph(draw, runs, max_w), align, int(max_px * 1.2)))
+
+    total_h = sum(len(lines) * lh for lines, _, lh in blocks)
+    if anchor == "ctr":
+        y = y0 + max((y1 - y0) - total_h, 0) / 2
+    elif anchor == "b":
+        y = max(y1 - total_h, y0)
+    else:
+        y = y0
+    for lines, align, lh in blocks:
+        for line in lines:
+            if y > y1 + lh:  # overflowing text is clipped like a thumbnail would be
+                return
+            width = sum(draw.textlength(t, font=f) for t, f, _ in line)
+            if align == "ctr":
+                x = x0 + (max_width - width) / 2
+            elif align == "r":
+                x = x1 - width
+            else:
+                x = x0
+            for text, font, color in line:
+                draw.text((x, y), text, font=font, fill=color)
+                x += draw.textlength(text, font=font)
+            y += lh
+
+
+# ------------------------------------------------------------
+# SHAPES
+# ------------------------------------------------------------
+def _child_transform(group, transform):
+    """Compose the parent transform with a group's child coordinate space."""
+    ox, oy, sx, sy = transform
+    xfrm = group._element.find("p:grpSpPr/a:xfrm", _NS)
+    if xfrm is None:
+        return transform
+    off, ext = xfrm.find("a:off", _NS), xfrm.find("a:ext", _NS)
+    ch_off, ch_ext = xfrm.find("a:chOff", _NS), xfrm.find("a:chExt", _NS)
+    if None in (off, ext, ch_off, ch_ext):
+        return transform
+    gsx = int(ext.get("cx")) / max(int(ch_ext.get("cx")), 1)
+    gsy = int(ext.get("cy")) / max(int(ch_ext.get("cy")), 1)
+    # child x -> off.x + (x - chOff.x) * gsx, then through the parent transform
+    nox = ox + (int(off.get("x")) - int(ch_off.get("x")) * gsx) * sx
+    noy = oy + (int(off.get("y")) - int(ch_off.get("y")) * gsy) * sy
+    return nox, noy, sx * gsx, sy * gsy
+
+
+def _box(shape, transform):
+    ox, oy, sx, sy = transform
+    if shape.left is None or shape.width is None:
+        return None
+    x0 = ox + shape.left * sx
+    y0 = oy + shape.top * sy
+    return x0, y0, x0 + shape.width * sx, y0 + shape.height * sy
+
+
+def _draw_picture(img, shape, box):
+    try:
+        pic = Image.open(io.BytesIO(shape.image.blob)).convert("RGBA")
+        w, h = max(int(box[2] - box[0]), 1), max(int(box[3] - box[1]), 1)
+        pic = pic.resize((w, h))
+        img.paste(pic, (int(box[0]), int(box[1])), pic)
+    except Exception:
+        # EMF/WMF and other vector formats Pillow can't read: draw a neutral box
+        ImageDraw.Draw(img).rectangle(box, fill=(220, 220, 220), outline=(180, 180, 180))
+
+
+def _draw_table(draw, shape, box, scale, theme):
+    table = shape.table
+    col_w = [c.width * (box[2] - box[0]) / max(shape.width, 1) for c in table.columns]
+    row_h = [r.height * (box[3] - box[1]) / max(shape.height, 1) for r in table.rows]
+    y = box[1]
+    for ri, row in enumerate(table.rows):
+        x = box[0]
+        for ci, cell in enumerate(row.cells):
+            cell_box = (x, y, x + col_w[ci], y + row_h[ri])
+            fill = _fill_of(cell._tc.find("a:tcPr", _NS), None, theme)
+            draw.rectangle(cell_box, fill=fill, outline=(160, 160, 160))
+            if cell.text:
+                _draw_text_frame(draw, cell, cell_box, scale, theme, (30, 30, 30))
+            x += col_w[ci]
+        y += row_h[ri]
+
+
+def _draw_shape(img, draw, shape, transform, scale, theme):
+    if shape.shape_type == MSO_SHAPE_TYPE.GROUP:
+        child = _child_transform(shape, transform)
+        for s in shape.shapes:
+            _draw_shape(img, draw, s, child, scale, theme)
+        return
+    box = _box(shape, transform)
+    if box is None:
+        return
+    if shape.shape_type == MSO_SHAPE_TYPE.PICTURE or hasattr(shape, "image"):
+        _draw_picture(img, shape, box)
+        return
+    if getattr(shape, "has_table", False) and shape.has_table:
+        _draw_table(draw, shape, box, scale, theme)
+        return
+    if getattr(shape, "has_chart", False) and shape.has_chart:
+        draw.rectangle(box, fill=(235, 238, 245), outline=(170, 170, 190))
+        return
+
+    el = shape._element
+    sp_pr = el.find("p:spPr", _NS)
+    style = el.find("p:style", _NS)
+    fill = _fill_of(sp_pr, style, theme)
+    line = _line_of(sp_pr, style, theme)
+    outline, width = (line[0], max(int(line[1] * scale), 1)) if line else (None, 1)
+    geom = sp_pr.find("a:prstGeom", _NS) if sp_pr is not None else None
+    prst = geom.get("prst") if geom is not None else "rect"
+    if fill or outline:
+        if prst == "ellipse":
+            draw.ellipse(box, fill=fill, outline=outline, width=width)
+        elif prst in ("line", "straightConnector1"):
+            draw.line(box, fill=outline or fill, width=width)
+        elif prst == "roundRect":
+            radius = int(min(box[2] - box[0], box[3] - box[1]) * 0.16)
+            draw.rounded_rectangle(box, radius=radius, fill=fill, outline=outline, width=width)
+        else:
+            draw.rectangle(box, fill=fill, outline=outline, width=width)
+
+    if getattr(shape, "has_text_frame", False) and shape.has_text_frame and shape.text_frame.text.strip():
+        style_font = style.find("a:fontRef", _NS) if style is not None else None
+        default_color = _color_from(style_font, theme) or _color_from_name(theme, "tx1", (0, 0, 0))
+        _draw_text_frame(draw, shape, box, scale, theme, default_color)
+
+
+def _color_from_name(theme, name, fallback):
+    hexval = theme.get(name)
+    if hexval and len(hexval) == 6:
+        return tuple(int(hexval[i:i + 2], 16) for i in (0, 2, 4))
+    return fallback
+
+
+# ------------------------------------------------------------
+# PUBLIC API
+# ------------------------------------------------------------
+def render_slide(ppt_path, slide_index, width=None):
+    """Render one slide to a PIL image `width` pixels wide (height follows the slide ratio)."""
+    width = width or RENDER_WIDTH
+    prs = get_presentation(ppt_path)
+    slide = prs.slides[slide_index]
+    scale = width / prs.slide_width
+    height = int(prs.slide_height * scale)
+    theme = _theme_colors(slide)
+
+    img = Image.new("RGB", (width, height), color=_background(slide, theme))
+    draw = ImageDraw.Draw(img)
+    transform = (0.0, 0.0, scale, scale)
+    # layout/master decorations first (logos, bars), then the slide's own shapes
+    for owner in (slide.slide_layout.slide_master, slide.slide_layout):
+        for shape in owner.shapes:
+            if not shape.is_placeholder:
+                _safe_draw(img, draw, shape, transform, scale, theme)
+    for shape in slide.shapes:
+        _safe_draw(img, draw, shape, transform, scale, theme)
+    return img
+
+
+def _safe_draw(img, draw, shape, transform, scale, theme):
+    try:
+        _draw_shape(img, draw, shape, transform, scale, theme)
+    except Exception as e:
+        logger.debug(f"Skipped shape {getattr(shape, 'name', '?')}: {e}")
+
+
+def render_slide_to_png(ppt_path, slide_index, out_path=None, width=None):
+    """Render one slide and save it as PNG; returns the file path."""
+    if out_path is None:
+        out_path = os.path.join(
+            os.path.dirname(ppt_path) or tempfile.gettempdir(),
+            f"slide_{slide_index}_{uuid.uuid4().hex[:6]}.png"
+        )
+    render_slide(ppt_path, slide_index, width).save(out_path, format="PNG")
+    return out_path
+
+
+def render_slides_to_png(ppt_path, slide_indices=None, out_dir=None, width=None):
+    """Render several slides of one deck (all by default); returns PNG paths in slide order."""
+    if slide_indices is None:
+        slide_indices = range(len(get_presentation(ppt_path).slides))
+    out_dir = out_dir or os.path.join(tempfile.gettempdir(), f"slides_{uuid.uuid4().hex}")
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    for idx in slide_indices:
+        try:
+            paths.append(render_slide_to_png(ppt_path, idx, os.path.join(out_dir, f"Slide{idx + 1}.png"), width))
+        except Exception as e:
+            logger.exception(f"Render failed for slide {idx} of {ppt_path}: {e}")
+            paths.append(None)
+    return paths
+
+
+def render_decks(jobs, width=None, max_workers=None):
+    """
+    Render many decks in a process pool.
+    jobs: {ppt_path: [slide_index, ...] or None for all slides}
+    Returns {ppt_path: [png_path, ...]}.
+    """
+    max_workers = max_workers or RENDER_WORKERS
+    out = {}
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = {path: pool.submit(render_slides_to_png, path, indices, None, width)
+                   for path, indices in jobs.items()}
+        for path, fut in futures.items():
+            try:
+                out[path] = fut.result()
+            except Exception as e:
+                logger.exception(f"Render failed for {path}: {e}")
+                out[path] = []
+    return out
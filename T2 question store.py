@@ -0,0 +1,115 @@
+# question_store.py
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from utils import get_env, logger, ensure_dir
+
+# Generated Q&A questions, written by ingestion (INGEST_QUESTIONS) and on live cache misses.
+# Key = sha256(kind | prompt version | chat model | content hash): the same slide content asked
+# with the same prompt and model is answered once for every user and session; editing a prompt
+# means bumping its version in slide_questions, which simply starts a new set of keys.
+QUESTION_STORE_PATH = get_env("QUESTION_STORE_PATH", "./question_store/questions.sqlite3")
+QUESTION_STORE_ENABLED = get_env("QUESTION_STORE_ENABLED", "true").lower() not in ("0", "false", "no")
+
+_lock = threading.Lock()
+_initialized = False
+_stats = {"hits": 0, "misses": 0, "writes": 0}
+
+
+def _connect():
+    global _initialized
+    if not _initialized:
+        ensure_dir(os.path.dirname(os.path.abspath(QUESTION_STORE_PATH)))
+    conn = sqlite3.connect(QUESTION_STORE_PATH, timeout=30)
+    if not _initialized:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS questions (
+                key            TEXT PRIMARY KEY,
+                kind           TEXT,
+                prompt_version TEXT,
+                model          TEXT,
+                questions      TEXT,
+                created_at     REAL
+            )
+            """
+        )
+        conn.commit()
+        _initialized = True
+    return conn
+
+
+def content_hash(content):
+    """sha256 of the exact prompt input (str, or any JSON-serializable value)."""
+    if not isinstance(content, str):
+        content = json.dumps(content, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def question_key(kind, prompt_version, model, content_sha):
+    return hashlib.sha256(f"{kind}|{prompt_version}|{model}|{content_sha}".encode("utf-8")).hexdigest()
+
+
+def get_many(keys):
+    """Return a list aligned with `keys`: stored questions or None for each."""
+    if not QUESTION_STORE_ENABLED or not keys:
+        return [None] * len(keys)
+    found = {}
+    try:
+        with _connect() as conn:
+            unique = list(set(keys))
+            for i in range(0, len(unique), 500):  # stay under SQLite's bound-parameter limit
+                chunk = unique[i:i + 500]
+                marks = ",".join("?" * len(chunk))
+                for key, questions in conn.execute(
+                        f"SELECT key, questions FROM questions WHERE key IN ({marks})", chunk):
+                    found[key] = json.loads(questions)
+    except Exception as e:
+        logger.warning(f"Question store read failed: {e}")
+    out = [found.get(k) for k in keys]
+    hits = sum(1 for v in out if v is not None)
+    with _lock:
+        _stats["hits"] += hits
+        _stats["misses"] += len(out) - hits
+    return out
+
+
+def get(key):
+    return get_many([key])[0]
+
+
+def put_many(entries):
+    """entries: [(key, kind, prompt_version, model, questions)]."""
+    if not QUESTION_STORE_ENABLED or not entries:
+        return
+    now = time.time()
+    rows = [(key, kind, version, model, json.dumps(questions, ensure_ascii=False), now)
+            for key, kind, version, model, questions in entries]
+    try:
+        with _connect() as conn:
+            conn.executemany("INSERT OR REPLACE INTO questions VALUES (?, ?, ?, ?, ?, ?)", rows)
+        with _lock:
+            _stats["writes"] += len(rows)
+    except Exception as e:
+        logger.warning(f"Question store write failed: {e}")
+
+
+def put(key, kind, prompt_version, model, questions):
+    put_many([(key, kind, prompt_version, model, questions)])
+
+
+def question_store_stats():
+    with _lock:
+        stats = dict(_stats)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+    try:
+        with _connect() as conn:
+            stats["entries"] = conn.execute("SELECT COUNT(*) FROM questions").fetchone()[0]
+    except Exception:
+        pass
+    return stats
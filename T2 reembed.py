@@ -0,0 +1,109 @@
+# reembed.py
+import sys
+import time
+from utils import (get_env, logger, get_text_client, supports_dimensions,
+                   get_embedding_dim, DEFAULT_EMBEDDING_MODEL)
+from embedding_cache import cached_embed
+from embedding_batcher import embed_texts
+from vector_store import ActiveCollections, collection_spec, set_active_collection
+
+# Online switch of the embedding model/dimension:
+#   1. the alias file announces the target collection (ingestion starts writing to both)
+#   2. every slide of the serving collection is re-embedded into the target in batches
+#      while the old collection keeps answering searches
+#   3. a catch-up pass diffs ids (slide ids are deterministic) for writes that raced the copy
+#   4. the alias flips to the target in one atomic rename: searchers switch on their next query
+# Usage: python reembed.py <model> [dim] [--drop-old]
+REEMBED_BATCH = int(get_env("REEMBED_BATCH", "256"))         # slides read/embedded/written per step
+REEMBED_PAUSE = float(get_env("REEMBED_PAUSE", "0"))         # seconds between batches, to leave quota for live traffic
+REEMBED_CATCHUP_PASSES = int(get_env("REEMBED_CATCHUP_PASSES", "3"))
+
+
+def _copy_batch(source, target, spec, ids):
+    """Re-embed the given slide ids from source into target; returns (written, failed)."""
+    res = source.get(ids=ids, include=["documents", "metadatas"])
+    ids, docs, metas = res.get("ids", []), res.get("documents", []), res.get("metadatas", [])
+    if not ids:
+        return 0, 0
+    dimensions = spec["dim"] if supports_dimensions(spec["model"]) else None
+    embs = cached_embed(docs, spec["model"], spec["dim"],
+                        lambda texts: embed_texts(get_text_client(), spec["model"], texts, dimensions=dimensions))
+    keep = [i for i, e in enumerate(embs) if e is not None]
+    if keep:
+        target.upsert(ids=[ids[i] for i in keep], embeddings=[embs[i] for i in keep],
+                      documents=[docs[i] for i in keep], metadatas=[metas[i] for i in keep])
+    return len(keep), len(ids) - len(keep)
+
+
+def _all_ids(collection):
+    return set(collection.get(include=[]).get("ids", []))
+
+
+def _sync(source, target, spec, label):
+    """Copy ids missing from target, delete ids gone from source. Returns how many ids differed."""
+    source_ids, target_ids = _all_ids(source), _all_ids(target)
+    missing = sorted(source_ids - target_ids)
+    extra = sorted(target_ids - source_ids)
+    written = failed = 0
+    for i in range(0, len(missing), REEMBED_BATCH):
+        w, f = _copy_batch(source, target, spec, missing[i:i + REEMBED_BATCH])
+        written, failed = written + w, failed + f
+        logger.info(f"[{label}] {min(i + REEMBED_BATCH, len(missing))}/{len(missing)} slide(s) re-embedded")
+        if REEMBED_PAUSE:
+            time.sleep(REEMBED_PAUSE)
+    if extra:
+        target.delete(ids=extra)
+    logger.info(f"[{label}] {written} written, {failed} failed, {len(extra)} removed")
+    return len(missing) + len(extra)
+
+
+def reembed(model, dim=None, drop_old=False):
+    """
+    Fill the collection for (model, dim) from the serving collection and cut over to it.
+    Safe to re-run after an interruption: slides already in the target are not re-embedded.
+    Returns the new active spec, or None if the cut-over was not made.
+    """
+    collections = ActiveCollections(None, get_env("EMBEDDING_MODEL", DEFAULT_EMBEDDING_MODEL),
+                                    write_alias=True)
+    source_spec = collections.active()
+    target_spec = collection_spec(model, dim or get_embedding_dim(model))
+    if target_spec["name"] == source_spec["name"]:
+        logger.info(f"{target_spec['name']} is already the active collection; nothing to do.")
+        return source_spec
+
+    logger.info(f"Re-embedding {source_spec['name']} -> {target_spec['name']}")
+    set_active_collection(source_spec, migrating_to=target_spec)
+    source, target = collections.collection(source_spec), collections.collection(target_spec)
+
+    _sync(source, target, target_spec, "bulk")
+    in_sync = False
+    for n in range(max(1, REEMBED_CATCHUP_PASSES)):
+        if _sync(source, target, target_spec, f"catch-up {n + 1}") == 0:
+            in_sync = True
+            break
+    if not in_sync:
+        logger.error("Target still differs from the serving collection; not cutting over (re-run to retry).")
+        return None
+
+    set_active_collection(target_spec)   # atomic cut-over
+    logger.info(f"Cut over to {target_spec['name']}; {source_spec['name']} kept for rollback.")
+    if drop_old:
+        try:
+            collections.drop(source_spec)
+            logger.info(f"Dropped {source_spec['name']}")
+        except Exception as e:
+            logger.exception(f"Could not drop {source_spec['name']}: {e}")
+    return target_spec
+
+
+def rollback(name, model, dim):
+    """Point the alias back at an older collection that was kept after a cut-over."""
+    set_active_collection(collection_spec(model, dim, name))
+
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    if not args:
+        print("usage: python reembed.py <model> [dim] [--drop-old]")
+        sys.exit(2)
+    reembed(args[0], int(args[1]) if len(args) > 1 else None, drop_old="--drop-old" in sys.argv)
@@ -0,0 +1,305 @@
+# render_pool.py
+import os
+import sys
+import uuid
+import queue
+import atexit
+import shutil
+import tempfile
+import threading
+import subprocess
+from concurrent.futures import Future, ProcessPoolExecutor
+from utils import get_env, logger
+from deck_cache import file_sha256
+import thumbnail_cache
+
+# Long-lived render workers fed by a job queue. One job = one deck + the slides wanted from it,
+# so each deck is opened once per job and several decks render concurrently.
+RENDER_BACKEND = get_env("SLIDE_RENDERER", "com" if sys.platform == "win32" else "pil")
+RENDER_POOL_WORKERS = int(get_env("RENDER_POOL_WORKERS", str(os.cpu_count() or 2)))   # COM always uses 1
+RENDER_WIDTH = int(get_env("RENDER_WIDTH", "1280"))
+SOFFICE_BIN = get_env("SOFFICE_BIN", "soffice")
+SOFFICE_TIMEOUT = int(get_env("SOFFICE_TIMEOUT", "180"))
+
+
+def _png_path(out_dir, slide_index):
+    return os.path.join(out_dir, f"slide_{slide_index}_{uuid.uuid4().hex[:6]}.png")
+
+
+# ------------------------------------------------------------
+# BACKENDS
+# A backend is created once per worker thread and must provide
+#   render_deck(ppt_path, slide_indices, out_dir, width) -> [png_path or None, ...]
+#   close()
+# and may provide a classmethod renderer_version() that is part of the thumbnail cache key,
+# and a max_workers class attribute capping the pool's worker threads.
+# ------------------------------------------------------------
+_pil_processes = None
+_pil_processes_lock = threading.Lock()
+
+
+def _pil_process_pool():
+    """CPU-bound Pillow rendering runs in a shared process pool, not on the GIL."""
+    global _pil_processes
+    with _pil_processes_lock:
+        if _pil_processes is None:
+            _pil_processes = ProcessPoolExecutor(max_workers=RENDER_POOL_WORKERS)
+        return _pil_processes
+
+
+def _pil_render_deck(ppt_path, slide_indices, out_dir, width):
+    from pil_slide_renderer import render_slide_to_png
+    out = []
+    for idx in slide_indices:
+        try:
+            out.append(render_slide_to_png(ppt_path, idx, _png_path(out_dir, idx), width))
+        except Exception as e:
+            logger.exception(f"PIL render failed for slide {idx} of {ppt_path}: {e}")
+            out.append(None)
+    return out
+
+
+class PilBackend:
+    """Headless Pillow renderer (pil_slide_renderer) in a process pool."""
+
+    @classmethod
+    def renderer_version(cls):
+        from pil_slide_renderer import RENDERER_VERSION
+        return RENDERER_VERSION
+
+    def render_deck(self, ppt_path, slide_indices, out_dir, width):
+        return _pil_process_pool().submit(_pil_render_deck, ppt_path, slide_indices, out_dir, width).result()
+
+    def close(self):
+        pass
+
+
+class ComBackend:
+    """
+    PowerPoint automation; the application stays open for the life of the worker.
+    PowerPoint.Application is one shared instance per desktop session, so the pool runs a
+    single COM worker, and the app is only quit on close if this backend started it.
+    """
+    max_workers = 1
+
+    @classmethod
+    def renderer_version(cls):
+        return "com-2"
+
+    def __init__(self):
+        import pythoncom
+        import win32com.client
+        self._pythoncom = pythoncom
+        pythoncom.CoInitialize()
+        try:
+            win32com.client.GetActiveObject("PowerPoint.Application")
+            self._started_app = False   # the user's (or another process's) PowerPoint
+        except Exception:
+            self._started_app = True
+        self.app = win32com.client.Dispatch("PowerPoint.Application")
+        self.app.Visible = True   # MUST be visible on enterprise laptops
+
+    def render_deck(self, ppt_path, slide_indices, out_dir, width):
+        pres = self.app.Presentations.Open(os.path.abspath(ppt_path), ReadOnly=True, WithWindow=False)
+        try:
+            # keep the deck's own aspect ratio (16:9, 4:3, custom sizes)
+            setup = pres.PageSetup
+            height = int(round(width * setup.SlideHeight / setup.SlideWidth))
+            out = []
+            for idx in slide_indices:
+                try:
+                    path = _png_path(out_dir, idx)
+                    pres.Slides.Item(idx + 1).Export(path, "PNG", width, height)
+                    out.append(path)
+                except Exception as e:
+                    logger.exception(f"COM export failed for slide {idx} of {ppt_path}: {e}")
+                    out.append(None)
+            return out
+        finally:
+            pres.Close()
+
+    def close(self):
+        try:
+            if self._started_app and self.app.Presentations.Count == 0:
+                self.app.Quit()
+        finally:
+            self._pythoncom.CoUninitialize()
+
+
+class SofficeBackend:
+    """
+    Headless LibreOffice: one pptx -> pdf conversion per deck, then pdftoppm per requested page.
+    Each worker gets its own LibreOffice profile so conversions can run in parallel.
+    """
+
+    @classmethod
+    def renderer_version(cls):
+        return "soffice-1"
+
+    def __init__(self):
+        self.profile = tempfile.mkdtemp(prefix="lo_profile_")
+
+    def render_deck(self, ppt_path, slide_indices, out_dir, width):
+        work = tempfile.mkdtemp(prefix="lo_render_")
+        try:
+            subprocess.run(
+                [SOFFICE_BIN, f"-env:UserInstallation=file://{self.profile}", "--headless",
+                 "--convert-to", "pdf", "--outdir", work, os.path.abspath(ppt_path)],
+                check=True, timeout=SOFFICE_TIMEOUT, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+            )
+            pdf = os.path.join(work, os.path.splitext(os.path.basename(ppt_path))[0] + ".pdf")
+            out = []
+            for idx in slide_indices:
+                path = _png_path(out_dir, idx)
+                try:
+                    subprocess.run(
+                        ["pdftoppm", "-png", "-singlefile", "-f", str(idx + 1), "-l", str(idx + 1),
+                         "-scale-to-x", str(width), "-scale-to-y", "-1", pdf, path[:-len(".png")]],
+                        check=True, timeout=SOFFICE_TIMEOUT, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+                    )
+                    out.append(path)
+                except Exception as e:
+                    logger.exception(f"pdftoppm failed for slide {idx} of {ppt_path}: {e}")
+                    out.append(None)
+            return out
+        finally:
+            shutil.rmtree(work, ignore_errors=True)
+
+    def close(self):
+        shutil.rmtree(self.profile, ignore_errors=True)
+
+
+_BACKENDS = {"pil": PilBackend, "com": ComBackend, "soffice": SofficeBackend}
+
+
+def register_backend(name, factory):
+    """Plug in another renderer: factory() -> object with render_deck(...) and close()."""
+    _BACKENDS[name] = factory
+
+
+# ------------------------------------------------------------
+# POOL
+# ------------------------------------------------------------
+_STOP = object()
+
+
+class RenderPool:
+    """Fixed set of worker threads, each owning one backend instance, consuming a job queue."""
+
+    def __init__(self, backend=None, workers=None):
+        self.backend_name = backend or RENDER_BACKEND
+        if self.backend_name not in _BACKENDS:
+            raise ValueError(f"Unknown render backend: {self.backend_name}")
+        factory = _BACKENDS[self.backend_name]
+        self.renderer_version = factory.renderer_version() if hasattr(factory, "renderer_version") \
+            else self.backend_name
+        workers = workers or RENDER_POOL_WORKERS
+        if getattr(factory, "max_workers", None):
+            workers = min(workers, factory.max_workers)
+        self.jobs = queue.Queue()
+        self.workers = [
+            threading.Thread(target=self._worker, name=f"render-{self.backend_name}-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for t in self.workers:
+            t.start()
+
+    def _worker(self):
+        backend = None
+        try:
+            while True:
+                job = self.jobs.get()
+                if job is _STOP:
+                    return
+                ppt_path, slide_indices, out_dir, width, fut = job
+                if not fut.set_running_or_notify_cancel():
+                    continue
+                try:
+                    if backend is None:
+                        backend = _BACKENDS[self.backend_name]()
+                    fut.set_result(backend.render_deck(ppt_path, slide_indices, out_dir, width))
+                except Exception as e:
+                    logger.exception(f"Render job failed for {ppt_path}: {e}")
+                    fut.set_exception(e)
+        finally:
+            if backend is not None:
+                try:
+                    backend.close()
+                except Exception:
+                    logger.exception("Render backend close failed")
+
+    def submit(self, ppt_path, slide_indices, out_dir=None, width=None):
+        """Queue one deck; the Future resolves to PNG paths aligned with slide_indices."""
+        fut = Future()
+        out_dir = out_dir or os.path.dirname(os.path.abspath(ppt_path))
+        self.jobs.put((ppt_path, list(slide_indices), out_dir, width or RENDER_WIDTH, fut))
+        return fut
+
+    def submit_cached(self, ppt_path, slide_indices, width=None):
+        """
+        Like submit(), but served from the thumbnail cache; only missing slides are rendered
+        and stored. The Future resolves to cached PNG paths aligned with slide_indices.
+        """
+        width = width or RENDER_WIDTH
+        indices = list(slide_indices)
+        deck_sha = file_sha256(ppt_path)
+        cached = [thumbnail_cache.get(deck_sha, i, width, self.renderer_version) for i in indices]
+        missing = [i for i, p in zip(indices, cached) if p is None]
+        fut = Future()
+        if not missing:
+            fut.set_result(cached)
+            return fut
+
+        def _store(inner):
+            try:
+                rendered = dict(zip(missing, inner.result()))
+                stored = {
+                    i: thumbnail_cache.put(deck_sha, i, width, self.renderer_version, p) if p else None
+                    for i, p in rendered.items()
+                }
+                fut.set_result([p if p else stored.get(i) for i, p in zip(indices, cached)])
+            except Exception as e:
+                fut.set_exception(e)
+
+        self.submit(ppt_path, missing, out_dir=tempfile.gettempdir(), width=width).add_done_callback(_store)
+        return fut
+
+    def render(self, decks, width=None):
+        """decks: {ppt_path: [slide_index, ...]} -> {ppt_path: [png_path, ...]}, decks in parallel."""
+        futures = {path: self.submit_cached(path, indices, width=width) for path, indices in decks.items()}
+        out = {}
+        for path, fut in futures.items():
+            try:
+                out[path] = fut.result()
+            except Exception:
+                out[path] = [None] * len(decks[path])
+        return out
+
+    def shutdown(self):
+        for _ in self.workers:
+            self.jobs.put(_STOP)
+        for t in self.workers:
+            t.join(timeout=30)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_render_pool():
+    """Process-wide pool, created on first use and shut down at exit."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = RenderPool()
+            atexit.register(_shutdown)
+        return _pool
+
+
+def _shutdown():
+    global _pil_processes
+    if _pool is not None:
+        _pool.shutdown()
+    if _pil_processes is not None:
+        _pil_processes.shutdown(wait=False)
+        _pil_processes = None
@@ -1,58 +1,187 @@
 import os
-from openai import AzureOpenAI
-from chromadb import PersistentClient
-from utils import get_env, logger, get_embedding_dim
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from vector_store import ActiveCollections
+from utils import get_env, logger, tag_key, supports_dimensions, get_text_client, DEFAULT_EMBEDDING_MODEL
+from embedding_cache import cached_embed, normalize_text
+import lexical_index
 
-# === TEXT client (GPT + embeddings) ===
-text_client = AzureOpenAI(
-    azure_endpoint=get_env("OPENAI_API_BASE", required=True),
-    api_key=get_env("OPENAI_API_KEY", required=True),
-    api_version=get_env("OPENAI_API_VERSION", "2024-05-01-preview")
-)
+# queries are embedded with the model/dim of the active collection; this is only the fallback
+EMBEDDING_MODEL = get_env("EMBEDDING_MODEL", DEFAULT_EMBEDDING_MODEL)
+QUERY_CACHE_SIZE = int(get_env("QUERY_CACHE_SIZE", "1024"))
+QUERY_CACHE_TTL = float(get_env("QUERY_CACHE_TTL", "3600"))   # seconds
+# hybrid search: fuse BM25 and vector rankings with reciprocal-rank fusion
+HYBRID_RRF_K = int(get_env("HYBRID_RRF_K", "60"))
+HYBRID_CANDIDATES = int(get_env("HYBRID_CANDIDATES", "30"))       # hits taken from each ranking
+HYBRID_EMBED_TIMEOUT = float(get_env("HYBRID_EMBED_TIMEOUT", "2.5"))  # seconds before lexical-only
+# relevance floor for hits without a vector distance: BM25 score (-bm25, higher is better);
+# terms that occur in most slides score close to 0
+HYBRID_MIN_BM25 = float(get_env("HYBRID_MIN_BM25", "1.0"))
 
-EMBEDDING_MODEL = get_env("EMBEDDING_MODEL", "text-embedding-3-large")
-EMBEDDING_DIM = get_embedding_dim(EMBEDDING_MODEL)
-CHROMA_PERSIST_DIR = get_env("CHROMA_PERSIST_DIR", "./chroma_db")
 
+# === Chroma Initialization (lazy: the shared client is opened by the first search) ===
+# model-versioned collections behind an alias file; a re-embed cut-over is picked up live
+collections = ActiveCollections(None, EMBEDDING_MODEL)
 
-# === Chroma Initialization (Safe) ===
-chroma_client = PersistentClient(path=CHROMA_PERSIST_DIR)
 
-try:
-    collection = chroma_client.get_collection("ppt_slides")
-except Exception:
-    collection = chroma_client.create_collection("ppt_slides")
+# ------------------------------------------------------------
+# GENERATE EMBEDDING
+# ------------------------------------------------------------
+def _api_embedder(model, dim):
+    extra = {"dimensions": dim} if supports_dimensions(model) else {}
+
+    def _embed_via_api(texts):
+        try:
+            resp = get_text_client().embeddings.create(
+                model=model,
+                input=texts,
+                **extra
+            )
+            return [d.embedding for d in resp.data]
+        except Exception as e:
+            logger.exception(f"Embedding failed: {e}")
+            return []
+    return _embed_via_api
+
+
+def get_embedding(text, spec=None):
+    # on-disk cache first; only a miss goes to Azure OpenAI
+    spec = spec or collections.active()
+    return cached_embed([text], spec["model"], spec["dim"], _api_embedder(spec["model"], spec["dim"]))[0]
 
 
 # ------------------------------------------------------------
-# GENERATE EMBEDDING
+# QUERY EMBEDDING CACHE (in-process LRU + TTL, shared by all sessions)
 # ------------------------------------------------------------
-def get_embedding(text):
-    try:
-        resp = text_client.embeddings.create(
-            model=EMBEDDING_MODEL,
-            input=text
-        )
-        return resp.data[0].embedding
-    except Exception as e:
-        logger.exception(f"Embedding failed: {e}")
-        return None
+_query_cache = OrderedDict()     # (model, dim, normalized query) -> (expires_at, embedding)
+_query_cache_lock = threading.Lock()
+_query_cache_stats = {"hits": 0, "misses": 0, "evictions": 0, "expired": 0}
+
+
+def get_query_embeddings(queries, spec=None):
+    """
+    Embeddings for search queries, aligned with `queries` (None where embedding failed),
+    made with the model/dim of `spec` (default: the active collection).
+    Repeated queries (reruns, canned prompts, other users) are answered from memory; all
+    remaining misses go to the disk cache / Azure OpenAI together in one request.
+    """
+    spec = spec or collections.active()
+    keys = [(spec["model"], spec["dim"], normalize_text(q)) for q in queries]
+    out = [None] * len(queries)
+    now = time.monotonic()
+    with _query_cache_lock:
+        for i, key in enumerate(keys):
+            hit = _query_cache.get(key)
+            if hit is not None:
+                if hit[0] > now:
+                    _query_cache.move_to_end(key)
+                    _query_cache_stats["hits"] += 1
+                    out[i] = hit[1]
+                    continue
+                del _query_cache[key]
+                _query_cache_stats["expired"] += 1
+            _query_cache_stats["misses"] += 1
+
+    missing = [i for i, emb in enumerate(out) if emb is None]
+    if not missing:
+        return out
+    embs = cached_embed([queries[i] for i in missing], spec["model"], spec["dim"],
+                        _api_embedder(spec["model"], spec["dim"]))
+
+    with _query_cache_lock:
+        for i, emb in zip(missing, embs):
+            if emb is None:
+                continue   # failures are not cached
+            out[i] = emb
+            _query_cache[keys[i]] = (now + QUERY_CACHE_TTL, emb)
+            _query_cache.move_to_end(keys[i])
+        while len(_query_cache) > QUERY_CACHE_SIZE:
+            _query_cache.popitem(last=False)
+            _query_cache_stats["evictions"] += 1
+    return out
+
+
+def get_query_embedding(query, spec=None):
+    return get_query_embeddings([query], spec)[0]
+
+
+def query_cache_stats():
+    with _query_cache_lock:
+        stats = dict(_query_cache_stats)
+        stats["size"] = len(_query_cache)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+    return stats
+
+
+def clear_query_cache():
+    with _query_cache_lock:
+        _query_cache.clear()
 
 
 # ------------------------------------------------------------
 # SEMANTIC SEARCH (Chroma-compatible filtering)
 # ------------------------------------------------------------
-def semantic_search(query, top_k=5, tags=None):
-    emb = get_embedding(query)
+def build_tag_filter(tags, match="any"):
+    """
+    Chroma `where` clause for a tag filter, pushed down into the vector query.
+    Each tag is its own boolean metadata key (tag_<name>), so match="any" is an $or and
+    match="all" an $and over those keys. Returns None when there is nothing to filter.
+    """
+    if not tags:
+        return None
+    if match not in ("any", "all"):
+        raise ValueError(f"Unknown tag match mode: {match}")
+    clauses = [{tag_key(t): True} for t in dict.fromkeys(tags) if str(t).strip()]
+    if not clauses:
+        return None
+    if len(clauses) == 1:
+        return clauses[0]
+    return {"$or" if match == "any" else "$and": clauses}
+
+
+def _slide_index(meta):
+    """0-based slide position from metadata; older entries only carry "<deck>_Slide_XX"."""
+    idx = meta.get("slide_index")
+    if idx is None and "_Slide_" in (meta.get("slide_id") or ""):
+        idx = meta["slide_id"].rsplit("_Slide_", 1)[1]
+    try:
+        return int(idx)
+    except (TypeError, ValueError):
+        return None
+
+
+def _format_hits(res, qi):
+    ids = res.get("ids", [[]])[qi]
+    metas = res.get("metadatas", [[]])[qi]
+    docs = res.get("documents", [[]])[qi]
+    dists = res.get("distances", [[]])[qi]
+
+    out = []
+    for i in range(len(ids)):
+        out.append({
+            "id": ids[i],
+            "ppt_name": metas[i].get("ppt_name"),
+            "slide_id": metas[i].get("slide_id"),
+            "slide_index": _slide_index(metas[i]),
+            "title": metas[i].get("title"),
+            "text": docs[i],
+            "tags": metas[i].get("tags"),
+            "score": dists[i]
+        })
+    return out
+
+
+def semantic_search(query, top_k=5, tags=None, tag_match="any"):
+    spec = collections.active()   # embed and query against the same collection
+    emb = get_query_embedding(query, spec)
     if emb is None:
         return []
+    collection = collections.collection(spec)
 
-    # Chroma DOES NOT support $or, $contains anymore.
-    # It only supports simple equality match:
-    # where = { "tag": "value" }
-    filters = None
-    if tags and len(tags) > 0:
-        filters = {"tags": tags[0]}   # pick first tag for filtering
+    filters = build_tag_filter(tags, tag_match)
 
     try:
         if filters:
@@ -67,25 +196,139 @@ def semantic_search(query, top_k=5, tags=None):
                 n_results=top_k
             )
 
-        ids = res.get("ids", [[]])[0]
-        metas = res.get("metadatas", [[]])[0]
-        docs = res.get("documents", [[]])[0]
-        dists = res.get("distances", [[]])[0]
-
-        out = []
-        for i in range(len(ids)):
-            out.append({
-                "id": ids[i],
-                "ppt_name": metas[i].get("ppt_name"),
-                "slide_id": metas[i].get("slide_id"),
-                "title": metas[i].get("title"),
-                "text": docs[i],
-                "tags": metas[i].get("tags"),
-                "score": dists[i]
-            })
+        return _format_hits(res, 0)
+
+    except Exception as e:
+        logger.exception(f"Chroma query failed: {e}")
+        return []
 
-        return out
 
+def semantic_search_many(queries, top_k=5, tags=None, tag_match="any", dedupe=False):
+    """
+    Run several searches (e.g. one per outline section) in one embedding request and one
+    Chroma query. Returns a list of result lists aligned with `queries`.
+    dedupe=True keeps each slide only under the query it matched best, so sections do not
+    all pick the same slide.
+    """
+    queries = list(queries)
+    if not queries:
+        return []
+    spec = collections.active()
+    embs = get_query_embeddings(queries, spec)
+    live = [i for i, emb in enumerate(embs) if emb is not None]
+    results = [[] for _ in queries]
+    if not live:
+        return results
+
+    filters = build_tag_filter(tags, tag_match)
+    try:
+        kwargs = {"query_embeddings": [embs[i] for i in live], "n_results": top_k}
+        if filters:
+            kwargs["where"] = filters
+        res = collections.collection(spec).query(**kwargs)
+    except Exception as e:
+        logger.exception(f"Chroma multi-query failed: {e}")
+        return results
+
+    for qi, i in enumerate(live):
+        results[i] = _format_hits(res, qi)
+
+    if dedupe:
+        best = {}   # slide id -> (score, query index)
+        for i, hits in enumerate(results):
+            for h in hits:
+                if h["id"] not in best or h["score"] < best[h["id"]][0]:
+                    best[h["id"]] = (h["score"], i)
+        results = [[h for h in hits if best[h["id"]][1] == i] for i, hits in enumerate(results)]
+    return results
+
+
+# ------------------------------------------------------------
+# HYBRID SEARCH (BM25 + vector, reciprocal-rank fusion)
+# ------------------------------------------------------------
+_embed_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="query-embed")
+
+
+def lexical_search(query, top_k=5, tags=None, tag_match="any"):
+    """BM25-only search over the local lexical index; no network calls."""
+    # an index that predates the lexical side is loaded from the collection in the background
+    lexical_index.ensure_loaded(collections.collection, background=True)
+    hits = lexical_index.search(query, top_k=top_k, tags=tags, tag_match=tag_match)
+    for h in hits:
+        h["slide_index"] = _slide_index(h)
+    return hits
+
+
+def _vector_hits(emb, spec, top_k, tags, tag_match):
+    filters = build_tag_filter(tags, tag_match)
+    try:
+        kwargs = {"query_embeddings": [emb], "n_results": top_k}
+        if filters:
+            kwargs["where"] = filters
+        return _format_hits(collections.collection(spec).query(**kwargs), 0)
     except Exception as e:
         logger.exception(f"Chroma query failed: {e}")
         return []
+
+
+def reciprocal_rank_fusion(rankings, k=None):
+    """Fuse ranked hit lists: each hit scores sum(1 / (k + rank)) over the lists it appears in."""
+    k = HYBRID_RRF_K if k is None else k
+    fused, hits = {}, {}
+    for ranking in rankings:
+        for rank, h in enumerate(ranking, start=1):
+            fused[h["id"]] = fused.get(h["id"], 0.0) + 1.0 / (k + rank)
+            merged = hits.setdefault(h["id"], dict(h))
+            for key, val in h.items():
+                if merged.get(key) is None:
+                    merged[key] = val
+    out = []
+    for sid in sorted(fused, key=fused.get, reverse=True):
+        hits[sid]["rrf_score"] = fused[sid]
+        out.append(hits[sid])
+    return out
+
+
+def hybrid_search(query, top_k=5, tags=None, tag_match="any", embed_timeout=None):
+    """
+    BM25 + vector search fused with reciprocal-rank fusion. Hits keep "score" as the vector
+    distance (None for lexical-only hits) and add "bm25" and "rrf_score".
+    If the query embedding is not ready within embed_timeout seconds (endpoint slow, over
+    quota or failing) the lexical ranking is served on its own.
+    """
+    candidates = max(top_k, HYBRID_CANDIDATES)
+    spec = collections.active()
+    emb_future = _embed_executor.submit(get_query_embedding, query, spec)
+    lexical = lexical_search(query, top_k=candidates, tags=tags, tag_match=tag_match)
+
+    try:
+        emb = emb_future.result(timeout=HYBRID_EMBED_TIMEOUT if embed_timeout is None else embed_timeout)
+    except FutureTimeout:
+        # the embedding keeps running in the background and lands in the query cache
+        logger.warning(f"Query embedding slower than timeout; serving lexical results for: {query[:60]}")
+        emb = None
+    except Exception as e:
+        logger.warning(f"Query embedding failed; serving lexical results: {e}")
+        emb = None
+
+    if emb is None:
+        return lexical[:top_k]
+    vector = _vector_hits(emb, spec, candidates, tags, tag_match)
+    return reciprocal_rank_fusion([vector, lexical])[:top_k]
+
+
+def relevant_hits(hits, max_distance, min_bm25=None):
+    """
+    Hits that pass a relevance threshold: vector distance <= max_distance, or for hits with
+    no vector distance (lexical-only, e.g. while the embedding endpoint is down) a BM25 score
+    of at least min_bm25.
+    """
+    min_bm25 = HYBRID_MIN_BM25 if min_bm25 is None else min_bm25
+    out = []
+    for h in hits:
+        if h.get("score") is not None:
+            if h["score"] <= max_distance:
+                out.append(h)
+        elif h.get("bm25") is not None and -h["bm25"] >= min_bm25:
+            out.append(h)
+    return out
@@ -0,0 +1,188 @@
+# slide_catalog.py
+import time
+from collections import OrderedDict
+from concurrent.futures import wait, FIRST_COMPLETED
+from utils import get_env, logger
+from deck_loader import submit_deck, submit_extract
+from pptx_fast_text import slide_count
+
+# Slides of the decks behind a set of search hits, materialized on demand: first only the slides
+# that matched (time-to-first-thumbnail no longer grows with deck size), then their neighbours
+# and further pages of a deck when the user asks for them.
+SLIDE_CATALOG_NEIGHBOURS = int(get_env("SLIDE_CATALOG_NEIGHBOURS", "1"))   # slides each side of a match
+SLIDE_CATALOG_PAGE_SIZE = int(get_env("SLIDE_CATALOG_PAGE_SIZE", "12"))
+# streaming load: seconds from the start by which decks must be local / slides extracted;
+# whatever is late is skipped (and can still be loaded from the selection page)
+SLIDE_LOAD_DOWNLOAD_DEADLINE = float(get_env("SLIDE_LOAD_DOWNLOAD_DEADLINE", "15"))
+SLIDE_LOAD_EXTRACT_DEADLINE = float(get_env("SLIDE_LOAD_EXTRACT_DEADLINE", "30"))
+
+
+class SlideCatalog:
+    """
+    extract(blob_name, local_path, slide_indices) -> [slide record with "slide_index"] is
+    supplied by the page, so each page keeps its own record shape (text previews, rendered
+    thumbnails + editable shapes, ...). Keep the catalog in st.session_state across reruns.
+    """
+
+    def __init__(self, hits, extract):
+        self.extract = extract
+        self.matched = OrderedDict()    # blob -> matched slide indices, best hit first
+        self.hit_order = []             # (blob, slide index) in hit rank order
+        for h in hits:
+            blob = h.get("ppt_name")
+            if not blob:
+                continue
+            indices = self.matched.setdefault(blob, [])
+            idx = h.get("slide_index")
+            if idx is not None and idx not in indices:
+                indices.append(idx)
+                self.hit_order.append((blob, idx))
+        self.local_paths = {}           # blob -> local deck path
+        self.slide_counts = {}          # blob -> number of slides in the deck
+        self.records = {}               # blob -> {slide_index: record}
+        self.streamed = False           # iter_matched() has run (fully or up to a deadline)
+        self.late = set()               # decks that missed a streaming deadline
+
+    # ---------- loading ----------
+    def _extract(self, blob_name, local_path, indices):
+        count = slide_count(local_path)
+        wanted = sorted({i for i in indices if 0 <= i < count})
+        return count, (self.extract(blob_name, local_path, wanted) if wanted else [])
+
+    def _store(self, blob_name, local_path, count, records):
+        self.local_paths[blob_name] = local_path
+        self.slide_counts[blob_name] = count
+        loaded = self.records.setdefault(blob_name, {})
+        for r in records:
+            loaded[r["slide_index"]] = r
+
+    def _wanted(self, blob_name):
+        # hits without a slide position (older index entries): start with the first page
+        return self.matched[blob_name] or list(range(SLIDE_CATALOG_PAGE_SIZE))
+
+    def iter_matched(self, download_deadline=None, extract_deadline=None):
+        """
+        Fetch every matched deck concurrently and yield the matched slides' records deck by
+        deck: one extraction job per deck covering all of its matched slides (one open of the
+        deck, one render batch), submitted as soon as the deck is local.
+        Decks not local by download_deadline, or not extracted by extract_deadline (seconds
+        from the start), are skipped and listed in self.late.
+        """
+        download_deadline = SLIDE_LOAD_DOWNLOAD_DEADLINE if download_deadline is None else download_deadline
+        extract_deadline = SLIDE_LOAD_EXTRACT_DEADLINE if extract_deadline is None else extract_deadline
+        start = time.monotonic()
+        downloads = {submit_deck(b): b for b in self.matched}
+        extractions = {}
+        try:
+            while downloads or extractions:
+                elapsed = time.monotonic() - start
+                if downloads and elapsed >= download_deadline:
+                    logger.warning(f"Deck download deadline passed; skipping {sorted(downloads.values())}")
+                    self.late.update(downloads.values())
+                    downloads = {}
+                    continue
+                if elapsed >= extract_deadline:
+                    late = sorted(extractions.values())
+                    logger.warning(f"Slide extraction deadline passed; skipping slides of {late}")
+                    self.late.update(late)
+                    break
+                timeout = (download_deadline if downloads else extract_deadline) - elapsed
+                done, _ = wait(list(downloads) + list(extractions), timeout=timeout, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    if fut in downloads:
+                        blob_name = downloads.pop(fut)
+                        try:
+                            local_path, _ = fut.result()
+                            self.local_paths[blob_name] = local_path
+                            fut = submit_extract(self._extract, blob_name, local_path, self._wanted(blob_name))
+                            extractions[fut] = blob_name
+                        except Exception as e:
+                            logger.exception(f"Failed to download {blob_name}: {e}")
+                    else:
+                        blob_name = extractions.pop(fut)
+                        try:
+                            count, records = fut.result()
+                            self._store(blob_name, self.local_paths[blob_name], count, records)
+                            yield from records
+                        except Exception as e:
+                            logger.exception(f"Failed to extract slides of {blob_name}: {e}")
+        finally:
+            # a stream closed early (e.g. a Streamlit rerun) leaves these decks for load_more()
+            self.late.update(downloads.values())
+            self.late.update(extractions.values())
+            self.streamed = True
+
+    def load_matched(self, download_deadline=None, extract_deadline=None):
+        """iter_matched() run to the end; returns slides()."""
+        for _ in self.iter_matched(download_deadline, extract_deadline):
+            pass
+        return self.slides()
+
+    def _load_indices(self, blob_name, indices):
+        local_path = self.local_paths.get(blob_name)
+        if local_path is None:
+            # a deck that missed a streaming deadline
+            try:
+                local_path, _ = submit_deck(blob_name).result()
+            except Exception as e:
+                logger.exception(f"Failed to download {blob_name}: {e}")
+                return 0
+        loaded = self.records.get(blob_name, {})
+        missing = [i for i in indices if i not in loaded]
+        if not missing:
+            return 0
+        try:
+            count, records = self._extract(blob_name, local_path, missing)
+            self._store(blob_name, local_path, count, records)
+            if all(i in self.records[blob_name] for i in self.matched[blob_name]):
+                self.late.discard(blob_name)
+            return len(records)
+        except Exception as e:
+            logger.exception(f"Failed to extract slides {missing} of {blob_name}: {e}")
+            return 0
+
+    def expand(self, blob_name, radius=None):
+        """Add the neighbours of the matched slides of one deck; returns how many were added."""
+        radius = SLIDE_CATALOG_NEIGHBOURS if radius is None else radius
+        indices = {i + d for i in self.matched.get(blob_name, []) for d in range(-radius, radius + 1)}
+        return self._load_indices(blob_name, sorted(indices))
+
+    def load_more(self, blob_name, page_size=None):
+        """
+        Add the next page of not-yet-loaded slides of one deck: matched slides a deadline
+        skipped come first, then the rest in deck order.
+        """
+        page_size = page_size or SLIDE_CATALOG_PAGE_SIZE
+        loaded = self.records.get(blob_name, {})
+        if blob_name not in self.slide_counts:
+            rest = self._wanted(blob_name)
+        else:
+            rest = ([i for i in self.matched.get(blob_name, []) if i not in loaded] +
+                    [i for i in range(self.slide_counts[blob_name])
+                     if i not in loaded and i not in self.matched.get(blob_name, [])])
+        return self._load_indices(blob_name, rest[:page_size])
+
+    def remaining(self, blob_name):
+        """Slides of the deck not loaded yet (None while the deck itself is not loaded)."""
+        if blob_name not in self.slide_counts:
+            return None
+        return self.slide_counts[blob_name] - len(self.records.get(blob_name, {}))
+
+    # ---------- views ----------
+    def decks(self):
+        """Loaded or late decks, in the order of their best hit."""
+        return [b for b in self.matched if b in self.slide_counts or b in self.late]
+
+    def slides(self):
+        """Matched slides in hit order, then every other loaded slide per deck in deck order."""
+        out, seen = [], set()
+        for blob_name, idx in self.hit_order:
+            record = self.records.get(blob_name, {}).get(idx)
+            if record is not None:
+                out.append(record)
+                seen.add((blob_name, idx))
+        for blob_name in self.decks():
+            for idx, record in sorted(self.records.get(blob_name, {}).items()):
+                if (blob_name, idx) not in seen:
+                    out.append(record)
+        return out
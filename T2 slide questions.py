@@ -0,0 +1,428 @@
+# slide_questions.py
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
+from utils import get_text_client, get_env, safe_json_load, logger
+from embedding_batcher import count_tokens
+import question_store
+
+# Question generation for the Q&A pages. Slides are sent to the chat model concurrently
+# (QUESTION_CONCURRENCY requests in flight across all sessions, on the shared HTTP pool),
+# and results are handed back as each one arrives. Answers are kept in question_store
+# (also filled at ingestion), so the LLM is only called for slide content it has not seen.
+QUESTION_CONCURRENCY = int(get_env("QUESTION_CONCURRENCY", "6"))
+# bump when a prompt (or its parsing) changes: stored questions of the old version stop matching
+SHAPE_PROMPT_VERSION = "shapes-1"
+TEXT_PROMPT_VERSION = "text-1"
+# batched per-shape questions: several slides per request with a strict JSON schema
+# (response_format=json_schema needs api-version 2024-08-01-preview or later)
+QUESTION_BATCH = get_env("QUESTION_BATCH", "true").lower() in ("1", "true", "yes")
+QUESTION_BATCH_MAX_SLIDES = int(get_env("QUESTION_BATCH_MAX_SLIDES", "8"))
+QUESTION_BATCH_MAX_INPUT_TOKENS = int(get_env("QUESTION_BATCH_MAX_INPUT_TOKENS", "8000"))
+QUESTION_BATCH_MAX_OUTPUT_TOKENS = int(get_env("QUESTION_BATCH_MAX_OUTPUT_TOKENS", "4000"))
+QUESTION_TOKENS_PER_SHAPE = int(get_env("QUESTION_TOKENS_PER_SHAPE", "60"))   # output estimate, incl. JSON
+
+_executor = ThreadPoolExecutor(max_workers=QUESTION_CONCURRENCY, thread_name_prefix="questions")
+
+
+# ------------------------------------------------------------
+# ONE QUESTION PER EDITABLE SHAPE (multi-page app)
+# ------------------------------------------------------------
+def fallback_shape_questions(slide_struct):
+    return {sh["shape_id"]: f"What is the new text for: {sh['text'][:80]}"
+            for sh in slide_struct.get("editable_shapes", [])}
+
+
+def _shape_prompt_input(slide_struct):
+    shape_list = slide_struct.get("editable_shapes", [])
+    slide_title = ""
+    # try to infer title from first shape
+    if shape_list:
+        slide_title = shape_list[0].get("text", "")[:200]
+    return {
+        "slide_title": slide_title,
+        "editable_shapes": [{ "shape_id": sh["shape_id"], "text": sh["text"] } for sh in shape_list]
+    }
+
+
+def shape_questions_key(slide_struct):
+    return question_store.question_key("shapes", SHAPE_PROMPT_VERSION, get_env("CHAT_MODEL", ""),
+                                       question_store.content_hash(_shape_prompt_input(slide_struct)))
+
+
+def _llm_shape_questions(slide_struct):
+    """One chat call; returns (questions, complete). Raises if the call itself fails."""
+    shape_list = slide_struct.get("editable_shapes", [])
+
+    sys_prompt = (
+        "You are an assistant that generates concise, slide-specific questions. "
+        "Given the slide title and a list of editable text boxes, return a JSON object mapping "
+        "each shape_id to a single question that the user can answer. Questions must be focused, "
+        "contextual, and not generic. Return JSON only."
+    )
+
+    user_block = _shape_prompt_input(slide_struct)
+
+    messages = [
+        {"role":"system", "content": sys_prompt},
+        {"role":"user", "content": "Slide data (JSON):\n" + json.dumps(user_block, indent=2)}
+    ]
+
+    resp = get_text_client().chat.completions.create(
+        model=get_env("CHAT_MODEL", required=True),
+        messages=messages,
+        max_completion_tokens=600,
+        temperature=0.0
+    )
+    raw = resp.choices[0].message.content.strip()
+    parsed = safe_json_load(raw)
+    if isinstance(parsed, dict):
+        return parsed, True
+    # fallback: try to extract lines
+    lines = [l.strip() for l in raw.splitlines() if l.strip()]
+    out = {}
+    for i, sh in enumerate(shape_list):
+        q = lines[i] if i < len(lines) else f"What should be the new text for {sh['shape_id']}?"
+        out[sh['shape_id']] = q
+    return out, False
+
+
+def ask_llm_for_questions(slide_struct):
+    """
+    Ask the LLM to generate one question per editable shape.
+    Return mapping {shape_id: question}
+    Stored questions for the same shapes are returned without a call.
+    """
+    key = shape_questions_key(slide_struct)
+    stored = question_store.get(key)
+    if stored is not None:
+        return stored
+    try:
+        questions, complete = _llm_shape_questions(slide_struct)
+        if complete:
+            question_store.put(key, "shapes", SHAPE_PROMPT_VERSION, get_env("CHAT_MODEL", ""), questions)
+        return questions
+    except Exception as e:
+        logger.exception("LLM questions generation failed")
+        # fallback simple mapping
+        return fallback_shape_questions(slide_struct)
+
+
+# ------------------------------------------------------------
+# BATCHED PER-SHAPE QUESTIONS (structured output)
+# ------------------------------------------------------------
+_BATCH_SYSTEM_PROMPT = (
+    "You are an assistant that generates concise, slide-specific questions. "
+    "You receive several slides, each with a slide_key, a title and a list of editable text boxes. "
+    "For every slide, write a single question for each of its shape_ids that the user can answer. "
+    "Questions must be focused, contextual, and not generic. Answer every slide and every shape_id."
+)
+
+_BATCH_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "slides": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "slide_key": {"type": "string"},
+                    "questions": {
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "shape_id": {"type": "string"},
+                                "question": {"type": "string"},
+                            },
+                            "required": ["shape_id", "question"],
+                            "additionalProperties": False,
+                        },
+                    },
+                },
+                "required": ["slide_key", "questions"],
+                "additionalProperties": False,
+            },
+        },
+    },
+    "required": ["slides"],
+    "additionalProperties": False,
+}
+
+_batch_state = {"disabled": False}   # set when the deployment rejects json_schema
+_batch_lock = threading.Lock()
+
+
+def _batching_enabled():
+    with _batch_lock:
+        return QUESTION_BATCH and not _batch_state["disabled"]
+
+
+def split_question_batches(slide_structs, max_slides=None, max_input_tokens=None, max_output_tokens=None):
+    """
+    Group slides (by position) into requests that stay within the input and the output token
+    budget; output is estimated per shape. A slide too large for any batch goes alone.
+    """
+    max_slides = max_slides or QUESTION_BATCH_MAX_SLIDES
+    max_input_tokens = max_input_tokens or QUESTION_BATCH_MAX_INPUT_TOKENS
+    max_output_tokens = max_output_tokens or QUESTION_BATCH_MAX_OUTPUT_TOKENS
+    base = count_tokens(_BATCH_SYSTEM_PROMPT) + count_tokens(json.dumps(_BATCH_SCHEMA))
+    batches, cur, cur_in, cur_out = [], [], base, 0
+    for i, struct in enumerate(slide_structs):
+        n_in = count_tokens(json.dumps(_shape_prompt_input(struct))) + 10
+        n_out = QUESTION_TOKENS_PER_SHAPE * len(struct.get("editable_shapes", [])) + 20
+        if cur and (len(cur) >= max_slides or cur_in + n_in > max_input_tokens or cur_out + n_out > max_output_tokens):
+            batches.append(cur)
+            cur, cur_in, cur_out = [], base, 0
+        cur.append(i)
+        cur_in += n_in
+        cur_out += n_out
+    if cur:
+        batches.append(cur)
+    return batches
+
+
+def _validate_batch(parsed, slide_structs):
+    """
+    Split a structured response back per slide. Returns a list aligned with slide_structs:
+    {shape_id: question} when the slide got a non-empty question for every shape, else None.
+    """
+    by_key = {}
+    for entry in (parsed or {}).get("slides", []) if isinstance(parsed, dict) else []:
+        if isinstance(entry, dict) and isinstance(entry.get("questions"), list):
+            by_key[str(entry.get("slide_key"))] = entry["questions"]
+    out = []
+    for n, struct in enumerate(slide_structs):
+        wanted = [sh["shape_id"] for sh in struct.get("editable_shapes", [])]
+        got = {}
+        for q in by_key.get(f"s{n}", []):
+            if isinstance(q, dict) and q.get("shape_id") in wanted and str(q.get("question") or "").strip():
+                got.setdefault(q["shape_id"], str(q["question"]).strip())
+        out.append(got if len(got) == len(wanted) else None)
+    return out
+
+
+def _structured_output_unsupported(err):
+    """A 400 that rejects response_format / json_schema itself (not the content of the request)."""
+    if getattr(err, "status_code", None) != 400:
+        return False
+    body = getattr(err, "body", None)
+    details = [str(err), str(getattr(err, "param", "") or "")]
+    if isinstance(body, dict):
+        details += [str(body.get("param") or ""), str(body.get("message") or ""), str(body.get("code") or "")]
+    text = " ".join(details).lower()
+    if "content_filter" in text or "context_length" in text:
+        return False
+    return "response_format" in text or "json_schema" in text
+
+
+def _ask_batch(slide_structs):
+    """
+    One structured-output request for several slides. Complete answers are stored and
+    returned; a slide the model left incomplete (or a failed request) comes back as None.
+    """
+    user_block = {"slides": [dict(_shape_prompt_input(struct), slide_key=f"s{n}")
+                             for n, struct in enumerate(slide_structs)]}
+    try:
+        resp = get_text_client().chat.completions.create(
+            model=get_env("CHAT_MODEL", required=True),
+            messages=[
+                {"role": "system", "content": _BATCH_SYSTEM_PROMPT},
+                {"role": "user", "content": "Slides (JSON):\n" + json.dumps(user_block, indent=2)},
+            ],
+            response_format={
+                "type": "json_schema",
+                "json_schema": {"name": "slide_questions", "strict": True, "schema": _BATCH_SCHEMA},
+            },
+            max_completion_tokens=QUESTION_BATCH_MAX_OUTPUT_TOKENS,
+            temperature=0.0,
+        )
+    except Exception as e:
+        if _structured_output_unsupported(e):
+            # an api-version or model without json_schema support: stop trying in this process
+            with _batch_lock:
+                _batch_state["disabled"] = True
+            logger.warning(f"Structured output not supported; using one request per slide: {e}")
+        elif getattr(e, "status_code", None) == 400:
+            # e.g. a content-filter or context-length rejection: only this batch goes singly
+            logger.warning(f"Batched question request rejected for {len(slide_structs)} slide(s); "
+                           f"retrying them singly: {e}")
+        else:
+            logger.exception(f"Batched question request failed for {len(slide_structs)} slide(s): {e}")
+        return [None] * len(slide_structs)
+
+    choice = resp.choices[0]
+    if getattr(choice, "finish_reason", None) == "length" or getattr(choice.message, "refusal", None):
+        logger.warning(f"Batched question response incomplete ({choice.finish_reason}); retrying slides singly")
+        return [None] * len(slide_structs)
+    try:
+        parsed = json.loads(choice.message.content or "")
+    except ValueError:
+        parsed = None
+    answers = _validate_batch(parsed, slide_structs)
+    model = get_env("CHAT_MODEL", "")
+    question_store.put_many([
+        (shape_questions_key(struct), "shapes", SHAPE_PROMPT_VERSION, model, qmap)
+        for struct, qmap in zip(slide_structs, answers) if qmap is not None
+    ])
+    missing = sum(1 for a in answers if a is None)
+    if missing:
+        logger.warning(f"Batched question response left {missing}/{len(slide_structs)} slide(s) incomplete")
+    return answers
+
+
+def iter_shape_questions(slide_structs):
+    """
+    Per-shape questions for many slides, yielded as (position, {shape_id: question}) as they
+    are ready: stored questions first, then the rest in batched structured-output requests
+    running concurrently (one request per slide when QUESTION_BATCH is off). A slide a batch
+    did not answer completely gets its own request, with the usual per-slide fallback.
+    """
+    slide_structs = list(slide_structs)
+    stored = question_store.get_many([shape_questions_key(s) for s in slide_structs])
+    misses = []
+    for i, (struct, qmap) in enumerate(zip(slide_structs, stored)):
+        if qmap is not None:
+            yield i, qmap
+        elif not struct.get("editable_shapes"):
+            yield i, {}
+        else:
+            misses.append(i)
+    if not misses:
+        return
+
+    futures = {}   # future -> ("batch", [positions]) | ("single", position)
+    if _batching_enabled():
+        for batch in split_question_batches([slide_structs[i] for i in misses]):
+            positions = [misses[n] for n in batch]
+            futures[_executor.submit(_ask_batch, [slide_structs[i] for i in positions])] = ("batch", positions)
+    else:
+        for i in misses:
+            futures[_executor.submit(ask_llm_for_questions, slide_structs[i])] = ("single", i)
+
+    while futures:
+        done, _ = wait(list(futures), return_when=FIRST_COMPLETED)
+        for fut in done:
+            kind, where = futures.pop(fut)
+            if kind == "single":
+                try:
+                    yield where, fut.result()
+                except Exception as e:
+                    logger.exception(f"Question generation failed for slide {where}: {e}")
+                    yield where, fallback_shape_questions(slide_structs[where])
+                continue
+            try:
+                answers = fut.result()
+            except Exception as e:
+                logger.exception(f"Batched question generation failed: {e}")
+                answers = [None] * len(where)
+            for i, qmap in zip(where, answers):
+                if qmap is not None:
+                    yield i, qmap
+                else:
+                    futures[_executor.submit(ask_llm_for_questions, slide_structs[i])] = ("single", i)
+
+
+# ------------------------------------------------------------
+# 3-5 QUESTIONS FROM SLIDE TEXT (single-page app)
+# ------------------------------------------------------------
+DEFAULT_TEXT_QUESTIONS = [
+    "What should be the new slide title?",
+    "List 3–5 bullets for this slide (comma separated).",
+    "Any specific data, metrics or examples to include?",
+]
+
+
+def text_questions_key(original_text):
+    return question_store.question_key("text", TEXT_PROMPT_VERSION, get_env("CHAT_MODEL", ""),
+                                       question_store.content_hash(original_text or ""))
+
+
+def _llm_text_questions(original_text):
+    sys_prompt = (
+        "You are a helpful assistant. Given the text of a slide (title and bullets), "
+        "produce 3-5 concise questions that gather the content needed to recreate the slide's text. "
+        "Return the questions as plain text, each on a new line."
+    )
+    user_prompt = f"Slide content:\n{original_text}\n\nGenerate the questions."
+    resp = get_text_client().chat.completions.create(
+        model=get_env("CHAT_MODEL", required=True),
+        messages=[
+            {"role": "system", "content": sys_prompt},
+            {"role": "user", "content": user_prompt},
+        ],
+        max_completion_tokens=300,
+        temperature=0.0,
+    )
+    raw = resp.choices[0].message.content.strip()
+    questions = [q.strip() for q in raw.splitlines() if q.strip()]
+    return questions[:5]
+
+
+def generate_questions_from_slide_text(original_text, num_q=4):
+    """
+    Ask the LLM to produce a small set of questions to gather new content for this slide.
+    Returns list of question strings.
+    Stored questions for the same text are returned without a call.
+    """
+    key = text_questions_key(original_text)
+    stored = question_store.get(key)
+    if stored is not None:
+        return stored
+    try:
+        questions = _llm_text_questions(original_text)
+        if questions:
+            question_store.put(key, "text", TEXT_PROMPT_VERSION, get_env("CHAT_MODEL", ""), questions)
+        return questions
+    except Exception as e:
+        logger.exception("Question generation failed")
+        # fallback default questions
+        return list(DEFAULT_TEXT_QUESTIONS)
+
+
+# ------------------------------------------------------------
+# FAN-OUT
+# ------------------------------------------------------------
+def iter_generated(items, generate, fallback):
+    """
+    Run generate(item) for every item on the question pool and yield (position, result) as
+    each one completes. An item whose call raises yields fallback(item) instead, so one bad
+    slide never holds up or breaks the others.
+    """
+    futures = {_executor.submit(generate, item): i for i, item in enumerate(items)}
+    for fut in as_completed(futures):
+        i = futures[fut]
+        try:
+            yield i, fut.result()
+        except Exception as e:
+            logger.exception(f"Question generation failed for item {i}: {e}")
+            yield i, fallback(items[i])
+
+
+# ------------------------------------------------------------
+# PRECOMPUTE (ingestion)
+# ------------------------------------------------------------
+def precompute_questions(ppt_path, slides, kinds=("text",)):
+    """
+    Generate and store questions for every slide of a local deck so the Q&A pages read them
+    instantly. slides: [{"index", "text", ...}] as extracted by ingestion.
+    kinds: "text" (App.py's questions from slide text) and/or "shapes" (the multi-page app's
+    per-shape questions; needs the deck parsed with python-pptx). Slides whose questions are
+    already stored cost one lookup. Returns {kind: number of slides sent to the LLM}.
+    """
+    done = {}
+    if "text" in kinds:
+        texts = [s.get("text", "") or "" for s in slides]
+        stored = question_store.get_many([text_questions_key(t) for t in texts])
+        todo = [t for t, q in zip(texts, stored) if q is None and t.strip()]
+        for _ in iter_generated(todo, generate_questions_from_slide_text, lambda _: None):
+            pass
+        done["text"] = len(todo)
+    if "shapes" in kinds:
+        from slide_renderer import extract_slide_shapes
+        structs = [{"editable_shapes": extract_slide_shapes(ppt_path, s["index"])} for s in slides]
+        stored = question_store.get_many([shape_questions_key(st) for st in structs])
+        done["shapes"] = sum(1 for st, q in zip(structs, stored) if q is None and st["editable_shapes"])
+        for _ in iter_shape_questions(structs):
+            pass
+    return done
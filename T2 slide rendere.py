@@ -1,34 +1,14 @@
-import os
-import uuid
-import pythoncom
-import win32com.client
-from pptx import Presentation
 from pptx.enum.shapes import MSO_SHAPE_TYPE
+from deck_cache import get_presentation
+from render_pool import get_render_pool
 
 
 def export_slide_to_png(ppt_path, slide_index):
     """
-    Uses PowerPoint COM to export a slide as PNG.
+    Export a slide as PNG through the shared render worker pool
+    (backend chosen by SLIDE_RENDERER: pil | com | soffice).
     """
-    pythoncom.CoInitialize()
-    powerpoint = win32com.client.Dispatch("PowerPoint.Application")
-    powerpoint.Visible = True   # MUST be visible on enterprise laptops
-
-    pres = powerpoint.Presentations.Open(ppt_path, WithWindow=True)
-
-    slide = pres.Slides[slide_index]
-    out_path = os.path.join(
-        os.path.dirname(ppt_path),
-        f"slide_{slide_index}_{uuid.uuid4().hex[:6]}.png"
-    )
-
-    slide.Export(out_path, "PNG", 1920, 1080)
-
-    pres.Close()
-    powerpoint.Quit()
-    pythoncom.CoUninitialize()
-
-    return out_path
+    return get_render_pool().submit_cached(ppt_path, [slide_index]).result()[0]
 
 
 def _is_editable_text_shape(shape):
@@ -75,14 +55,14 @@ def _extract_group_text_shapes(group_shape):
     return [main_shape]
 
 
-def extract_slide_structure(ppt_path, slide_index):
+def extract_slide_shapes(ppt_path, slide_index):
     """
     Extract editable text shapes from the slide:
     - Titles
     - Body placeholders
     - Main text inside groups
     """
-    prs = Presentation(ppt_path)
+    prs = get_presentation(ppt_path)  # parsed once per deck, shared across slides
     slide = prs.slides[slide_index]
 
     editable_shapes = []
@@ -95,7 +75,7 @@ def extract_slide_structure(ppt_path, slide_index):
             shape_entry = {
                 "shape_id": f"shape_{idx}",
                 "text": shape.text.strip(),
-                "placeholder": getattr(shape, "placeholder_format", None) is not None,
+                "placeholder": shape.is_placeholder,
                 "type": "title" if shape.is_placeholder and "title" in shape.name.lower()
                         else "body"
             }
@@ -115,6 +95,15 @@ def extract_slide_structure(ppt_path, slide_index):
                 editable_shapes.append(shape_entry)
                 idx += 1
 
+    return editable_shapes
+
+
+def extract_slide_structure(ppt_path, slide_index):
+    """
+    Editable text shapes + PNG preview for one slide.
+    Prefer extract_deck_structures when loading several slides of a deck.
+    """
+    editable_shapes = extract_slide_shapes(ppt_path, slide_index)
     png_path = export_slide_to_png(ppt_path, slide_index)
 
     return {
@@ -123,3 +112,32 @@ def extract_slide_structure(ppt_path, slide_index):
         "png_path": png_path,
         "editable_shapes": editable_shapes
     }
+
+
+def extract_deck_structures(decks):
+    """
+    Batched extract_slide_structure.
+    decks: {ppt_path: [slide_index, ...] or None for every slide}
+    Returns {ppt_path: [slide_struct, ...]}. Thumbnails come from the thumbnail cache; the misses
+    of each deck are one render job (one open of the deck), all decks render concurrently, and
+    shape extraction runs while the renders are in flight.
+    """
+    pool = get_render_pool()
+    wanted = {
+        path: list(indices) if indices is not None else list(range(len(get_presentation(path).slides)))
+        for path, indices in decks.items()
+    }
+    jobs = {path: pool.submit_cached(path, indices) for path, indices in wanted.items()}
+
+    out = {}
+    for path, indices in wanted.items():
+        shapes = [extract_slide_shapes(path, idx) for idx in indices]
+        try:
+            pngs = jobs[path].result()
+        except Exception:
+            pngs = [None] * len(indices)
+        out[path] = [
+            {"slide_index": idx, "ppt_path": path, "png_path": png, "editable_shapes": sh}
+            for idx, png, sh in zip(indices, pngs, shapes)
+        ]
+    return out
@@ -0,0 +1,124 @@
+# thumbnail_cache.py
+import os
+import time
+import uuid
+import shutil
+import hashlib
+import tempfile
+import threading
+from utils import get_env, logger, ensure_dir
+
+# Content-addressed slide thumbnails: key = (deck sha256, slide index, render size, renderer version).
+# A re-uploaded deck with the same bytes reuses its thumbnails; any change to the deck or the
+# renderer produces new keys. Size-capped LRU (file mtime is the recency marker).
+THUMBNAIL_CACHE_DIR = get_env("THUMBNAIL_CACHE_DIR", os.path.join(tempfile.gettempdir(), "ppt_thumbnails"))
+THUMBNAIL_CACHE_MAX_MB = float(get_env("THUMBNAIL_CACHE_MAX_MB", "1024"))
+# entries written or hit within this many seconds are never evicted: their paths are held in
+# Streamlit session state (png_path / preview_image) and read again on every rerun
+THUMBNAIL_CACHE_MIN_AGE = float(get_env("THUMBNAIL_CACHE_MIN_AGE", "21600"))
+_EVICT_EVERY = 32  # check the size budget every N writes
+
+_lock = threading.Lock()
+_writes_since_check = 0
+_stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+
+
+def thumbnail_key(deck_sha, slide_index, size, renderer_version):
+    return hashlib.sha256(f"{deck_sha}|{slide_index}|{size}|{renderer_version}".encode("utf-8")).hexdigest()
+
+
+def _path_for(key):
+    return os.path.join(THUMBNAIL_CACHE_DIR, key[:2], key + ".png")
+
+
+def get(deck_sha, slide_index, size, renderer_version):
+    """Cached PNG path, or None. A hit refreshes the entry's LRU position."""
+    path = _path_for(thumbnail_key(deck_sha, slide_index, size, renderer_version))
+    try:
+        os.utime(path)
+    except OSError:
+        with _lock:
+            _stats["misses"] += 1
+        return None
+    with _lock:
+        _stats["hits"] += 1
+    return path
+
+
+def put(deck_sha, slide_index, size, renderer_version, src):
+    """
+    Store a thumbnail and return its cached path. `src` is a PNG file path (moved into the
+    cache) or a PIL image (saved). Writes are atomic: readers never see a partial file.
+    """
+    global _writes_since_check
+    path = _path_for(thumbnail_key(deck_sha, slide_index, size, renderer_version))
+    ensure_dir(os.path.dirname(path))
+    tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        if isinstance(src, (str, os.PathLike)):
+            shutil.move(src, tmp)
+        else:
+            src.save(tmp, format="PNG")
+        os.replace(tmp, path)
+    except Exception:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+    with _lock:
+        _stats["writes"] += 1
+        _writes_since_check += 1
+        check = _writes_since_check >= _EVICT_EVERY
+        if check:
+            _writes_since_check = 0
+    if check:
+        evict_if_needed()
+    return path
+
+
+def evict_if_needed():
+    """
+    Delete least-recently-used thumbnails until the cache is under 90% of its budget, sparing
+    entries used within THUMBNAIL_CACHE_MIN_AGE (the budget is exceeded rather than break a page).
+    """
+    budget = int(THUMBNAIL_CACHE_MAX_MB * 1024 * 1024)
+    entries, total = [], 0
+    for root, _, files in os.walk(THUMBNAIL_CACHE_DIR):
+        for name in files:
+            if not name.endswith(".png"):
+                continue
+            path = os.path.join(root, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+    if total <= budget:
+        return 0
+    entries.sort()
+    target = int(budget * 0.9)
+    protect_after = time.time() - THUMBNAIL_CACHE_MIN_AGE
+    removed = 0
+    for used, size, path in entries:
+        if total <= target or used >= protect_after:
+            break
+        try:
+            os.remove(path)
+            total -= size
+            removed += 1
+        except OSError:
+            pass
+    with _lock:
+        _stats["evictions"] += removed
+    logger.info(f"Thumbnail cache evicted {removed} file(s)")
+    return removed
+
+
+def thumbnail_cache_stats():
+    with _lock:
+        stats = dict(_stats)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+    return stats
@@ -1,7 +1,7 @@
-from openai import AzureOpenAI
 import os
 import json
 import logging
+import threading
 from datetime import datetime
 from dotenv import load_dotenv
 
@@ -44,27 +44,135 @@ def now_ts():
     return datetime.utcnow().isoformat() + "Z"
 
 
+def tag_key(tag):
+    """Metadata key for one tag: every slide carries tag_<name>=True per tag so filters can use $and/$or."""
+    return "tag_" + "".join(ch if ch.isalnum() else "_" for ch in str(tag).strip().lower())
+
+
+def tag_metadata(tags):
+    return {tag_key(t): True for t in tags if str(t).strip()}
+
+
+# one default for ingestion and search; the active collection (vector_store) has the final say
+DEFAULT_EMBEDDING_MODEL = "text-embedding-3-small"
+_NATIVE_EMBEDDING_DIMS = {
+    "text-embedding-3-small": 1536,
+    "text-embedding-3-large": 3072,
+    "text-embedding-ada-002": 1536,
+}
+
+
+def supports_dimensions(model_name):
+    """text-embedding-3 models can return shortened vectors (`dimensions` request parameter)."""
+    return str(model_name).startswith("text-embedding-3")
+
+
 def get_embedding_dim(model_name):
+    """
+    Size of the vectors we store for model_name: EMBEDDING_DIM if the model can shorten its
+    output (capped at the native size), otherwise the model's native size.
+    """
+    native = _NATIVE_EMBEDDING_DIMS.get(model_name)
     try:
-        return int(get_env("EMBEDDING_DIM", 1536))
+        wanted = int(get_env("EMBEDDING_DIM", native or 1536))
     except:
-        return 1536
+        wanted = native or 1536
+    if supports_dimensions(model_name):
+        return min(wanted, native) if native else wanted
+    return native or wanted
     
 
 # -----------------------------
-#  TEXT MODEL CLIENT  (GPT + EMBEDDINGS)
+#  SHARED CLIENT REGISTRY
+#  Every client is created once per process, on first use (not at import), and all
+#  OpenAI clients share one pooled HTTP transport.
 # -----------------------------
-text_client = AzureOpenAI(
-    azure_endpoint = get_env("OPENAI_API_BASE", required=True),
-    api_key        = get_env("OPENAI_API_KEY", required=True),
-    api_version    = get_env("OPENAI_API_VERSION", required=True)
-)
+OPENAI_MAX_CONNECTIONS = int(get_env("OPENAI_MAX_CONNECTIONS", "20"))
+# blob downloads: first GET size, then the rest in ranged chunks (fetched in parallel with max_concurrency)
+BLOB_SINGLE_GET_MB = int(get_env("BLOB_SINGLE_GET_MB", "8"))
+BLOB_CHUNK_GET_MB = int(get_env("BLOB_CHUNK_GET_MB", "4"))
 
-# -----------------------------
-#  IMAGE MODEL CLIENT (DALL·E / GPT-image)
-# -----------------------------
-image_client = AzureOpenAI(
-    azure_endpoint = get_env("IMAGE_API_BASE", required=True),
-    api_key        = get_env("IMAGE_API_KEY", required=True),
-    api_version    = get_env("OPENAI_API_VERSION", required=True)
-)
+_clients = {}
+_clients_lock = threading.RLock()   # factories may fetch other registry clients
+
+
+def _get_or_create(key, factory):
+    client = _clients.get(key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                client = _clients[key] = factory()
+    return client
+
+
+def _shared_http_client():
+    def make():
+        try:
+            import httpx
+            from openai import DefaultHttpxClient
+        except ImportError:
+            return None   # older SDK: each client keeps its own default pool
+        limits = httpx.Limits(max_connections=OPENAI_MAX_CONNECTIONS,
+                              max_keepalive_connections=OPENAI_MAX_CONNECTIONS)
+        return DefaultHttpxClient(limits=limits)
+    return _get_or_create("http", make)
+
+
+def get_text_client():
+    """TEXT MODEL CLIENT (GPT + EMBEDDINGS)"""
+    def make():
+        from openai import AzureOpenAI
+        return AzureOpenAI(
+            azure_endpoint = get_env("OPENAI_API_BASE", required=True),
+            api_key        = get_env("OPENAI_API_KEY", required=True),
+            api_version    = get_env("OPENAI_API_VERSION", "2024-05-01-preview"),
+            http_client    = _shared_http_client()
+        )
+    return _get_or_create("text", make)
+
+
+def get_image_client():
+    """IMAGE MODEL CLIENT (DALL·E / GPT-image); IMAGE_API_* are only needed if this is used."""
+    def make():
+        from openai import AzureOpenAI
+        return AzureOpenAI(
+            azure_endpoint = get_env("IMAGE_API_BASE", required=True),
+            api_key        = get_env("IMAGE_API_KEY", required=True),
+            api_version    = get_env("OPENAI_API_VERSION", "2024-05-01-preview"),
+            http_client    = _shared_http_client()
+        )
+    return _get_or_create("image", make)
+
+
+def get_blob_service_client(conn_str=None):
+    """BlobServiceClient per connection string (default AZURE_BLOB_CONN); its transport pools connections."""
+    conn_str = conn_str or get_env("AZURE_BLOB_CONN", required=True)
+
+    def make():
+        from azure.storage.blob import BlobServiceClient
+        return BlobServiceClient.from_connection_string(
+            conn_str,
+            max_single_get_size=BLOB_SINGLE_GET_MB * 1024 * 1024,
+            max_chunk_get_size=BLOB_CHUNK_GET_MB * 1024 * 1024,
+        )
+    return _get_or_create(("blob", conn_str), make)
+
+
+def get_chroma_client(path=None):
+    """Chroma PersistentClient per directory (default CHROMA_PERSIST_DIR)."""
+    path = os.path.abspath(path or get_env("CHROMA_PERSIST_DIR", "./chroma_db"))
+
+    def make():
+        from chromadb import PersistentClient
+        return PersistentClient(path=path)
+    return _get_or_create(("chroma", path), make)
+
+
+def __getattr__(name):
+    # keeps `from utils import text_client` working; the client is built on first access
+    if name == "text_client":
+        return get_text_client()
+    if name == "image_client":
+        return get_image_client()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,752 @@
+# vector_store.py
+import os
+import re
+import sys
+import json
+import time
+import uuid
+import shutil
+import sqlite3
+import threading
+from contextlib import contextmanager
+import numpy as np
+from utils import get_env, logger, ensure_dir, get_embedding_dim, now_ts, get_chroma_client
+
+# Pluggable slide vector store behind search_utils / ingestion_chroma.
+#   VECTOR_STORE=chroma  -> the Chroma collection (default)
+#   VECTOR_STORE=numpy   -> NumpyVectorStore: brute-force dot products over a memory-mapped
+#                           float16/int8 matrix; opens instantly in every app worker.
+# Both expose the Chroma collection methods the app uses (add/upsert/update/delete/get/query/count).
+VECTOR_STORE = get_env("VECTOR_STORE", "chroma")
+VECTOR_STORE_DIR = get_env(
+    "VECTOR_STORE_DIR", os.path.join(get_env("CHROMA_PERSIST_DIR", "./chroma_db"), "numpy_store")
+)
+VECTOR_STORE_DTYPE = get_env("VECTOR_STORE_DTYPE", "float16")   # float32 | float16 | int8
+# optional cap: stored vectors are truncated to this many leading dimensions and re-normalized
+# (text-embedding-3 models are trained so that prefixes remain usable embeddings); by default
+# a store keeps the full dimension of the collection it holds
+VECTOR_STORE_DIM = int(get_env("VECTOR_STORE_DIM", "0")) or None
+_CHUNK_ROWS = 8192           # rows converted to float32 at a time while scoring
+_COMPACT_MIN_DEAD = 1000     # compact once this many rows are dead and ...
+_COMPACT_DEAD_FRACTION = 0.3  # ... they are this share of the matrix
+
+_DTYPES = {"float32": np.float32, "float16": np.float16, "int8": np.int8}
+
+# Collections are named after the embedding model + dimension that filled them; the alias file
+# says which one serves (and, during a re-embed, which one is being filled next).
+ACTIVE_COLLECTION_PATH = get_env(
+    "ACTIVE_COLLECTION_PATH", os.path.join(get_env("CHROMA_PERSIST_DIR", "./chroma_db"), "active_collection.json")
+)
+LEGACY_COLLECTION = "ppt_slides"   # unversioned collection from before model-versioned names
+
+
+# ------------------------------------------------------------
+# WHERE CLAUSES (subset of Chroma's metadata filter language)
+# ------------------------------------------------------------
+def _match_condition(value, cond):
+    if not isinstance(cond, dict):
+        return value == cond
+    for op, arg in cond.items():
+        if op == "$eq" and not value == arg:
+            return False
+        if op == "$ne" and not value != arg:
+            return False
+        if op == "$in" and value not in arg:
+            return False
+        if op == "$nin" and value in arg:
+            return False
+        if op in ("$gt", "$gte", "$lt", "$lte"):
+            if value is None:
+                return False
+            if op == "$gt" and not value > arg:
+                return False
+            if op == "$gte" and not value >= arg:
+                return False
+            if op == "$lt" and not value < arg:
+                return False
+            if op == "$lte" and not value <= arg:
+                return False
+    return True
+
+
+def matches_where(metadata, where):
+    """Evaluate a Chroma-style where clause ($and/$or, $eq/$ne/$in/$nin/$gt/...) on one metadata dict."""
+    if not where:
+        return True
+    metadata = metadata or {}
+    for key, cond in where.items():
+        if key == "$and":
+            if not all(matches_where(metadata, c) for c in cond):
+                return False
+        elif key == "$or":
+            if not any(matches_where(metadata, c) for c in cond):
+                return False
+        elif not _match_condition(metadata.get(key), cond):
+            return False
+    return True
+
+
+# ------------------------------------------------------------
+# NUMPY BACKEND
+# ------------------------------------------------------------
+class _Snapshot:
+    """Read-side view of one store version: memory-mapped matrix + row/metadata arrays."""
+
+    def __init__(self, version, ids, rows, metadatas, vectors, scales):
+        self.version = version
+        self.ids = ids
+        self.rows = rows
+        self.metadatas = metadatas
+        self.vectors = vectors
+        self.scales = scales
+        self.masks = {}          # json(where) -> bool mask over ids
+
+
+class NumpyVectorStore:
+    """
+    Slide vectors in one append-only binary matrix per generation (vectors.<gen>.bin, plus
+    scales.<gen>.bin for int8), memory-mapped read-only by searchers; ids, documents and
+    metadata live in SQLite. Vectors are L2-normalized after truncation to `dim`, so the
+    returned distance 2 - 2*cos matches Chroma's squared-L2 on normalized embeddings.
+    Replaced/deleted rows are dead until compaction rewrites the matrix as a new generation.
+    """
+
+    def __init__(self, path, dim=None, dtype=None):
+        self.path = path
+        ensure_dir(path)
+        self._db_path = os.path.join(path, "index.sqlite3")
+        self._write_lock = threading.Lock()
+        self._read_lock = threading.Lock()
+        self._snapshot = None
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS items (id TEXT PRIMARY KEY, row INTEGER NOT NULL, "
+                "document TEXT, metadata TEXT, ppt_name TEXT)"
+            )
+            if "ppt_name" not in [c[1] for c in conn.execute("PRAGMA table_info(items)")]:
+                # stores created before the ppt_name column: backfill it from the metadata
+                conn.execute("ALTER TABLE items ADD COLUMN ppt_name TEXT")
+                conn.executemany("UPDATE items SET ppt_name = ? WHERE id = ?", [
+                    (json.loads(meta or "{}").get("ppt_name"), sid)
+                    for sid, meta in conn.execute("SELECT id, metadata FROM items").fetchall()
+                ])
+            conn.execute("CREATE INDEX IF NOT EXISTS items_ppt_name ON items (ppt_name)")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            meta = dict(conn.execute("SELECT key, value FROM meta").fetchall())
+            if not meta:
+                dim = dim or VECTOR_STORE_DIM or get_embedding_dim(get_env("EMBEDDING_MODEL", ""))
+                meta = {"dim": str(int(dim)), "dtype": dtype or VECTOR_STORE_DTYPE,
+                        "generation": "0", "version": "0"}
+                conn.executemany("INSERT INTO meta (key, value) VALUES (?, ?)", meta.items())
+        if (dim and int(dim) != int(meta["dim"])) or (dtype and dtype != meta["dtype"]):
+            logger.warning(f"Vector store {path} was built with dim={meta['dim']} dtype={meta['dtype']}; "
+                           f"ignoring requested dim={dim} dtype={dtype}")
+        self.dim = int(meta["dim"])
+        self.dtype = meta["dtype"]
+        if self.dtype not in _DTYPES:
+            raise ValueError(f"Unsupported vector dtype: {self.dtype}")
+        self._np_dtype = _DTYPES[self.dtype]
+        self._row_bytes = self.dim * np.dtype(self._np_dtype).itemsize
+
+    # ---------- storage helpers ----------
+    def _connect(self):
+        return sqlite3.connect(self._db_path, timeout=30)
+
+    @contextmanager
+    def _writer(self):
+        """
+        Write transaction holding SQLite's write lock (BEGIN IMMEDIATE) from the start, so the
+        append offset is computed and used under the lock: writers in other processes (the app's
+        sidebar ingest next to a CLI ingest) cannot append at the same offset.
+        """
+        with self._write_lock:
+            conn = self._connect()
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                yield conn
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+            finally:
+                conn.close()
+
+    def _files(self, generation):
+        return (os.path.join(self.path, f"vectors.{generation}.bin"),
+                os.path.join(self.path, f"scales.{generation}.bin"))
+
+    @staticmethod
+    def _meta(conn):
+        return dict(conn.execute("SELECT key, value FROM meta").fetchall())
+
+    @staticmethod
+    def _bump_version(conn):
+        conn.execute("UPDATE meta SET value = CAST(value AS INTEGER) + 1 WHERE key = 'version'")
+
+    def _normalize(self, embeddings):
+        x = np.asarray(embeddings, dtype=np.float32)
+        if x.ndim == 1:
+            x = x[None, :]
+        if x.shape[1] < self.dim:
+            raise ValueError(f"Embeddings have {x.shape[1]} dimensions; this store holds {self.dim}")
+        x = x[:, :self.dim]
+        norms = np.linalg.norm(x, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return x / norms
+
+    def _encode(self, embeddings):
+        """float32 embeddings -> (stored matrix, per-row scales or None)."""
+        x = self._normalize(embeddings)
+        if self.dtype != "int8":
+            return x.astype(self._np_dtype), None
+        scales = np.abs(x).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        return np.round(x / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+
+    def _append_rows(self, generation, embeddings):
+        """Append encoded rows to the current matrix; returns the first new row number."""
+        vec_path, scale_path = self._files(generation)
+        mat, scales = self._encode(embeddings)
+        start = os.path.getsize(vec_path) // self._row_bytes if os.path.exists(vec_path) else 0
+        with open(vec_path, "ab") as fp:
+            fp.seek(start * self._row_bytes)
+            fp.truncate()   # drop any torn tail left by a crashed writer
+            fp.write(mat.tobytes())
+        if scales is not None:
+            with open(scale_path, "ab") as fp:
+                fp.seek(start * 4)
+                fp.truncate()
+                fp.write(scales.tobytes())
+        return start
+
+    # ---------- write API (Chroma-compatible subset) ----------
+    def upsert(self, ids, embeddings=None, documents=None, metadatas=None):
+        ids = list(ids)
+        if not ids:
+            return
+        if embeddings is None:
+            return self.update(ids, documents=documents, metadatas=metadatas)
+        documents = list(documents) if documents is not None else [None] * len(ids)
+        metadatas = list(metadatas) if metadatas is not None else [None] * len(ids)
+        with self._writer() as conn:
+            generation = self._meta(conn)["generation"]
+            start = self._append_rows(generation, embeddings)
+            conn.executemany(
+                "INSERT OR REPLACE INTO items (id, row, document, metadata, ppt_name) VALUES (?, ?, ?, ?, ?)",
+                [(sid, start + i, doc, json.dumps(meta or {}), (meta or {}).get("ppt_name"))
+                 for i, (sid, doc, meta) in enumerate(zip(ids, documents, metadatas))]
+            )
+            self._bump_version(conn)
+        self._maybe_compact()
+
+    add = upsert
+
+    def update(self, ids, embeddings=None, documents=None, metadatas=None):
+        """Update existing items; metadata dicts are merged into the stored ones like Chroma does."""
+        ids = list(ids)
+        if not ids:
+            return
+        with self._writer() as conn:
+            current = {
+                sid: (row, doc, json.loads(meta or "{}"))
+                for sid, row, doc, meta in conn.execute(
+                    f"SELECT id, row, document, metadata FROM items WHERE id IN ({','.join('?' * len(ids))})", ids
+                )
+            }
+            start = None
+            if embeddings is not None:
+                start = self._append_rows(self._meta(conn)["generation"], embeddings)
+            updates = []
+            for i, sid in enumerate(ids):
+                if sid not in current:
+                    continue
+                row, doc, meta = current[sid]
+                if start is not None:
+                    row = start + i
+                if documents is not None:
+                    doc = documents[i]
+                if metadatas is not None and metadatas[i] is not None:
+                    meta = {k: v for k, v in {**meta, **metadatas[i]}.items() if v is not None}
+                updates.append((row, doc, json.dumps(meta), meta.get("ppt_name"), sid))
+            conn.executemany("UPDATE items SET row = ?, document = ?, metadata = ?, ppt_name = ? WHERE id = ?",
+                             updates)
+            self._bump_version(conn)
+        self._maybe_compact()
+
+    def delete(self, ids=None, where=None):
+        if where:
+            matched = set(self.get(where=where, include=[])["ids"])
+            ids = [i for i in ids if i in matched] if ids is not None else list(matched)
+        ids = list(ids or [])
+        if not ids:
+            return
+        with self._writer() as conn:
+            conn.executemany("DELETE FROM items WHERE id = ?", [(sid,) for sid in ids])
+            self._bump_version(conn)
+        self._maybe_compact()
+
+    def _maybe_compact(self):
+        with self._connect() as conn:
+            generation = self._meta(conn)["generation"]
+            alive = conn.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+        vec_path, _ = self._files(generation)
+        total = os.path.getsize(vec_path) // self._row_bytes if os.path.exists(vec_path) else 0
+        dead = total - alive
+        if dead >= _COMPACT_MIN_DEAD and dead >= _COMPACT_DEAD_FRACTION * total:
+            self.compact()
+
+    def compact(self):
+        """Rewrite live rows into a new generation; readers keep their mapped old files until they reload."""
+        with self._writer() as conn:
+            meta = self._meta(conn)
+            old_gen, new_gen = meta["generation"], str(int(meta["generation"]) + 1)
+            old_vec, old_scale = self._files(old_gen)
+            new_vec, new_scale = self._files(new_gen)
+            items = conn.execute("SELECT id, row FROM items ORDER BY row").fetchall()
+            rows = np.array([r for _, r in items], dtype=np.int64)
+            if os.path.exists(old_vec) and len(rows):
+                src = np.memmap(old_vec, dtype=self._np_dtype, mode="r").reshape(-1, self.dim)
+                with open(new_vec, "wb") as fp:
+                    for i in range(0, len(rows), _CHUNK_ROWS):
+                        fp.write(np.ascontiguousarray(src[rows[i:i + _CHUNK_ROWS]]).tobytes())
+                if self.dtype == "int8":
+                    scales = np.memmap(old_scale, dtype=np.float32, mode="r")
+                    with open(new_scale, "wb") as fp:
+                        fp.write(np.ascontiguousarray(scales[rows]).tobytes())
+                del src
+            conn.executemany("UPDATE items SET row = ? WHERE id = ?", [(i, sid) for i, (sid, _) in enumerate(items)])
+            conn.execute("UPDATE meta SET value = ? WHERE key = 'generation'", (new_gen,))
+            self._bump_version(conn)
+        for old in (old_vec, old_scale):
+            try:
+                os.remove(old)
+            except OSError:
+                pass   # missing, or still mapped by a reader on Windows; harmless
+        logger.info(f"Vector store {self.path} compacted to {len(rows)} row(s)")
+
+    # ---------- read API ----------
+    def count(self):
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+
+    @staticmethod
+    def _split_where(where):
+        """
+        Split a where clause into SQL on the indexed ppt_name column (equality / $in on ppt_name,
+        at the top level or inside a top-level $and) and the rest, evaluated on the metadata.
+        """
+        if not where:
+            return [], [], None
+        terms = [{k: v} for k, v in where.items() if k != "$and"] + list(where.get("$and", []))
+        sql, args, rest = [], [], []
+        for term in terms:
+            key, cond = next(iter(term.items())) if len(term) == 1 else (None, None)
+            if key == "ppt_name" and not isinstance(cond, dict):
+                cond = {"$eq": cond}
+            if key == "ppt_name" and list(cond) == ["$eq"]:
+                sql.append("ppt_name = ?")
+                args.append(cond["$eq"])
+            elif key == "ppt_name" and list(cond) == ["$in"]:
+                values = list(cond["$in"])
+                sql.append(f"ppt_name IN ({','.join('?' * len(values))})" if values else "0")
+                args.extend(values)
+            else:
+                rest.append(term)
+        residual = None if not rest else rest[0] if len(rest) == 1 else {"$and": rest}
+        return sql, args, residual
+
+    def get(self, ids=None, where=None, limit=None, offset=None, include=("documents", "metadatas")):
+        include = include if include is not None else ("documents", "metadatas")
+        conditions, args, residual = self._split_where(where)
+        if ids is not None:
+            ids = list(ids)
+            if not ids:
+                return {"ids": [], "documents": [], "metadatas": [], "embeddings": []}
+            conditions.append(f"id IN ({','.join('?' * len(ids))})")
+            args.extend(ids)
+        sql = "SELECT id, row, document, metadata FROM items"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY rowid"
+        if residual is None and (limit is not None or offset):
+            # fully answered by SQL: page there instead of decoding every row
+            sql += " LIMIT ? OFFSET ?"
+            args.extend([-1 if limit is None else int(limit), int(offset or 0)])
+        with self._connect() as conn:
+            rows = conn.execute(sql, args).fetchall()
+        out = []
+        for sid, row, doc, meta in rows:
+            meta = json.loads(meta or "{}")
+            if matches_where(meta, residual):
+                out.append((sid, row, doc, meta))
+        if residual is not None:
+            start = offset or 0
+            out = out[start:start + limit] if limit is not None else out[start:]
+        res = {"ids": [r[0] for r in out]}
+        if "documents" in include:
+            res["documents"] = [r[2] for r in out]
+        if "metadatas" in include:
+            res["metadatas"] = [r[3] for r in out]
+        if "embeddings" in include:
+            snap = self._current_snapshot()
+            res["embeddings"] = [self._decode_row(snap, r[1]).tolist() for r in out]
+        return res
+
+    def _decode_row(self, snap, row):
+        vec = np.asarray(snap.vectors[row], dtype=np.float32)
+        return vec * snap.scales[row] if snap.scales is not None else vec
+
+    def _map_generation(self, generation):
+        """Memory-map one generation's matrix (and int8 scales); (None, None) when it holds no rows."""
+        vec_path, scale_path = self._files(generation)
+        if not os.path.exists(vec_path) or os.path.getsize(vec_path) < self._row_bytes:
+            return None, None
+        n = os.path.getsize(vec_path) // self._row_bytes
+        vectors = np.memmap(vec_path, dtype=self._np_dtype, mode="r", shape=(n, self.dim))
+        scales = None
+        if self.dtype == "int8":
+            scales = np.memmap(scale_path, dtype=np.float32, mode="r", shape=(n,))
+        return vectors, scales
+
+    def _current_snapshot(self):
+        """Reload ids/metadata and re-map the matrix when another process (or thread) wrote."""
+        while True:
+            conn = self._connect()
+            try:
+                # one read transaction: the generation and the row numbers come from the same commit
+                conn.execute("BEGIN")
+                meta = self._meta(conn)
+                if self._snapshot is not None and self._snapshot.version == meta["version"]:
+                    return self._snapshot
+                items = conn.execute("SELECT id, row, metadata FROM items ORDER BY row").fetchall()
+            finally:
+                conn.close()
+            vectors, scales = self._map_generation(meta["generation"])
+            with self._connect() as conn:
+                if self._meta(conn)["generation"] == meta["generation"]:
+                    break
+            # a compaction committed in between and may have removed the files just mapped: reload
+        snap = _Snapshot(
+            meta["version"],
+            [sid for sid, _, _ in items],
+            np.array([row for _, row, _ in items], dtype=np.int64),
+            [json.loads(m or "{}") for _, _, m in items],
+            vectors, scales,
+        )
+        with self._read_lock:
+            self._snapshot = snap
+        return snap
+
+    def _where_mask(self, snap, where):
+        key = json.dumps(where, sort_keys=True)
+        mask = snap.masks.get(key)
+        if mask is None:
+            mask = np.fromiter((matches_where(m, where) for m in snap.metadatas), dtype=bool, count=len(snap.ids))
+            snap.masks[key] = mask
+        return mask
+
+    def _scores(self, snap, queries):
+        """Cosine similarity of every stored row against each query: shape (n_queries, n_rows)."""
+        n = snap.vectors.shape[0]
+        out = np.empty((queries.shape[0], n), dtype=np.float32)
+        for i in range(0, n, _CHUNK_ROWS):
+            block = np.asarray(snap.vectors[i:i + _CHUNK_ROWS], dtype=np.float32)
+            out[:, i:i + len(block)] = queries @ block.T
+        if snap.scales is not None:
+            out *= np.asarray(snap.scales, dtype=np.float32)[None, :]
+        return out
+
+    def query(self, query_embeddings, n_results=10, where=None, include=("documents", "metadatas", "distances")):
+        include = include if include is not None else ("documents", "metadatas", "distances")
+        queries = self._normalize(query_embeddings)
+        snap = self._current_snapshot()
+        res = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        if snap.vectors is None or not snap.ids:
+            for key in res:
+                res[key] = [[] for _ in range(len(queries))]
+            return res
+
+        scores = self._scores(snap, queries)[:, snap.rows]   # aligned with snap.ids
+        if where:
+            scores[:, ~self._where_mask(snap, where)] = -np.inf
+        k = min(n_results, scores.shape[1])
+        if k <= 0:
+            for key in res:
+                res[key] = [[] for _ in range(len(queries))]
+            return res
+        wanted_docs = "documents" in include
+        for qs in scores:
+            top = np.argpartition(-qs, k - 1)[:k] if k < len(qs) else np.arange(len(qs))
+            top = top[np.argsort(-qs[top])]
+            top = [i for i in top if np.isfinite(qs[i])]
+            res["ids"].append([snap.ids[i] for i in top])
+            res["metadatas"].append([snap.metadatas[i] for i in top])
+            res["distances"].append([float(2.0 - 2.0 * qs[i]) for i in top])
+        if wanted_docs:
+            needed = sorted({sid for hits in res["ids"] for sid in hits})
+            docs = {}
+            if needed:
+                with self._connect() as conn:
+                    docs = dict(conn.execute(
+                        f"SELECT id, document FROM items WHERE id IN ({','.join('?' * len(needed))})", needed
+                    ).fetchall())
+            res["documents"] = [[docs.get(sid) for sid in hits] for hits in res["ids"]]
+        return res
+
+
+# ------------------------------------------------------------
+# FACTORY
+# ------------------------------------------------------------
+def _store_dim(dim):
+    if dim and VECTOR_STORE_DIM:
+        return min(int(dim), VECTOR_STORE_DIM)
+    return dim or VECTOR_STORE_DIM
+
+
+def open_collection(chroma_client, name, dim=None):
+    """
+    The slide collection for the configured backend (VECTOR_STORE). `dim` is the embedding
+    dimension of the collection; a new NumPy store is created with it (capped by VECTOR_STORE_DIM).
+    """
+    if VECTOR_STORE == "numpy":
+        return NumpyVectorStore(os.path.join(VECTOR_STORE_DIR, name), dim=_store_dim(dim))
+    if VECTOR_STORE != "chroma":
+        raise ValueError(f"Unknown vector store: {VECTOR_STORE}")
+    try:
+        return chroma_client.get_collection(name)
+    except Exception:
+        return chroma_client.create_collection(name)
+
+
+def collection_exists(chroma_client, name):
+    if VECTOR_STORE == "numpy":
+        return os.path.exists(os.path.join(VECTOR_STORE_DIR, name, "index.sqlite3"))
+    try:
+        chroma_client.get_collection(name)
+        return True
+    except Exception:
+        return False
+
+
+def drop_collection(chroma_client, name):
+    """Delete a collection (and, for the NumPy backend, its files) from the configured backend."""
+    if VECTOR_STORE == "numpy":
+        shutil.rmtree(os.path.join(VECTOR_STORE_DIR, name))
+    else:
+        chroma_client.delete_collection(name)
+
+
+# ------------------------------------------------------------
+# MODEL-VERSIONED COLLECTIONS
+# ------------------------------------------------------------
+def collection_name(model, dim):
+    """e.g. ppt_slides__text-embedding-3-small__1536"""
+    slug = re.sub(r"[^a-z0-9]+", "-", str(model).lower()).strip("-")
+    return f"{LEGACY_COLLECTION}__{slug}__{int(dim)}"
+
+
+def collection_spec(model, dim=None, name=None):
+    dim = int(dim or get_embedding_dim(model))
+    return {"name": name or collection_name(model, dim), "model": model, "dim": dim}
+
+
+def read_active_collection():
+    """The alias file as a dict ({name, model, dim, migrating_to?}), or None if there is none yet."""
+    try:
+        with open(ACTIVE_COLLECTION_PATH, "r", encoding="utf-8") as fp:
+            return json.load(fp)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.exception(f"Unreadable active collection file {ACTIVE_COLLECTION_PATH}: {e}")
+        return None
+
+
+def set_active_collection(spec, migrating_to=None):
+    """Atomically point the alias at `spec`; readers switch on their next lookup."""
+    ensure_dir(os.path.dirname(os.path.abspath(ACTIVE_COLLECTION_PATH)))
+    data = {"name": spec["name"], "model": spec["model"], "dim": int(spec["dim"]), "updated_on": now_ts()}
+    if migrating_to:
+        data["migrating_to"] = {k: migrating_to[k] for k in ("name", "model", "dim")}
+    tmp = f"{ACTIVE_COLLECTION_PATH}.{uuid.uuid4().hex}.tmp"
+    with open(tmp, "w", encoding="utf-8") as fp:
+        json.dump(data, fp, indent=2)
+    os.replace(tmp, ACTIVE_COLLECTION_PATH)
+    logger.info(f"Active collection -> {spec['name']}"
+                + (f" (re-embedding into {migrating_to['name']})" if migrating_to else ""))
+
+
+class ActiveCollections:
+    """
+    Resolves the serving collection (and its embedding model/dim) from the alias file and
+    re-resolves when the file changes, so a cut-over reaches long-running processes without
+    a restart. Without an alias file: the collection for `default_model`, or the legacy
+    unversioned collection if only that one exists. With write_alias=True (the ingestion
+    writer) that bootstrap choice is saved as the alias.
+    """
+
+    def __init__(self, chroma_client, default_model, write_alias=False):
+        self._chroma_client = chroma_client   # None -> the shared client, created on first use
+        self.default_model = default_model
+        self.write_alias = write_alias
+        self._lock = threading.Lock()
+        self._stamp = object()
+        self._spec = None
+        self._migrating_to = None
+        self._open = {}   # name -> collection
+
+    @property
+    def chroma_client(self):
+        if self._chroma_client is None:
+            self._chroma_client = get_chroma_client()
+        return self._chroma_client
+
+    @property
+    def backend_client(self):
+        """The client open_collection & co. need: the Chroma client, or None for the NumPy backend."""
+        return None if VECTOR_STORE == "numpy" else self.chroma_client
+
+    def _bootstrap(self):
+        spec = collection_spec(self.default_model)
+        if not collection_exists(self.backend_client, spec["name"]) \
+                and collection_exists(self.backend_client, LEGACY_COLLECTION):
+            spec = collection_spec(self.default_model, name=LEGACY_COLLECTION)
+            logger.info(f"Using legacy collection '{LEGACY_COLLECTION}' as {spec['model']}/{spec['dim']}")
+        if self.write_alias:
+            set_active_collection(spec)
+        return spec
+
+    def _refresh(self):
+        try:
+            st = os.stat(ACTIVE_COLLECTION_PATH)
+            stamp = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            stamp = None
+        with self._lock:
+            if stamp == self._stamp:
+                return
+            data = read_active_collection() if stamp else None
+            if data:
+                spec = collection_spec(data["model"], data["dim"], data["name"])
+                target = data.get("migrating_to")
+                migrating_to = collection_spec(target["model"], target["dim"], target["name"]) if target else None
+            else:
+                spec, migrating_to = self._bootstrap(), None
+            if self._spec is not None and spec["name"] != self._spec["name"]:
+                logger.info(f"Collection cut-over: {self._spec['name']} -> {spec['name']}")
+            if spec["model"] != self.default_model and (self._spec is None or spec["name"] != self._spec["name"]):
+                logger.warning(f"EMBEDDING_MODEL={self.default_model} but the active collection uses "
+                               f"{spec['model']}; embedding with {spec['model']}.")
+            self._spec, self._migrating_to = spec, migrating_to
+            # bootstrap may have just written the alias; remember the stamp it produced
+            try:
+                st = os.stat(ACTIVE_COLLECTION_PATH)
+                self._stamp = (st.st_mtime_ns, st.st_size)
+            except OSError:
+                self._stamp = None
+
+    def active(self):
+        """Spec of the serving collection: {name, model, dim}."""
+        self._refresh()
+        return self._spec
+
+    def targets(self):
+        """Specs every write must reach: the serving collection, plus the re-embed target if any."""
+        self._refresh()
+        return [self._spec] + ([self._migrating_to] if self._migrating_to else [])
+
+    def collection(self, spec=None):
+        spec = spec or self.active()
+        with self._lock:
+            coll = self._open.get(spec["name"])
+            if coll is None:
+                coll = self._open[spec["name"]] = open_collection(self.backend_client, spec["name"], spec["dim"])
+            return coll
+
+    def drop(self, spec):
+        """Delete a collection that no longer serves (e.g. the source of a finished re-embed)."""
+        with self._lock:
+            self._open.pop(spec["name"], None)
+        drop_collection(self.backend_client, spec["name"])
+
+
+def copy_collection(source, target, page_size=500):
+    """Copy every slide (embedding, document, metadata) from one store to another, e.g. Chroma -> NumPy."""
+    offset, total = 0, 0
+    while True:
+        res = source.get(include=["embeddings", "documents", "metadatas"], limit=page_size, offset=offset)
+        ids = res.get("ids", [])
+        if not len(ids):
+            break
+        target.upsert(ids=ids, embeddings=res["embeddings"], documents=res["documents"], metadatas=res["metadatas"])
+        total += len(ids)
+        offset += len(ids)
+    logger.info(f"Copied {total} slide(s) into the target vector store")
+    return total
+
+
+# ------------------------------------------------------------
+# BENCHMARK
+# ------------------------------------------------------------
+def benchmark(chroma_collection, stores, n_queries=50, top_k=10, seed=0):
+    """
+    Recall@k and latency of Chroma (HNSW) and each NumPy store against exact float32 search.
+    Queries are stored slide embeddings (each slide's own id is excluded from its results).
+    stores: {label: NumpyVectorStore}. Returns {label: {"recall": r, "p50_ms": x, "p95_ms": y}}.
+    """
+    data = chroma_collection.get(include=["embeddings"])
+    ids = list(data["ids"])
+    full = np.asarray(data["embeddings"], dtype=np.float32)
+    full /= np.linalg.norm(full, axis=1, keepdims=True)
+    rng = np.random.default_rng(seed)
+    picks = rng.choice(len(ids), size=min(n_queries, len(ids)), replace=False)
+
+    def _truth(qi):
+        sims = full @ full[qi]
+        sims[qi] = -np.inf
+        return set(ids[i] for i in np.argsort(-sims)[:top_k])
+
+    truths = {qi: _truth(qi) for qi in picks}
+    runners = {"chroma": chroma_collection, **stores}
+    report = {}
+    for label, store in runners.items():
+        latencies, recalls = [], []
+        for qi in picks:
+            t0 = time.perf_counter()
+            res = store.query(query_embeddings=[full[qi].tolist()], n_results=top_k + 1)
+            latencies.append((time.perf_counter() - t0) * 1000)
+            got = [sid for sid in res["ids"][0] if sid != ids[qi]][:top_k]
+            recalls.append(len(truths[qi].intersection(got)) / max(1, len(truths[qi])))
+        report[label] = {
+            "recall": float(np.mean(recalls)),
+            "p50_ms": float(np.percentile(latencies, 50)),
+            "p95_ms": float(np.percentile(latencies, 95)),
+        }
+        logger.info(f"{label:>18}: recall@{top_k}={report[label]['recall']:.3f} "
+                    f"p50={report[label]['p50_ms']:.1f}ms p95={report[label]['p95_ms']:.1f}ms")
+    return report
+
+
+if __name__ == "__main__":
+    # python vector_store.py migrate            -> copy the Chroma collection into the NumPy store
+    # python vector_store.py benchmark [dims..] -> compare Chroma with float16/int8 NumPy stores
+    from utils import DEFAULT_EMBEDDING_MODEL
+    client = get_chroma_client()
+    active = ActiveCollections(client, get_env("EMBEDDING_MODEL", DEFAULT_EMBEDDING_MODEL)).active()
+    chroma = client.get_collection(active["name"])
+    cmd = sys.argv[1] if len(sys.argv) > 1 else "benchmark"
+    if cmd == "migrate":
+        copy_collection(chroma, NumpyVectorStore(os.path.join(VECTOR_STORE_DIR, active["name"]),
+                                                 dim=_store_dim(active["dim"])))
+    else:
+        dims = [int(d) for d in sys.argv[2:]] or [_store_dim(active["dim"])]
+        bench_dir = os.path.join(VECTOR_STORE_DIR, "_benchmark")
+        stores = {}
+        for dtype in ("float16", "int8"):
+            for dim in dims:
+                store = NumpyVectorStore(os.path.join(bench_dir, f"{dtype}_{dim}"), dim=dim, dtype=dtype)
+                if store.count() == 0:
+                    copy_collection(chroma, store)
+                stores[f"numpy-{dtype}-{dim}"] = store
+        benchmark(chroma, stores)
@@ -0,0 +1,57 @@
+# conftest.py
+# The app's modules live at the repo root as "T2 <name>.py" and import each other by their
+# deployed names (utils, vector_store, ...). This finder maps those names to the files so the
+# tests import them the same way the app does.
+import os
+import sys
+import tempfile
+import importlib.abc
+import importlib.util
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEPLOYED_MODULES = {
+    "utils": "T2 util.py",
+    "azure_blob_utils": "T2 azure blob util.py",
+    "blob_cache": "T2 blob cache.py",
+    "deck_cache": "T2 deck cache.py",
+    "deck_loader": "T2 deck loader.py",
+    "embedding_batcher": "T2 embedding batcher.py",
+    "embedding_cache": "T2 embedding cache.py",
+    "ingestion_chroma": "T2 ingestion chroma.py",
+    "ingestion_manifest": "T2 ingestion manifest.py",
+    "lexical_index": "T2 lexical index.py",
+    "pil_slide_renderer": "T2 pil slide renderer.py",
+    "pptx_fast_text": "T2 fast slide text.py",
+    "question_store": "T2 question store.py",
+    "reembed": "T2 reembed.py",
+    "render_pool": "T2 render pool.py",
+    "search_utils": "T2 search util.py",
+    "slide_catalog": "T2 slide catalog.py",
+    "slide_extractor": "Extractor.py",
+    "slide_questions": "T2 slide questions.py",
+    "thumbnail_cache": "T2 thumbnail cache.py",
+    "vector_store": "T2 vector store.py",
+}
+
+
+class _DeployedNameFinder(importlib.abc.MetaPathFinder):
+    def find_spec(self, fullname, path, target=None):
+        filename = DEPLOYED_MODULES.get(fullname)
+        if filename is None:
+            return None
+        return importlib.util.spec_from_file_location(fullname, os.path.join(ROOT, filename))
+
+
+sys.meta_path.insert(0, _DeployedNameFinder())
+
+# modules read their settings at import: keep every store of the test session in one temp dir
+_STATE_DIR = tempfile.mkdtemp(prefix="ppt_tests_")
+os.environ.update({
+    "CHROMA_PERSIST_DIR": os.path.join(_STATE_DIR, "chroma_db"),
+    "BLOB_CACHE_DIR": os.path.join(_STATE_DIR, "blob_cache"),
+    "THUMBNAIL_CACHE_DIR": os.path.join(_STATE_DIR, "thumbnails"),
+    "QUESTION_STORE_PATH": os.path.join(_STATE_DIR, "questions.sqlite3"),
+    "EMBEDDING_CACHE_PATH": os.path.join(_STATE_DIR, "embedding_cache.sqlite3"),
+    "AZURE_BLOB_CONN": "UseDevelopmentStorage=true",
+})
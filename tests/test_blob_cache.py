@@ -0,0 +1,178 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+
+pytest.importorskip("dotenv")   # utils loads .env at import
+pytest.importorskip("azure.core")
+
+from azure.core import MatchConditions
+from azure.core.exceptions import ResourceNotModifiedError
+import blob_cache
+
+
+class _Properties:
+    def __init__(self, etag):
+        self.etag = etag
+
+
+class _Stream:
+    def __init__(self, data, etag):
+        self._data = data
+        self.properties = _Properties(etag)
+
+    def readinto(self, fp):
+        fp.write(self._data)
+        return len(self._data)
+
+
+class FakeContainerClient:
+    """download_blob() with Azure's conditional-GET behaviour: 304 -> ResourceNotModifiedError."""
+
+    def __init__(self, container_name="decks"):
+        self.container_name = container_name
+        self.blobs = {}     # name -> (data, etag)
+        self.calls = []     # (name, etag sent, match condition)
+        self._version = 0
+
+    def put(self, name, data):
+        self._version += 1
+        self.blobs[name] = (data, f'"0x{self._version:04d}"')
+
+    def download_blob(self, name, max_concurrency=1, etag=None, match_condition=None):
+        self.calls.append((name, etag, match_condition))
+        data, current = self.blobs[name]
+        if etag is not None and match_condition == MatchConditions.IfModified and etag == current:
+            raise ResourceNotModifiedError("Not modified")
+        return _Stream(data, current)
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(blob_cache, "BLOB_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(blob_cache, "BLOB_CACHE_FRESH_SECONDS", 60.0)
+    monkeypatch.setattr(blob_cache, "BLOB_CACHE_MAX_MB", 100.0)
+    return blob_cache
+
+
+def _read(path):
+    with open(path, "rb") as fp:
+        return fp.read()
+
+
+def test_miss_downloads_then_fresh_hit_skips_the_call(cache):
+    client = FakeContainerClient()
+    client.put("folder/deck.pptx", b"v1")
+    before = cache.blob_cache_stats()
+
+    path = cache.get_local_path(client, "folder/deck.pptx")
+    assert _read(path) == b"v1"
+    assert os.path.basename(path) == "folder_deck.pptx"
+    assert client.calls == [("folder/deck.pptx", None, None)]
+
+    assert cache.get_local_path(client, "folder/deck.pptx") == path
+    assert len(client.calls) == 1
+    after = cache.blob_cache_stats()
+    assert after["downloads"] - before["downloads"] == 1
+    assert after["fresh_hits"] - before["fresh_hits"] == 1
+
+
+def test_stale_entry_is_revalidated_with_its_etag(cache, monkeypatch):
+    client = FakeContainerClient()
+    client.put("deck.pptx", b"v1")
+    path = cache.get_local_path(client, "deck.pptx")
+    etag = client.blobs["deck.pptx"][1]
+
+    monkeypatch.setattr(cache, "BLOB_CACHE_FRESH_SECONDS", 0.0)
+    before = cache.blob_cache_stats()
+    assert cache.get_local_path(client, "deck.pptx") == path
+    assert client.calls[-1] == ("deck.pptx", etag, MatchConditions.IfModified)
+    assert _read(path) == b"v1"
+    assert cache.blob_cache_stats()["revalidated"] - before["revalidated"] == 1
+
+
+def test_changed_blob_is_downloaded_again(cache, monkeypatch):
+    client = FakeContainerClient()
+    client.put("deck.pptx", b"v1")
+    path = cache.get_local_path(client, "deck.pptx")
+    old_etag = client.blobs["deck.pptx"][1]
+    client.put("deck.pptx", b"v2")
+
+    monkeypatch.setattr(cache, "BLOB_CACHE_FRESH_SECONDS", 0.0)
+    assert cache.get_local_path(client, "deck.pptx") == path
+    assert client.calls[-1][1] == old_etag
+    assert _read(path) == b"v2"
+
+    # the new ETag is what the next revalidation sends
+    cache.get_local_path(client, "deck.pptx")
+    assert client.calls[-1][1] == client.blobs["deck.pptx"][1]
+    assert not [f for f in os.listdir(os.path.dirname(path)) if f.endswith(".tmp")]
+
+
+def test_entry_without_its_file_is_a_miss(cache):
+    client = FakeContainerClient()
+    client.put("deck.pptx", b"v1")
+    path = cache.get_local_path(client, "deck.pptx")
+    os.remove(path)
+    assert _read(cache.get_local_path(client, "deck.pptx")) == b"v1"
+    assert client.calls[-1] == ("deck.pptx", None, None)
+
+
+def test_containers_do_not_share_entries(cache):
+    a, b = FakeContainerClient("a"), FakeContainerClient("b")
+    a.put("deck.pptx", b"from a")
+    b.put("deck.pptx", b"from b")
+    assert _read(cache.get_local_path(a, "deck.pptx")) == b"from a"
+    assert _read(cache.get_local_path(b, "deck.pptx")) == b"from b"
+
+
+def _age(path, seconds):
+    meta = os.path.join(os.path.dirname(path), "meta.json")
+    used = os.stat(meta).st_mtime - seconds
+    os.utime(meta, (used, used))
+
+
+def test_eviction_drops_old_entries_only(cache, monkeypatch):
+    monkeypatch.setattr(cache, "BLOB_CACHE_MAX_MB", 1.0)
+    monkeypatch.setattr(cache, "BLOB_CACHE_MIN_AGE", 3600.0)
+    client = FakeContainerClient()
+    for name in ("old.pptx", "recent.pptx", "new.pptx"):
+        client.put(name, b"x" * 400 * 1024)
+    old = cache.get_local_path(client, "old.pptx")
+    recent = cache.get_local_path(client, "recent.pptx")
+    _age(old, 7200)
+    _age(recent, 60)                    # e.g. held as ppt_path by a live session
+
+    new = cache.get_local_path(client, "new.pptx")   # 1.2 MB > budget
+    assert not os.path.exists(old)
+    assert os.path.exists(recent) and os.path.exists(new)
+
+
+def test_recently_used_entries_may_exceed_the_budget(cache, monkeypatch):
+    monkeypatch.setattr(cache, "BLOB_CACHE_MAX_MB", 0.5)
+    monkeypatch.setattr(cache, "BLOB_CACHE_MIN_AGE", 3600.0)
+    client = FakeContainerClient()
+    client.put("a.pptx", b"x" * 400 * 1024)
+    client.put("b.pptx", b"x" * 400 * 1024)
+    paths = [cache.get_local_path(client, n) for n in ("a.pptx", "b.pptx")]
+    assert all(os.path.exists(p) for p in paths)
+    assert cache.evict_if_needed() == 0
+
+
+def test_entry_locks_are_released(cache):
+    client = FakeContainerClient()
+    for i in range(5):
+        client.put(f"deck{i}.pptx", b"v1")
+        cache.get_local_path(client, f"deck{i}.pptx")
+    assert cache._key_locks == {}
+
+
+def test_concurrent_callers_download_once(cache):
+    client = FakeContainerClient()
+    client.put("deck.pptx", b"v1")
+    download = client.download_blob
+    client.download_blob = lambda *a, **k: (time.sleep(0.1), download(*a, **k))[1]
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        paths = list(pool.map(lambda _: cache.get_local_path(client, "deck.pptx"), range(4)))
+    assert len(set(paths)) == 1 and len(client.calls) == 1
+    assert cache._key_locks == {}
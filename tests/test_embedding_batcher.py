@@ -0,0 +1,98 @@
+import threading
+import pytest
+
+pytest.importorskip("dotenv")   # utils loads .env at import
+
+import embedding_batcher
+from embedding_batcher import embed_texts, split_batches
+
+
+class FakeAPIError(Exception):
+    def __init__(self, status_code, message="", code=None, param=None, headers=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.code, self.param = code, param
+        self.body = {"code": code, "param": param, "message": message}
+        self.response = type("Response", (), {"status_code": status_code, "headers": headers or {}})()
+
+
+class FakeEmbeddings:
+    """embeddings.create() that fails per a rule and records every request's inputs."""
+
+    def __init__(self, fail=None):
+        self.fail = fail or (lambda batch, n: None)
+        self.requests = []
+        self._lock = threading.Lock()
+
+    def create(self, model, input, **kwargs):
+        with self._lock:
+            self.requests.append(list(input))
+            n = len(self.requests)
+        err = self.fail(input, n)
+        if err is not None:
+            raise err
+        items = [type("Item", (), {"index": i, "embedding": [float(len(t))]})() for i, t in enumerate(input)]
+        return type("Resp", (), {"data": items})()
+
+
+class FakeClient:
+    def __init__(self, fail=None):
+        self.embeddings = FakeEmbeddings(fail)
+
+
+@pytest.fixture(autouse=True)
+def fresh_limiters(monkeypatch):
+    monkeypatch.setattr(embedding_batcher, "_limiters", {})
+
+
+def test_split_batches_bounds_items_and_tokens():
+    texts = ["a" * 40] * 10    # ~11 tokens each without tiktoken
+    batches = split_batches(texts, max_items=4, max_tokens=10 ** 6)
+    assert [len(b[1]) for b in batches] == [4, 4, 2]
+    assert [b[0] for b in batches] == [0, 4, 8]
+    n = embedding_batcher.count_tokens(texts[0])
+    assert all(b[2] <= 2 * n for b in split_batches(texts, max_items=100, max_tokens=2 * n))
+
+
+def test_results_stay_aligned_across_batches(monkeypatch):
+    monkeypatch.setattr(embedding_batcher, "EMBED_MAX_BATCH_ITEMS", 3)
+    client = FakeClient()
+    texts = ["x" * i for i in range(1, 11)]
+    assert embed_texts(client, "m", texts, concurrency=2) == [[float(i)] for i in range(1, 11)]
+    assert len(client.embeddings.requests) == 4
+
+
+def test_bad_input_is_isolated_by_splitting():
+    bad = "y" * 7
+
+    def fail(batch, n):
+        if bad in batch:
+            return FakeAPIError(400, "This model's maximum context length is 8192 tokens",
+                                code="context_length_exceeded")
+    client = FakeClient(fail)
+    out = embed_texts(client, "m", ["a", "bb", bad, "ccc"], concurrency=1)
+    assert out == [[1.0], [2.0], None, [3.0]]
+
+
+def test_request_level_400_is_raised_without_splitting():
+    def fail(batch, n):
+        return FakeAPIError(400, "Unsupported value for dimensions", code="invalid_value", param="dimensions")
+    client = FakeClient(fail)
+    with pytest.raises(FakeAPIError):
+        embed_texts(client, "m", ["a", "bb", "ccc", "dddd"], concurrency=1)
+    assert len(client.embeddings.requests) == 1
+
+
+def test_429_is_retried_after_retry_after():
+    def fail(batch, n):
+        if n == 1:
+            return FakeAPIError(429, "Too many requests", headers={"retry-after-ms": "10"})
+    client = FakeClient(fail)
+    assert embed_texts(client, "m", ["a", "bb"], max_retries=2) == [[1.0], [2.0]]
+    assert len(client.embeddings.requests) == 2
+
+
+def test_blank_texts_are_sent_as_a_space():
+    client = FakeClient()
+    embed_texts(client, "m", ["", "  ", "z"])
+    assert client.embeddings.requests == [[" ", " ", "z"]]
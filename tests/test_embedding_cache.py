@@ -0,0 +1,69 @@
+import sqlite3
+import pytest
+
+pytest.importorskip("dotenv")   # utils loads .env at import
+
+import embedding_cache
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(embedding_cache, "EMBEDDING_CACHE_PATH", str(tmp_path / "embeddings.sqlite3"))
+    monkeypatch.setattr(embedding_cache, "EMBEDDING_CACHE_ENABLED", True)
+    monkeypatch.setattr(embedding_cache, "_initialized", False)
+    return embedding_cache
+
+
+def _vec(seed, dim=64):
+    return [float(seed + i) for i in range(dim)]
+
+
+def _table_bytes(cache):
+    with sqlite3.connect(cache.EMBEDDING_CACHE_PATH) as conn:
+        return conn.execute("SELECT COALESCE(SUM(nbytes), 0) FROM embeddings").fetchone()[0]
+
+
+def test_round_trip_and_normalized_keys(cache):
+    cache.put_many(["Revenue  by\nregion"], [_vec(1)], "m", 64)
+    assert cache.get_many(["Revenue by region", "other"], "m", 64) == [_vec(1), None]
+    assert cache.get_many(["Revenue by region"], "m", 32) == [None]
+
+
+def test_running_size_matches_table(cache):
+    cache.put_many(["a", "b", "c"], [_vec(1), _vec(2), None], "m", 64)
+    cache.put_many(["a", "d"], [_vec(3), _vec(4, dim=128)], "m", 64)   # "a" replaced
+    assert _table_bytes(cache) == 2 * 256 + 512
+    assert cache.cache_stats()["bytes"] == _table_bytes(cache)
+
+
+def test_eviction_drops_least_recently_used(cache, monkeypatch):
+    monkeypatch.setattr(cache, "EMBEDDING_CACHE_MAX_MB", 1024 / (1024 * 1024))   # four 256-byte vectors
+    for i, text in enumerate(["t0", "t1", "t2", "t3"]):
+        cache.put_many([text], [_vec(i)], "m", 64)
+    cache.get_many(["t0"], "m", 64)          # t0 is now the most recently used
+    cache.put_many(["t4"], [_vec(4)], "m", 64)
+    kept = cache.get_many(["t0", "t1", "t2", "t3", "t4"], "m", 64)
+    assert kept[0] is not None and kept[4] is not None
+    assert kept[1] is None
+    assert _table_bytes(cache) <= 1024
+    assert cache.cache_stats()["bytes"] == _table_bytes(cache)
+
+
+def test_size_is_seeded_for_existing_caches(cache, monkeypatch):
+    cache.put_many(["a", "b"], [_vec(1), _vec(2)], "m", 64)
+    with sqlite3.connect(cache.EMBEDDING_CACHE_PATH) as conn:
+        conn.execute("DROP TABLE cache_size")   # a cache written before the running size existed
+    monkeypatch.setattr(cache, "_initialized", False)
+    assert cache.cache_stats()["bytes"] == 512
+
+
+def test_cached_embed_calls_only_for_misses(cache):
+    calls = []
+
+    def embed(texts):
+        calls.append(list(texts))
+        return [_vec(len(t)) for t in texts]
+
+    assert cache.cached_embed(["x", "yy", "x"], "m", 64, embed) == [_vec(1), _vec(2), _vec(1)]
+    assert cache.cached_embed(["yy", "zzz"], "m", 64, embed) == [_vec(2), _vec(3)]
+    assert calls == [["x", "yy"], ["zzz"]]
@@ -0,0 +1,85 @@
+import pytest
+
+pytest.importorskip("dotenv")   # utils loads .env at import
+pptx = pytest.importorskip("pptx")
+
+from pptx.enum.shapes import MSO_SHAPE_TYPE
+from pptx.util import Inches
+from pptx_fast_text import extract_slide_texts, slide_count
+
+
+def _python_pptx_texts(shapes):
+    """Reference: the same text blocks read through python-pptx's object model."""
+    out = []
+    for shape in shapes:
+        if shape.shape_type == MSO_SHAPE_TYPE.GROUP:
+            out.extend(_python_pptx_texts(shape.shapes))
+        elif getattr(shape, "has_table", False) and shape.has_table:
+            rows = [" | ".join(cell.text.strip() for cell in row.cells) for row in shape.table.rows]
+            text = "\n".join(r for r in rows if r.replace(" | ", "").strip())
+            if text:
+                out.append(text)
+        elif getattr(shape, "has_text_frame", False) and shape.text.strip():
+            out.append(shape.text.strip())
+    return out
+
+
+@pytest.fixture(scope="module")
+def deck(tmp_path_factory):
+    prs = pptx.Presentation()
+    title_layout, blank_layout = prs.slide_layouts[0], prs.slide_layouts[6]
+
+    s0 = prs.slides.add_slide(title_layout)
+    s0.shapes.title.text = "Quarterly results"
+    s0.placeholders[1].text = "Revenue up\nCosts down"
+    s0.notes_slide.notes_text_frame.text = "Mention the new region"
+
+    s1 = prs.slides.add_slide(blank_layout)
+    box = s1.shapes.add_textbox(Inches(1), Inches(1), Inches(4), Inches(1))
+    para = box.text_frame.paragraphs[0]
+    para.add_run().text = "first line"
+    para.add_line_break()
+    para.add_run().text = "second line"
+    table = s1.shapes.add_table(2, 2, Inches(1), Inches(3), Inches(4), Inches(1)).table
+    for r, row in enumerate([["Region", "Sales"], ["North", "12"]]):
+        for c, value in enumerate(row):
+            table.cell(r, c).text = value
+    group = s1.shapes.add_group_shape()
+    group.shapes.add_textbox(Inches(6), Inches(1), Inches(2), Inches(1)).text_frame.text = "grouped A"
+    inner = group.shapes.add_group_shape()
+    inner.shapes.add_textbox(Inches(6), Inches(2), Inches(2), Inches(1)).text_frame.text = "grouped B"
+
+    prs.slides.add_slide(blank_layout)   # empty slide
+
+    path = tmp_path_factory.mktemp("decks") / "deck.pptx"
+    prs.save(str(path))
+    return str(path)
+
+
+def test_matches_python_pptx(deck):
+    slides = extract_slide_texts(deck)
+    reference = [_python_pptx_texts(s.shapes) for s in pptx.Presentation(deck).slides]
+    assert [s["texts"] for s in slides] == reference
+    assert [s["text"] for s in slides] == ["\n".join(texts) for texts in reference]
+
+
+def test_slide_fields(deck):
+    s0, s1, s2 = extract_slide_texts(deck)
+    assert [s["index"] for s in (s0, s1, s2)] == [0, 1, 2]
+    assert s0["title"] == "Quarterly results"
+    assert s0["body"] == ["Revenue up\nCosts down"]
+    assert s0["notes"] == "Mention the new region"
+    assert s1["body"] == ["first line\vsecond line"]
+    assert s1["tables"] == ["Region | Sales\nNorth | 12"]
+    assert s1["groups"] == ["grouped A", "grouped B"]
+    assert s2["texts"] == [] and s2["text"] == ""
+
+
+def test_without_notes(deck):
+    assert extract_slide_texts(deck, with_notes=False)[0]["notes"] == ""
+
+
+def test_slide_indices_and_count(deck):
+    assert slide_count(deck) == 3
+    assert [s["index"] for s in extract_slide_texts(deck, slide_indices=[2, 0, 0, 7, -1])] == [0, 2]
+    assert extract_slide_texts(deck, slide_indices=[]) == []
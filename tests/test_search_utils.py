@@ -0,0 +1,50 @@
+import pytest
+
+pytest.importorskip("dotenv")   # utils loads .env at import
+
+from search_utils import reciprocal_rank_fusion, relevant_hits
+
+
+def _hit(sid, **fields):
+    return {"id": sid, "ppt_name": sid.split(":")[0], "slide_index": int(sid.split(":")[1]), **fields}
+
+
+def test_rrf_scores_and_order():
+    vector = [_hit("a:0", score=0.2), _hit("b:0", score=0.3), _hit("c:0", score=0.4)]
+    lexical = [_hit("c:0", bm25=-5.0), _hit("d:0", bm25=-3.0), _hit("a:0", bm25=-1.0)]
+    fused = reciprocal_rank_fusion([vector, lexical], k=60)
+    assert [h["id"] for h in fused] == ["a:0", "c:0", "b:0", "d:0"]
+    assert fused[0]["rrf_score"] == pytest.approx(1 / 61 + 1 / 63)
+    assert fused[1]["rrf_score"] == pytest.approx(1 / 63 + 1 / 61)
+    assert fused[2]["rrf_score"] == pytest.approx(1 / 62)
+    assert fused[3]["rrf_score"] == pytest.approx(1 / 62)
+
+
+def test_rrf_merges_fields_of_both_rankings():
+    fused = reciprocal_rank_fusion([[_hit("a:0", score=0.2, bm25=None)], [_hit("a:0", score=None, bm25=-4.0)]])
+    assert len(fused) == 1
+    assert fused[0]["score"] == 0.2 and fused[0]["bm25"] == -4.0
+
+
+def test_rrf_does_not_mutate_inputs():
+    ranking = [_hit("a:0", score=0.1)]
+    reciprocal_rank_fusion([ranking])
+    assert "rrf_score" not in ranking[0]
+
+
+def test_rrf_k_flattens_rank_differences():
+    rankings = [[_hit("a:0"), _hit("b:0")], [_hit("b:0")]]
+    assert [h["id"] for h in reciprocal_rank_fusion(rankings, k=0)] == ["b:0", "a:0"]
+    assert reciprocal_rank_fusion([], k=60) == []
+
+
+def test_relevant_hits_thresholds():
+    hits = [
+        _hit("a:0", score=0.3),
+        _hit("b:0", score=0.9),
+        _hit("c:0", score=None, bm25=-2.5),     # lexical-only, strong
+        _hit("d:0", score=None, bm25=-0.2),     # lexical-only, common terms
+        _hit("e:0", score=None, bm25=None),
+    ]
+    assert [h["id"] for h in relevant_hits(hits, max_distance=0.5, min_bm25=1.0)] == ["a:0", "c:0"]
+    assert [h["id"] for h in relevant_hits(hits, max_distance=1.0, min_bm25=0.1)] == ["a:0", "b:0", "c:0", "d:0"]
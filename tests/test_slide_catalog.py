@@ -0,0 +1,165 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+
+pytest.importorskip("dotenv")   # utils loads .env at import
+pytest.importorskip("azure.core")
+
+import slide_catalog
+from slide_catalog import SlideCatalog
+
+
+class FakeDecks:
+    """Stands in for deck_loader: per-deck download / extraction delays, calls recorded."""
+
+    def __init__(self, counts, download_delay=None, extract_delay=None):
+        self.counts = counts
+        self.download_delay = download_delay or {}
+        self.extract_delay = extract_delay or {}
+        self.extract_calls = []
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=8)
+
+    def submit_deck(self, blob_name, extract=None):
+        def load():
+            time.sleep(self.download_delay.get(blob_name, 0))
+            local_path = f"/decks/{blob_name}"
+            return local_path, (extract(local_path) if extract else None)
+        return self._executor.submit(load)
+
+    def submit_extract(self, fn, *args):
+        return self._executor.submit(fn, *args)
+
+    def slide_count(self, local_path):
+        return self.counts[local_path.rsplit("/", 1)[-1]]
+
+    def extract(self, blob_name, local_path, indices):
+        with self._lock:
+            self.extract_calls.append((blob_name, list(indices)))
+        time.sleep(self.extract_delay.get(blob_name, 0))
+        return [{"ppt_name": blob_name, "slide_index": i} for i in indices]
+
+
+@pytest.fixture
+def fake_decks(monkeypatch):
+    def install(**kwargs):
+        decks = FakeDecks(**kwargs)
+        monkeypatch.setattr(slide_catalog, "submit_deck", decks.submit_deck)
+        monkeypatch.setattr(slide_catalog, "submit_extract", decks.submit_extract)
+        monkeypatch.setattr(slide_catalog, "slide_count", decks.slide_count)
+        return decks
+    return install
+
+
+def _hits(*pairs):
+    return [{"ppt_name": blob, "slide_index": idx} for blob, idx in pairs]
+
+
+def _keys(records):
+    return [(r["ppt_name"], r["slide_index"]) for r in records]
+
+
+def test_matched_slides_in_hit_order(fake_decks):
+    decks = fake_decks(counts={"a": 10, "b": 5})
+    catalog = SlideCatalog(_hits(("b", 3), ("a", 1), ("b", 0), ("a", 1), ("a", 42)), decks.extract)
+
+    catalog.load_matched()
+    assert sorted(decks.extract_calls) == [("a", [1]), ("b", [0, 3])]   # out-of-range 42 dropped
+    assert _keys(catalog.slides()) == [("b", 3), ("a", 1), ("b", 0)]
+    assert catalog.remaining("a") == 9
+
+
+def test_hits_without_slide_index_load_the_first_page(fake_decks, monkeypatch):
+    monkeypatch.setattr(slide_catalog, "SLIDE_CATALOG_PAGE_SIZE", 3)
+    decks = fake_decks(counts={"old": 8})
+    catalog = SlideCatalog([{"ppt_name": "old"}], decks.extract)
+
+    catalog.load_matched()
+    assert decks.extract_calls == [("old", [0, 1, 2])]
+    assert catalog.load_more("old") == 3
+    assert catalog.remaining("old") == 2
+
+
+def test_expand_adds_neighbours(fake_decks):
+    decks = fake_decks(counts={"a": 6})
+    catalog = SlideCatalog(_hits(("a", 0), ("a", 5)), decks.extract)
+    catalog.load_matched()
+
+    assert catalog.expand("a", radius=1) == 2      # 1 and 4; -1 and 6 are outside the deck
+    assert sorted(catalog.records["a"]) == [0, 1, 4, 5]
+    assert _keys(catalog.slides()) == [("a", 0), ("a", 5), ("a", 1), ("a", 4)]
+
+
+def test_load_more_pages_through_the_deck(fake_decks):
+    decks = fake_decks(counts={"a": 7})
+    catalog = SlideCatalog(_hits(("a", 3)), decks.extract)
+    catalog.load_matched()
+
+    assert catalog.load_more("a", page_size=4) == 4    # 0, 1, 2, 4 in deck order
+    assert sorted(catalog.records["a"]) == [0, 1, 2, 3, 4]
+    assert _keys(catalog.slides())[0] == ("a", 3)       # the match stays first
+    assert catalog.load_more("a", page_size=4) == 2
+    assert catalog.remaining("a") == 0
+    assert catalog.load_more("a") == 0
+
+
+def test_failed_deck_is_left_out(fake_decks):
+    decks = fake_decks(counts={"a": 3})                 # "gone" has no slide count: extraction fails
+    catalog = SlideCatalog(_hits(("gone", 0), ("a", 1)), decks.extract)
+
+    assert _keys(catalog.load_matched()) == [("a", 1)]
+    assert catalog.decks() == ["a"]
+
+
+def test_download_deadline_skips_slow_deck(fake_decks):
+    decks = fake_decks(counts={"fast": 4, "slow": 4}, download_delay={"slow": 1.0})
+    catalog = SlideCatalog(_hits(("slow", 2), ("fast", 1)), decks.extract)
+
+    start = time.monotonic()
+    records = list(catalog.iter_matched(download_deadline=0.2, extract_deadline=5))
+    assert time.monotonic() - start < 0.9
+    assert _keys(records) == [("fast", 1)]
+    assert catalog.late == {"slow"}
+    assert catalog.decks() == ["slow", "fast"]
+    assert catalog.remaining("slow") is None
+
+    # the selection page can still load it
+    assert catalog.load_more("slow") == 1
+    assert not catalog.late
+    assert _keys(catalog.slides()) == [("slow", 2), ("fast", 1)]
+
+
+def test_extract_deadline_skips_slow_extraction(fake_decks):
+    decks = fake_decks(counts={"fast": 4, "big": 40}, extract_delay={"big": 1.0})
+    catalog = SlideCatalog(_hits(("big", 0), ("fast", 2)), decks.extract)
+
+    start = time.monotonic()
+    records = list(catalog.iter_matched(download_deadline=5, extract_deadline=0.3))
+    assert time.monotonic() - start < 0.9
+    assert _keys(records) == [("fast", 2)]
+    assert catalog.late == {"big"}
+    assert catalog.streamed
+
+
+def test_streaming_extracts_each_deck_once(fake_decks):
+    decks = fake_decks(counts={"a": 10, "b": 5})
+    catalog = SlideCatalog(_hits(("b", 3), ("a", 1), ("b", 0)), decks.extract)
+
+    records = list(catalog.iter_matched(download_deadline=5, extract_deadline=5))
+    assert sorted(_keys(records)) == [("a", 1), ("b", 0), ("b", 3)]
+    assert sorted(decks.extract_calls) == [("a", [1]), ("b", [0, 3])]
+    assert catalog.streamed and not catalog.late
+
+
+def test_stream_closed_early_leaves_pending_decks_late(fake_decks):
+    decks = fake_decks(counts={"fast": 4, "slow": 4}, download_delay={"slow": 0.5})
+    catalog = SlideCatalog(_hits(("slow", 0), ("fast", 1)), decks.extract)
+
+    stream = catalog.iter_matched(download_deadline=5, extract_deadline=5)
+    assert _keys([next(stream)]) == [("fast", 1)]
+    stream.close()                                      # the page was rerun mid-stream
+    assert catalog.streamed
+    assert catalog.late == {"slow"}
+    assert catalog.load_more("slow") == 1
+    assert not catalog.late
@@ -0,0 +1,70 @@
+import pytest
+
+pytest.importorskip("dotenv")   # utils loads .env at import
+
+from slide_questions import split_question_batches, _validate_batch, QUESTION_TOKENS_PER_SHAPE
+
+
+def _struct(n_shapes, text="Quarterly revenue by region"):
+    return {"editable_shapes": [{"shape_id": f"sh{i}", "text": f"{text} {i}"} for i in range(n_shapes)]}
+
+
+def test_batches_cover_every_slide_in_order():
+    structs = [_struct(2) for _ in range(20)]
+    batches = split_question_batches(structs, max_slides=8, max_input_tokens=10 ** 6, max_output_tokens=10 ** 6)
+    assert batches == [list(range(0, 8)), list(range(8, 16)), list(range(16, 20))]
+
+
+def test_output_budget_splits_batches():
+    structs = [_struct(3) for _ in range(6)]
+    per_slide = QUESTION_TOKENS_PER_SHAPE * 3 + 20
+    batches = split_question_batches(structs, max_slides=100, max_input_tokens=10 ** 6,
+                                     max_output_tokens=per_slide * 2)
+    assert batches == [[0, 1], [2, 3], [4, 5]]
+
+
+def test_input_budget_splits_batches():
+    structs = [_struct(1, text="word " * 400) for _ in range(4)]
+    one = split_question_batches(structs[:1], max_slides=100, max_input_tokens=10 ** 6, max_output_tokens=10 ** 6)
+    assert one == [[0]]
+    batches = split_question_batches(structs, max_slides=100, max_input_tokens=700, max_output_tokens=10 ** 6)
+    assert [i for b in batches for i in b] == [0, 1, 2, 3]
+    assert all(len(b) == 1 for b in batches)
+
+
+def test_oversized_slide_goes_alone():
+    structs = [_struct(1), _struct(50), _struct(1)]
+    batches = split_question_batches(structs, max_slides=100, max_input_tokens=10 ** 6,
+                                     max_output_tokens=QUESTION_TOKENS_PER_SHAPE * 10)
+    assert batches == [[0], [1], [2]]
+
+
+def test_validate_batch_complete_slides():
+    structs = [_struct(2), _struct(1)]
+    parsed = {"slides": [
+        {"slide_key": "s1", "questions": [{"shape_id": "sh0", "question": " What region? "}]},
+        {"slide_key": "s0", "questions": [{"shape_id": "sh1", "question": "Which quarter?"},
+                                          {"shape_id": "sh0", "question": "Which metric?"}]},
+    ]}
+    assert _validate_batch(parsed, structs) == [
+        {"sh0": "Which metric?", "sh1": "Which quarter?"},
+        {"sh0": "What region?"},
+    ]
+
+
+def test_validate_batch_rejects_incomplete_slides():
+    structs = [_struct(2), _struct(1), _struct(1)]
+    parsed = {"slides": [
+        # one shape missing
+        {"slide_key": "s0", "questions": [{"shape_id": "sh0", "question": "Which metric?"}]},
+        # blank question, unknown shape id
+        {"slide_key": "s1", "questions": [{"shape_id": "sh0", "question": "  "},
+                                          {"shape_id": "other", "question": "Unrelated?"}]},
+        # s2 absent from the response
+    ]}
+    assert _validate_batch(parsed, structs) == [None, None, None]
+
+
+@pytest.mark.parametrize("parsed", [None, [], "not json", {"slides": "x"}, {"slides": [{"slide_key": "s0"}]}])
+def test_validate_batch_malformed(parsed):
+    assert _validate_batch(parsed, [_struct(1)]) == [None]
@@ -0,0 +1,137 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("dotenv")   # utils loads .env at import
+
+from vector_store import NumpyVectorStore, matches_where
+
+
+def _unit(*values):
+    v = np.array(values, dtype=np.float32)
+    return (v / np.linalg.norm(v)).tolist()
+
+
+@pytest.fixture
+def store(tmp_path):
+    s = NumpyVectorStore(str(tmp_path / "store"), dim=4, dtype="float32")
+    s.upsert(
+        ids=["a:0", "a:1", "b:0", "c:0"],
+        embeddings=[_unit(1, 0, 0, 0), _unit(0, 1, 0, 0), _unit(0, 0, 1, 0), _unit(1, 1, 0, 0)],
+        documents=["alpha zero", "alpha one", "beta zero", "gamma zero"],
+        metadatas=[
+            {"ppt_name": "a.pptx", "slide_index": 0, "tag_finance": True},
+            {"ppt_name": "a.pptx", "slide_index": 1},
+            {"ppt_name": "b.pptx", "slide_index": 0, "tag_finance": True},
+            {"ppt_name": "c.pptx", "slide_index": 0},
+        ],
+    )
+    return s
+
+
+def test_get_round_trip(store):
+    res = store.get(ids=["b:0", "a:1"], include=["documents", "metadatas", "embeddings"])
+    got = dict(zip(res["ids"], zip(res["documents"], res["metadatas"], res["embeddings"])))
+    assert set(got) == {"a:1", "b:0"}
+    assert got["b:0"][0] == "beta zero"
+    assert got["b:0"][1] == {"ppt_name": "b.pptx", "slide_index": 0, "tag_finance": True}
+    np.testing.assert_allclose(got["a:1"][2], [0, 1, 0, 0], atol=1e-6)
+    assert store.count() == 4
+
+
+def test_query_orders_by_distance(store):
+    res = store.query(query_embeddings=[_unit(1, 0.1, 0, 0)], n_results=3)
+    assert res["ids"][0] == ["a:0", "c:0", "a:1"]
+    assert res["documents"][0][0] == "alpha zero"
+    distances = res["distances"][0]
+    assert distances == sorted(distances)
+    assert distances[0] == pytest.approx(2 - 2 * np.dot(_unit(1, 0.1, 0, 0), _unit(1, 0, 0, 0)), abs=1e-5)
+
+
+def test_query_where_and_multiple_queries(store):
+    res = store.query(query_embeddings=[_unit(1, 0, 0, 0), _unit(0, 0, 1, 0)], n_results=5,
+                      where={"tag_finance": True})
+    assert res["ids"] == [["a:0", "b:0"], ["b:0", "a:0"]]
+
+
+def test_upsert_replaces_and_delete(store):
+    store.upsert(ids=["a:0"], embeddings=[_unit(0, 0, 0, 1)], documents=["alpha new"],
+                 metadatas=[{"ppt_name": "a.pptx", "slide_index": 0}])
+    assert store.count() == 4
+    res = store.query(query_embeddings=[_unit(0, 0, 0, 1)], n_results=1)
+    assert res["ids"] == [["a:0"]] and res["documents"] == [["alpha new"]]
+
+    store.delete(where={"ppt_name": "a.pptx"})
+    assert store.count() == 2
+    assert store.get(where={"ppt_name": "a.pptx"})["ids"] == []
+
+
+def test_update_merges_metadata(store):
+    store.update(ids=["c:0"], metadatas=[{"tag_finance": True}])
+    assert store.get(ids=["c:0"])["metadatas"] == [{"ppt_name": "c.pptx", "slide_index": 0, "tag_finance": True}]
+
+
+@pytest.mark.parametrize("where, expected", [
+    ({"ppt_name": "a.pptx"}, ["a:0", "a:1"]),
+    ({"ppt_name": {"$in": ["b.pptx", "c.pptx"]}}, ["b:0", "c:0"]),
+    ({"$and": [{"ppt_name": "a.pptx"}, {"slide_index": 1}]}, ["a:1"]),
+    ({"tag_finance": True}, ["a:0", "b:0"]),
+    ({"ppt_name": {"$in": []}}, []),
+])
+def test_get_where(store, where, expected):
+    assert sorted(store.get(where=where)["ids"]) == expected
+
+
+def test_get_limit_offset(store):
+    # answered in SQL (ppt_name only) and in Python (metadata filter): same paging
+    assert store.get(limit=2, offset=1)["ids"] == ["a:1", "b:0"]
+    assert store.get(where={"ppt_name": {"$in": ["a.pptx", "c.pptx"]}}, limit=1, offset=1)["ids"] == ["a:1"]
+    assert store.get(where={"slide_index": 0}, limit=2, offset=1)["ids"] == ["b:0", "c:0"]
+
+
+def test_reopen_and_compact(store):
+    store.upsert(ids=["a:1"], embeddings=[_unit(0, 1, 1, 0)], documents=["alpha one v2"],
+                 metadatas=[{"ppt_name": "a.pptx", "slide_index": 1}])
+    store.compact()
+    reopened = NumpyVectorStore(store.path)
+    assert reopened.dim == 4 and reopened.count() == 4
+    res = reopened.query(query_embeddings=[_unit(0, 1, 1, 0)], n_results=1)
+    assert res["ids"] == [["a:1"]] and res["documents"] == [["alpha one v2"]]
+
+
+def test_int8_store_keeps_ranking(tmp_path):
+    s = NumpyVectorStore(str(tmp_path / "int8"), dim=8, dtype="int8")
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(50, 8)).astype(np.float32)
+    s.upsert(ids=[str(i) for i in range(50)], embeddings=vectors.tolist())
+    res = s.query(query_embeddings=[vectors[7].tolist()], n_results=1)
+    assert res["ids"] == [["7"]]
+    assert res["distances"][0][0] == pytest.approx(0.0, abs=1e-2)
+
+
+def test_matches_where_operators():
+    meta = {"ppt_name": "a.pptx", "slide_index": 3, "tag_x": True}
+    assert matches_where(meta, None)
+    assert matches_where(meta, {"slide_index": {"$gte": 3}})
+    assert not matches_where(meta, {"slide_index": {"$lt": 3}})
+    assert matches_where(meta, {"$or": [{"tag_y": True}, {"tag_x": True}]})
+    assert not matches_where(meta, {"ppt_name": {"$nin": ["a.pptx"]}})
+
+
+def test_snapshot_survives_a_concurrent_compaction(store, monkeypatch):
+    store.upsert(ids=["a:0"], embeddings=[_unit(0, 0, 0, 1)], documents=["alpha new"],
+                 metadatas=[{"ppt_name": "a.pptx", "slide_index": 0}])   # row 0 is now dead
+    other = NumpyVectorStore(store.path)                                # e.g. the ingestion process
+    real_map = store._map_generation
+    calls = []
+
+    def map_after_compaction(generation):
+        # the compaction commits (and removes the old files) between reading the rows and mapping
+        if not calls:
+            other.compact()
+        calls.append(generation)
+        return real_map(generation)
+
+    monkeypatch.setattr(store, "_map_generation", map_after_compaction)
+    res = store.query(query_embeddings=[_unit(0, 0, 1, 0), _unit(0, 0, 0, 1)], n_results=1)
+    assert res["ids"] == [["b:0"], ["a:0"]]
+    assert calls[0] != calls[-1]    # reloaded at the new generation